@@ -0,0 +1,176 @@
+"""
+Binary cache of parsed arenas.
+
+Parsing a DOT file line by line with regular expressions (`read_graph`) or
+loading an energy game's JSON (`read_energy_game`) happens on every start
+of every script. `cache-arenas.py` converts a folder of arenas once into
+flat int64 `.npy` files, and the readers load those instead when present.
+A cache file is named after the SHA-256 of its source file, so an edited
+arena never hits a stale entry, and is loaded memory-mapped
+(`np.load(mmap_mode="r")`). It holds one int64 array:
+
+    MAGIC, VERSION, kind, n, m,
+    ids[n], priorities[n], owners[n],       vertex numbers (v<id> in DOT)
+    offsets[n + 1], targets[m], weights[m]  CSR: the successors of vertex i
+                                            are targets[offsets[i]:offsets[i + 1]]
+
+with kind 0 for DOT (weights 0) and 1 for energy JSON (priorities 0), and
+targets given as positions in `ids`. Cache files live in `.arena-cache/`
+next to the arenas, or in the directory named by $ARENA_CACHE.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+from checkpoint import file_digest
+
+CACHE_DIR = ".arena-cache"
+MAGIC = 0x41524E41  # "ARNA"
+VERSION = 1
+KIND_DOT, KIND_ENERGY = 0, 1
+HEADER = 5
+
+VERTEX_PATTERN = re.compile(
+    r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
+)
+EDGE_PATTERN = re.compile(r'^(?P<source>v\d+)\s*->\s*(?P<target>v\d+)')
+
+
+def cache_file(source, digest=None):
+    """Cache file of an arena (which need not exist yet)."""
+    directory = os.environ.get("ARENA_CACHE") or os.path.join(os.path.dirname(os.path.abspath(source)), CACHE_DIR)
+    return os.path.join(directory, f"{digest or file_digest(source)}.npy")
+
+
+class CachedArena:
+    """The arrays of a cache file (memory-mapped views)."""
+
+    def __init__(self, data):
+        magic, version, self.kind, n, m = (int(x) for x in data[:HEADER])
+        if magic != MAGIC or version != VERSION or len(data) != HEADER + 4 * n + 1 + 2 * m:
+            raise ValueError("not an arena cache file")
+        fields = np.split(data[HEADER:], np.cumsum([n, n, n, n + 1, m]))
+        self.ids, self.priorities, self.owners, self.offsets, self.targets, self.weights = fields
+        self.n, self.m = n, m
+
+    def successors(self, i):
+        """Positions of the successors of vertex i."""
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def parity_graph(self):
+        """(vertices, edges) as `read_graph` returns them: {"v<id>": priority}, {"v<id>": ["v<id>", ...]}."""
+        names = [f"v{i}" for i in self.ids.tolist()]
+        vertices = dict(zip(names, self.priorities.tolist()))
+        offsets = self.offsets.tolist()
+        targets = self.targets.tolist()
+        edges = {name: [names[t] for t in targets[offsets[i]:offsets[i + 1]]] for i, name in enumerate(names)}
+        return vertices, edges
+
+    def energy_game(self):
+        """(vertices, edges, weights, game_data) as `read_energy_game` returns them."""
+        ids = self.ids.tolist()
+        owners = self.owners.tolist()
+        offsets = self.offsets.tolist()
+        targets = self.targets.tolist()
+        effects = self.weights.tolist()
+        vertices = dict(zip(ids, owners))
+        edges = {}
+        weights = {}
+        edge_list = []
+        for i, src in enumerate(ids):
+            for k in range(offsets[i], offsets[i + 1]):
+                tgt = ids[targets[k]]
+                edges.setdefault(src, []).append(tgt)
+                weights[(src, tgt)] = effects[k]
+                edge_list.append({"effect": effects[k], "source": src, "target": tgt})
+        game_data = {"objective": "energy",
+                     "nodes": [{"id": v, "owner": owner} for v, owner in zip(ids, owners)],
+                     "edges": edge_list}
+        return vertices, edges, weights, game_data
+
+
+def load_arena(source, kind):
+    """The cached arena of `source`, or None if there is no valid cache file of that kind."""
+    path = cache_file(source)
+    if not os.path.exists(path):
+        return None
+    try:
+        arena = CachedArena(np.load(path, mmap_mode="r"))
+    except ValueError:
+        return None
+    return arena if arena.kind == kind else None
+
+
+def pack(kind, ids, priorities, owners, successors, weights):
+    """
+    One cache array from per-vertex lists; successors[i] and weights[i] are
+    the targets (vertex ids) and weights of the edges of vertex i in order.
+    """
+    position = {v: i for i, v in enumerate(ids)}
+    counts = [len(s) for s in successors]
+    targets = [position[t] for s in successors for t in s]
+    return np.concatenate([
+        np.array([MAGIC, VERSION, kind, len(ids), len(targets)], dtype=np.int64),
+        np.array(ids, dtype=np.int64), np.array(priorities, dtype=np.int64), np.array(owners, dtype=np.int64),
+        np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64),
+        np.array(targets, dtype=np.int64), np.array([w for ws in weights for w in ws], dtype=np.int64),
+    ])
+
+
+def parse_dot(dot_file):
+    """Cache array of a DOT arena (the vertex and edge lines `read_graph` matches)."""
+    ids, priorities, owners = [], [], []
+    edges = {}
+    with open(dot_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            v_match = VERTEX_PATTERN.match(line)
+            e_match = EDGE_PATTERN.match(line)
+            if v_match:
+                v = int(v_match.group("vertex")[1:])
+                if v in edges:
+                    raise ValueError(f"vertex v{v} is declared twice or after its edges")
+                ids.append(v)
+                priorities.append(int(v_match.group("priority")))
+                owners.append(int(v_match.group("player")))
+                edges[v] = []
+            elif e_match:
+                src, tgt = int(e_match.group("source")[1:]), int(e_match.group("target")[1:])
+                if src not in edges:
+                    raise ValueError(f"edge from undeclared vertex v{src}")
+                edges[src].append(tgt)
+    if any(t not in edges for ts in edges.values() for t in ts):
+        raise ValueError("edge to an undeclared vertex")
+    return pack(KIND_DOT, ids, priorities, owners, [edges[v] for v in ids], [[0] * len(edges[v]) for v in ids])
+
+
+def parse_energy(json_file):
+    """Cache array of an energy game (JSON with nodes {id, owner} and edges {source, target, effect})."""
+    with open(json_file, "r") as f:
+        game_data = json.load(f)
+    if set(game_data) != {"objective", "nodes", "edges"} or game_data["objective"] != "energy":
+        raise ValueError("not an energy game with nodes and edges only")
+    ids = [v["id"] for v in game_data["nodes"]]
+    successors = {v: [] for v in ids}
+    weights = {v: [] for v in ids}
+    for e in game_data["edges"]:
+        if e["source"] not in successors or e["target"] not in successors:
+            raise ValueError("edge with an undeclared endpoint")
+        successors[e["source"]].append(e["target"])
+        weights[e["source"]].append(e.get("effect", 0))
+    return pack(KIND_ENERGY, ids, [0] * len(ids), [v["owner"] for v in game_data["nodes"]],
+                [successors[v] for v in ids], [weights[v] for v in ids])
+
+
+def convert(source):
+    """Write the cache file of a .dot or .json arena; returns its path."""
+    data = parse_energy(source) if source.endswith(".json") else parse_dot(source)
+    path = cache_file(source)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, data)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,325 @@
+"""
+In-process reachability game solver.
+
+Mirrors ggg_reachability: vertices with priority 1 are targets, player 0
+wins exactly the vertices of the player-0 attractor to the targets and
+player 1 wins everything else. The arena is taken in the form produced by
+`read_graph` in the experiment scripts (vertex names `v<i>`), so the owner of
+vertex `v<i>` is `owners[i]`, exactly like the bit strings handed to
+`replace_players_in_dot`.
+
+Besides the per-assignment worklist solver, the arena can be solved
+bit-sliced: every vertex carries a row of uint64 words in which lane j holds
+the state of assignment j, so one fixpoint pass resolves 64 assignments per
+word with a handful of AND/OR operations per edge. The same fixpoint can
+also run over BDDs to compile "player 0 wins v" as a function of the owners.
+"""
+
+import numpy as np
+
+from bdd import FALSE, TRUE
+
+
+def owner_bits(owners):
+    """Normalise a bit string / sequence of 0, 1, "0", "1" to a list of ints."""
+    return [int(o) for o in owners]
+
+
+def pack_lanes(bits):
+    """Pack a (k, W) boolean matrix into a (k, ceil(W / 64)) uint64 lane matrix."""
+    bits = np.asarray(bits, dtype=bool)
+    k, width = bits.shape
+    words = -(-width // 64)
+    packed = np.zeros((k, words * 8), dtype=np.uint8)
+    packed[:, :-(-width // 8)] = np.packbits(bits, axis=1, bitorder="little")
+    return packed.view(np.uint64)
+
+
+def unpack_lanes(lanes, count):
+    """Inverse of `pack_lanes` for a single row: return the first `count` lanes as booleans."""
+    row = np.ascontiguousarray(lanes).view(np.uint8)
+    return np.unpackbits(row, bitorder="little", count=count).astype(bool)
+
+
+def enumeration_lanes(n, start, count, free=None):
+    """
+    Owner lanes for assignments start .. start + count - 1 in the order of
+    `itertools.product("01", repeat=k)` over the k vertices in `free`
+    (default: all n vertices): assignment a gives free[j] the owner bit
+    (a >> (k - 1 - j)) & 1. Vertices outside `free` belong to player 0.
+    A set lane bit means player 1.
+    """
+    if free is None:
+        free = range(n)
+    free = list(free)
+    k = len(free)
+    index = np.arange(start, start + count, dtype=np.uint64)
+    shifts = np.arange(k - 1, -1, -1, dtype=np.uint64)[:, None]
+    bits = np.zeros((n, count), dtype=bool)
+    bits[free] = (index[None, :] >> shifts) & np.uint64(1)
+    return pack_lanes(bits)
+
+
+class ReachabilityArena:
+    """
+    Index-based view of a parsed reachability arena.
+
+    The arena is built once from `vertices`/`edges` and can then be solved
+    for any number of owner assignments without touching the DOT file.
+    """
+
+    def __init__(self, vertices, edges):
+        self.n = len(vertices)
+        self.names = [f"v{i}" for i in range(self.n)]
+        missing = [v for v in vertices if int(v[1:]) >= self.n]
+        if missing:
+            raise ValueError(f"Vertex names must be v0..v{self.n - 1}, got {missing}")
+
+        self.targets = [vertices[name] == 1 for name in self.names]
+        self.successors = [[int(t[1:]) for t in edges.get(name, [])] for name in self.names]
+
+        # Predecessors keep edge multiplicity so that the out-degree counters
+        # of player-1 vertices drop to zero exactly once all edges are covered.
+        self.predecessors = [[] for _ in range(self.n)]
+        for src, succ in enumerate(self.successors):
+            for tgt in succ:
+                self.predecessors[tgt].append(src)
+        self.out_degree = [len(succ) for succ in self.successors]
+
+        # CSR view of the same edges for the batch attractor: the successors
+        # of v are edge_targets[edge_offsets[v]:edge_offsets[v + 1]].
+        self.edge_targets = np.array([t for succ in self.successors for t in succ], dtype=np.intp)
+        self.edge_offsets = np.cumsum([0] + self.out_degree)
+
+    def attractor(self, owners, stop_at=None):
+        """
+        Compute the player-0 attractor to the target vertices.
+
+        Returns a list of booleans (True = vertex won by player 0). If
+        `stop_at` is a vertex index, the computation stops as soon as that
+        vertex is attracted; the returned region is then partial.
+        """
+        owners = owner_bits(owners)
+        in_attr = list(self.targets)
+        remaining = list(self.out_degree)
+        worklist = [v for v in range(self.n) if in_attr[v]]
+        if stop_at is not None and in_attr[stop_at]:
+            return in_attr
+
+        while worklist:
+            current = worklist.pop()
+            for pred in self.predecessors[current]:
+                if in_attr[pred]:
+                    continue
+                if owners[pred] == 0:
+                    in_attr[pred] = True
+                else:
+                    remaining[pred] -= 1
+                    if remaining[pred] > 0:
+                        continue
+                    in_attr[pred] = True
+                if pred == stop_at:
+                    return in_attr
+                worklist.append(pred)
+
+        return in_attr
+
+    def v0_wins(self, owners):
+        """Return 1 if player 0 wins v0 under the given owners, otherwise 0."""
+        return 1 if self.attractor(owners, stop_at=0)[0] else 0
+
+    def regions(self, owners):
+        """Return the winning player (0/1) of every vertex under the given owners."""
+        return [0 if won else 1 for won in self.attractor(owners)]
+
+    def attractor_lanes(self, owner_lanes):
+        """
+        Bit-sliced attractor over a (n, words) uint64 matrix of owner lanes
+        (set bit = player 1). Returns the (n, words) lane matrix of the
+        player-0 attractor; lane j of row v is set iff assignment j lets
+        player 0 win v.
+        """
+        owner_lanes = np.asarray(owner_lanes, dtype=np.uint64)
+        words = owner_lanes.shape[1]
+        ones = np.uint64(0xFFFFFFFFFFFFFFFF)
+        attr = np.zeros((self.n, words), dtype=np.uint64)
+        attr[self.targets] = ones
+        player0 = ~owner_lanes
+
+        # Targets never change and vertices without successors are never
+        # attracted (player 0 has no move, player 1 has no edge to count).
+        active = [v for v in range(self.n) if not self.targets[v] and self.successors[v]]
+        changed = True
+        while changed:
+            changed = False
+            for v in active:
+                succ = attr[self.successors[v]]
+                some = np.bitwise_or.reduce(succ, axis=0)
+                every = np.bitwise_and.reduce(succ, axis=0)
+                new = (player0[v] & some) | (owner_lanes[v] & every)
+                if not np.array_equal(new, attr[v]):
+                    attr[v] = new
+                    changed = True
+        return attr
+
+    def v0_wins_lanes(self, owner_lanes, count):
+        """Return a boolean array telling, per lane, whether player 0 wins v0."""
+        return unpack_lanes(self.attractor_lanes(owner_lanes)[0], count)
+
+    def attractor_batch(self, owners):
+        """
+        Attractor over a (batch, n) boolean owner matrix (True = player 1),
+        one row per assignment. Returns the (batch, n) boolean matrix of the
+        vertices won by player 0.
+
+        Every sweep counts, for all rows at once, how many successors of
+        each vertex are already attracted: a player-0 vertex joins with one,
+        a player-1 vertex once the count reaches its out-degree. Rows leave
+        the sweep as soon as they stop changing.
+        """
+        owners = np.asarray(owners, dtype=bool)
+        out_degree = np.array(self.out_degree)
+        # Vertices without successors are never attracted
+        required = np.where(owners, out_degree, 1)
+        required[:, out_degree == 0] = len(self.edge_targets) + 1
+
+        attr = np.zeros(owners.shape, dtype=bool)
+        attr[:, self.targets] = True
+        active = np.arange(len(owners))
+        while active.size:
+            current = attr[active]
+            # Per-vertex counts as differences of a running sum over the CSR edges
+            hits = np.zeros((len(active), len(self.edge_targets) + 1), dtype=np.int32)
+            np.cumsum(current[:, self.edge_targets], axis=1, out=hits[:, 1:])
+            counts = hits[:, self.edge_offsets[1:]] - hits[:, self.edge_offsets[:-1]]
+            updated = current | (counts >= required[active])
+            changed = (updated != current).any(axis=1)
+            attr[active] = updated
+            active = active[changed]
+        return attr
+
+    def v0_wins_batch(self, owners):
+        """Return a boolean array telling, per owner row, whether player 0 wins v0."""
+        return self.attractor_batch(owners)[:, 0]
+
+    def attractor_symbolic(self, bdd, owner_nodes):
+        """
+        Symbolic attractor over a `bdd.BDD`: `owner_nodes[v]` is the diagram
+        of "v belongs to player 1" (FALSE for a fixed player-0 vertex).
+        Returns per vertex the diagram of the assignments under which player
+        0 wins it.
+        """
+        attr = [TRUE if target else FALSE for target in self.targets]
+        active = [v for v in range(self.n) if not self.targets[v] and self.successors[v]]
+        changed = True
+        while changed:
+            changed = False
+            for v in active:
+                some = FALSE
+                every = TRUE
+                for s in self.successors[v]:
+                    some = bdd.or_(some, attr[s])
+                    every = bdd.and_(every, attr[s])
+                new = bdd.ite(owner_nodes[v], every, some)
+                # Diagrams are canonical, so equal functions share a node id
+                if new != attr[v]:
+                    attr[v] = new
+                    changed = True
+        return attr
+
+
+class IncrementalAttractor:
+    """
+    Player-0 attractor of a `ReachabilityArena` maintained under single
+    owner flips, for Gray-code enumeration.
+
+    Every attracted vertex carries a rank such that a player-0 vertex has a
+    successor of lower rank and a player-1 vertex has only successors of
+    lower rank. A flip that can only grow the attractor propagates from the
+    flipped vertex; a flip that may shrink it removes the vertices whose
+    justification can go through the flipped vertex (its rank-increasing
+    backward closure) and re-attracts them from the remaining region.
+    """
+
+    def __init__(self, arena, owners):
+        self.arena = arena
+        self.owners = owner_bits(owners)
+        self.in_attr = [False] * arena.n
+        self.rank = [0] * arena.n
+        # Number of successor edges leading into the attractor
+        self.count = [0] * arena.n
+
+        seeds = [v for v in range(arena.n) if arena.targets[v]]
+        for v in seeds:
+            self.in_attr[v] = True
+        self._attract(seeds)
+
+    def v0_wins(self):
+        """Return 1 if player 0 currently wins v0, otherwise 0."""
+        return 1 if self.in_attr[0] else 0
+
+    def flip(self, v):
+        """Hand vertex v to the other player and repair the attractor."""
+        arena = self.arena
+        self.owners[v] ^= 1
+        if arena.targets[v]:
+            return
+
+        if not self.in_attr[v]:
+            if self.owners[v] == 0 and self.count[v] > 0:
+                self._insert(v)
+                self._attract([v])
+        elif self.owners[v] == 1:
+            if self.count[v] < arena.out_degree[v] or self._rank_of(v) > self.rank[v]:
+                self._shrink(v)
+
+    def _qualifies(self, v):
+        if self.owners[v] == 0:
+            return self.count[v] > 0
+        return self.count[v] == self.arena.out_degree[v] > 0
+
+    def _rank_of(self, v):
+        ranks = [self.rank[s] for s in self.arena.successors[v] if self.in_attr[s]]
+        return 1 + (min(ranks) if self.owners[v] == 0 else max(ranks))
+
+    def _insert(self, v):
+        self.rank[v] = self._rank_of(v)
+        self.in_attr[v] = True
+
+    def _attract(self, stack):
+        # Counters are bumped when a vertex is popped, so they are exact
+        # whenever the stack is empty.
+        while stack:
+            current = stack.pop()
+            for pred in self.arena.predecessors[current]:
+                self.count[pred] += 1
+                if not self.in_attr[pred] and self._qualifies(pred):
+                    self._insert(pred)
+                    stack.append(pred)
+
+    def _shrink(self, v):
+        arena = self.arena
+        removed = [v]
+        seen = {v}
+        i = 0
+        while i < len(removed):
+            current = removed[i]
+            i += 1
+            for pred in arena.predecessors[current]:
+                if (pred not in seen and self.in_attr[pred] and not arena.targets[pred]
+                        and self.rank[pred] > self.rank[current]):
+                    seen.add(pred)
+                    removed.append(pred)
+
+        for u in removed:
+            self.in_attr[u] = False
+        for u in removed:
+            for pred in arena.predecessors[u]:
+                self.count[pred] -= 1
+
+        stack = []
+        for u in removed:
+            if not self.in_attr[u] and self._qualifies(u):
+                self._insert(u)
+                stack.append(u)
+        self._attract(stack)
@@ -0,0 +1,124 @@
+"""
+Reduced ordered binary decision diagrams over owner variables.
+
+Variable i of a diagram stands for "the i-th enumerated vertex belongs to
+player 1". Nodes are plain integers (0 = false, 1 = true) and are shared
+through a unique table, so two functions are equal iff their node ids are.
+Once the winner of v0 is compiled into a diagram, its probability under
+independent owners is a single bottom-up pass over the nodes.
+"""
+
+from fractions import Fraction
+
+FALSE = 0
+TRUE = 1
+
+
+class BDD:
+    """A shared, reduced and ordered BDD over `num_vars` variables."""
+
+    def __init__(self, num_vars):
+        self.num_vars = num_vars
+        # node id -> (var, low, high); terminals sit below every variable
+        self.nodes = [(num_vars, FALSE, FALSE), (num_vars, TRUE, TRUE)]
+        self.unique = {}
+        self.ite_cache = {}
+
+    def node(self, var, low, high):
+        """Return the node testing `var` with the given cofactors."""
+        if low == high:
+            return low
+        key = (var, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = u
+        return u
+
+    def var(self, i):
+        """Diagram of variable i."""
+        return self.node(i, FALSE, TRUE)
+
+    def _cofactors(self, u, var):
+        node_var, low, high = self.nodes[u]
+        if node_var == var:
+            return low, high
+        return u, u
+
+    def ite(self, f, g, h):
+        """If-then-else: (f and g) or (not f and h)."""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+
+        key = (f, g, h)
+        result = self.ite_cache.get(key)
+        if result is not None:
+            return result
+
+        var = min(self.nodes[f][0], self.nodes[g][0], self.nodes[h][0])
+        f0, f1 = self._cofactors(f, var)
+        g0, g1 = self._cofactors(g, var)
+        h0, h1 = self._cofactors(h, var)
+        result = self.node(var, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self.ite_cache[key] = result
+        return result
+
+    def and_(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def or_(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def not_(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def evaluate(self, f, assignment):
+        """Value of f under a sequence of variable values (0/1)."""
+        while f > TRUE:
+            var, low, high = self.nodes[f]
+            f = high if int(assignment[var]) else low
+        return f == TRUE
+
+    def size(self, f):
+        """Number of internal nodes reachable from f."""
+        seen = set()
+        stack = [f]
+        while stack:
+            u = stack.pop()
+            if u <= TRUE or u in seen:
+                continue
+            seen.add(u)
+            stack.extend(self.nodes[u][1:])
+        return len(seen)
+
+    def probability(self, f, p):
+        """
+        Probability that f holds when every variable is independently 1 with
+        probability p. Exact if p is a Fraction; one pass over the nodes of f.
+        """
+        memo = {FALSE: 0 * p, TRUE: 0 * p + 1}
+        stack = [f]
+        while stack:
+            u = stack[-1]
+            if u in memo:
+                stack.pop()
+                continue
+            _, low, high = self.nodes[u]
+            pending = [c for c in (low, high) if c not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            memo[u] = (1 - p) * memo[low] + p * memo[high]
+            stack.pop()
+        return memo[f]
+
+    def count(self, f):
+        """Number of assignments to all variables that satisfy f."""
+        return int(self.probability(f, Fraction(1, 2)) * 2 ** self.num_vars)
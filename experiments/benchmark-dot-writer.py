@@ -0,0 +1,79 @@
+import re
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from dot_template import DotTemplate
+
+
+def replace_players_in_dot(dot_file, output_file, bit_string):
+    """Per-assignment DOT rewrite used by the scripts before DotTemplate (baseline)."""
+    vertex_pattern = re.compile(
+        r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
+    )
+
+    with open(dot_file, "r") as f:
+        lines = f.readlines()
+
+    updated_lines = []
+    for line in lines:
+        match = vertex_pattern.match(line.strip())
+        if match:
+            vertex_name = match.group("vertex")
+            vertex_index = int(vertex_name[1:])
+            new_player = bit_string[vertex_index]
+            new_line = re.sub(r'player=\d+', f'player={new_player}', line)
+            updated_lines.append(new_line)
+        else:
+            updated_lines.append(line)
+
+    with open(output_file, "w") as f:
+        f.writelines(updated_lines)
+
+
+def time_per_call(func, bit_strings):
+    start = time.perf_counter()
+    for bit_string in bit_strings:
+        func(bit_string)
+    return (time.perf_counter() - start) * 1000 / len(bit_strings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-assignment cost of serialising a DOT file.")
+    parser.add_argument("input_file", help="Path to the input DOT file.")
+    parser.add_argument("--assignments", type=int, default=10000, help="Number of random assignments to serialise.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random assignments.")
+    args = parser.parse_args()
+
+    template = DotTemplate(args.input_file)
+    n = len(template.slots)
+    rng = random.Random(args.seed)
+    bit_strings = ["".join(rng.choice("01") for _ in range(n)) for _ in range(args.assignments)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_file = os.path.join(tmp, "baseline.dot")
+        template_file = os.path.join(tmp, "template.dot")
+
+        # Both writers must produce the same file
+        for bit_string in bit_strings[:100]:
+            replace_players_in_dot(args.input_file, baseline_file, bit_string)
+            template.write(template_file, bit_string)
+            with open(baseline_file, "rb") as a, open(template_file, "rb") as b:
+                if a.read() != b.read():
+                    raise RuntimeError(f"Template output differs from the rewrite on {bit_string}")
+
+        rewrite_ms = time_per_call(lambda b: replace_players_in_dot(args.input_file, baseline_file, b), bit_strings)
+        write_ms = time_per_call(lambda b: template.write(template_file, b), bit_strings)
+        render_ms = time_per_call(template.render, bit_strings)
+
+    print(f"{args.input_file}: {n} vertices, {args.assignments} assignments")
+    print(f"Regex rewrite to file (before):  {rewrite_ms * 1000:.2f} us per assignment")
+    print(f"Template write to file:          {write_ms * 1000:.2f} us per assignment")
+    print(f"Template render for stdin pipe:  {render_ms * 1000:.2f} us per assignment "
+          f"({rewrite_ms / render_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
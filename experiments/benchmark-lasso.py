@@ -0,0 +1,112 @@
+import argparse
+import multiprocessing
+import random
+import time
+
+from lasso import find_lasso
+
+
+def has_full_priority0_lasso_dfs(vertices, edges):
+    """Simple-path DFS used by the reach scripts before find_lasso (baseline)."""
+    if "v0" not in vertices or vertices["v0"] != 0:
+        return False
+
+    stack = [("v0", [])]  # (current_vertex, path_from_v0)
+
+    while stack:
+        current, path = stack.pop()
+
+        if vertices.get(current, -1) != 0:
+            continue
+
+        if current in path:
+            return True
+
+        new_path = path + [current]
+        for neighbor in edges.get(current, []):
+            stack.append((neighbor, new_path))
+
+    return False
+
+
+def generate_arena(n, degree, p_zero, acyclic, rng):
+    """
+    Random arena in read_graph form. With `acyclic`, priority-0 vertices only
+    have edges to later vertices, so there is no priority-0 lasso and the DFS
+    has to exhaust every simple path.
+    """
+    vertices = {f"v{i}": 0 if rng.random() < p_zero else 1 for i in range(n)}
+    vertices["v0"] = 0
+    edges = {}
+    for i in range(n):
+        if acyclic:
+            targets = [rng.randrange(i + 1, n) for _ in range(degree)] if i < n - 1 else []
+        else:
+            targets = [rng.randrange(n) for _ in range(degree)]
+        edges[f"v{i}"] = [f"v{t}" for t in targets]
+    return vertices, edges
+
+
+def check_lasso(vertices, edges, lasso):
+    """Assert that a (stem, cycle) witness is a priority-0 lasso from v0."""
+    stem, cycle = lasso
+    walk = stem + cycle[1:]
+    assert stem[0] == "v0" and stem[-1] == cycle[0] == cycle[-1]
+    assert all(vertices[v] == 0 for v in walk)
+    assert all(b in edges[a] for a, b in zip(walk, walk[1:]))
+
+
+def run_dfs(vertices, edges, result):
+    result.put(has_full_priority0_lasso_dfs(vertices, edges))
+
+
+def time_dfs(vertices, edges, timeout):
+    """
+    Run the baseline in a subprocess so it can be abandoned; return (answer,
+    ms) or (None, None) on timeout. The time includes process start-up.
+    """
+    result = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_dfs, args=(vertices, edges, result))
+    start = time.perf_counter()
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return None, None
+    return result.get(), (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare priority-0 lasso detection: simple-path DFS vs. find_lasso.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000],
+                        help="Numbers of vertices to generate.")
+    parser.add_argument("--degree", type=int, default=3, help="Out-degree of every vertex.")
+    parser.add_argument("--p-zero", type=float, default=0.9, help="Probability of priority 0.")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds before the DFS is abandoned.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated arenas.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print("family,vertices,lasso,find_lasso_ms,path_dfs_ms")
+    for acyclic in (False, True):
+        family = "acyclic" if acyclic else "random"
+        for n in args.sizes:
+            vertices, edges = generate_arena(n, args.degree, args.p_zero, acyclic, rng)
+            priority0 = {v for v, priority in vertices.items() if priority == 0}
+
+            start = time.perf_counter()
+            lasso = find_lasso(edges, "v0", priority0)
+            lasso_ms = (time.perf_counter() - start) * 1000
+            if lasso is not None:
+                check_lasso(vertices, edges, lasso)
+
+            found, dfs_ms = time_dfs(vertices, edges, args.timeout)
+            if found is not None and found != (lasso is not None):
+                raise RuntimeError(f"{family} arena with {n} vertices: path DFS={found}, find_lasso={lasso is not None}")
+            dfs = f"{dfs_ms:.1f}" if dfs_ms is not None else f">{args.timeout * 1000:.0f}"
+            print(f"{family},{n},{lasso is not None},{lasso_ms:.1f},{dfs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import os
+
+from arena_cache import CACHE_DIR, cache_file, convert
+from checkpoint import file_digest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert every arena (.dot, .json) of a folder into the binary arena cache (arena_cache.py).")
+    parser.add_argument("folder", help="Folder of arenas.")
+    parser.add_argument("--clean", action="store_true",
+                        help="Also remove cache files whose arena no longer exists or has changed.")
+    args = parser.parse_args()
+
+    converted = cached = skipped = 0
+    current = set()
+    for name in sorted(os.listdir(args.folder)):
+        source = os.path.join(args.folder, name)
+        if os.path.splitext(name)[1] not in (".dot", ".json") or not os.path.isfile(source):
+            continue
+        path = cache_file(source, file_digest(source))
+        current.add(os.path.basename(path))
+        if os.path.exists(path):
+            cached += 1
+            continue
+        try:
+            convert(source)
+            converted += 1
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Skipping {source}: {e}")
+            skipped += 1
+    print(f"Converted {converted} arenas, {cached} already cached, {skipped} skipped.")
+
+    if args.clean:
+        directory = os.environ.get("ARENA_CACHE") or os.path.join(args.folder, CACHE_DIR)
+        stale = [name for name in os.listdir(directory) if name.endswith(".npy") and name not in current]
+        for name in stale:
+            os.remove(os.path.join(directory, name))
+        print(f"Removed {len(stale)} stale cache files from {directory}.")
+
+
+if __name__ == "__main__":
+    main()
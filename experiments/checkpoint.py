@@ -0,0 +1,107 @@
+"""
+Durable progress checkpoints for long enumeration and sampling runs.
+
+A checkpoint is a small JSON file next to the log file holding the SHA-256
+of the input file, the settings that determine the result (which must match
+on resume) and the script's progress: the index of the next assignment or
+sample block, the running counts, and whatever else the script needs to
+continue exactly where it stopped. It is written at most every `interval`
+seconds, atomically (temporary file, fsync, rename), so a crash leaves the
+previous checkpoint intact, and removed once the run completes.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def checkpoint_path(log_file):
+    """Checkpoint file belonging to a results log file."""
+    return f"{os.path.splitext(log_file)[0]}.checkpoint.json"
+
+
+class Checkpoint:
+    """Progress record of one run over `input_file` with the given settings."""
+
+    def __init__(self, path, input_file, settings, interval=60.0):
+        self.path = path
+        self.digest = file_digest(input_file)
+        # Round-trip so tuples compare equal to the lists read back
+        self.settings = json.loads(json.dumps(settings))
+        self.interval = interval
+        self.saved_at = time.monotonic()
+
+    def load(self):
+        """
+        Return the saved progress, or None if there is no checkpoint. Raises
+        ValueError if the checkpoint belongs to another input or settings.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            data = json.load(f)
+        if data["input_sha256"] != self.digest:
+            raise ValueError(f"Checkpoint {self.path} was written for a different input file")
+        if data["settings"] != self.settings:
+            raise ValueError(f"Checkpoint {self.path} was written with settings {data['settings']}, "
+                             f"not {self.settings}")
+        return data["progress"]
+
+    def due(self):
+        """True once `interval` seconds have passed since the last save."""
+        return time.monotonic() - self.saved_at >= self.interval
+
+    def save(self, progress):
+        """Atomically replace the checkpoint with `progress` (a JSON-serialisable dict)."""
+        data = {"input_sha256": self.digest, "settings": self.settings, "progress": progress}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.saved_at = time.monotonic()
+
+    def clear(self):
+        """Remove the checkpoint after a completed run."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def check_log(log_file, progress):
+    """
+    Raise ValueError unless the log of a run resumed at `progress` still
+    holds the lines written up to the checkpoint.
+    """
+    if progress is not None and (not os.path.exists(log_file)
+                                 or os.path.getsize(log_file) < progress["log_size"]):
+        raise ValueError(f"Checkpoint has no matching log {log_file}; rerun without --resume")
+
+
+def resume_log(log_file, progress):
+    """
+    Open a sampler's progress log for writing: truncated to the size it had
+    at the checkpoint when resuming, so no line is written twice, otherwise
+    from scratch.
+    """
+    if progress is None:
+        return open(log_file, "w")
+    try:
+        check_log(log_file, progress)
+    except ValueError as e:
+        sys.exit(str(e))
+    logf = open(log_file, "r+")
+    logf.truncate(progress["log_size"])
+    logf.seek(progress["log_size"])
+    return logf
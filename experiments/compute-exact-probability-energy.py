@@ -1,15 +1,29 @@
 #!/usr/bin/env python3
 import json
 import argparse
-import itertools
+import inspect
 import os
+import shutil
 import subprocess
 import time
 
+from arena_cache import KIND_ENERGY, load_arena
+from checkpoint import Checkpoint, checkpoint_path
+from energy_screen import cycle_weight, negative_cycle, nonnegative_cycle
+from energy_solver import EnergyArena, enumeration_owners
+from enumeration import product_bit_strings
+from reduction import energy_successors, free_vertices, prune_energy_game
+from results_db import Run
+from shards import parse_shard, partial_path, shard_range, solver_version, write_partial
+
 # ----------------------------
 # 1️⃣ Read JSON energy game
 # ----------------------------
 def read_energy_game(json_file):
+    cached = load_arena(json_file, KIND_ENERGY)
+    if cached is not None:
+        return cached.energy_game()
+
     with open(json_file, "r") as f:
         game_data = json.load(f)
 
@@ -38,64 +52,25 @@ def replace_players_in_json(game_data, bit_string, output_file):
 # ----------------------------
 # 3️⃣ Find a nonnegative-energy lasso from start
 # ----------------------------
-def find_nonnegative_lasso(edges, weights, start=0, energy_limit=1000):
-    stack = [(start, [start], 0)]
-    visited_states = set()
-
-    while stack:
-        current, path, energy = stack.pop()
-        if energy < 0:
-            continue
-
-        if current in path[:-1]:
-            cycle_start = path.index(current)
-            cycle = path[cycle_start:]
-            total_weight = 0
-            valid = True
-            cycle_energy = 0
-            for i in range(len(cycle) - 1):
-                w = weights.get((cycle[i], cycle[i + 1]), 0)
-                cycle_energy += w
-                if cycle_energy < 0:
-                    valid = False
-                    break
-                total_weight += w
-            if valid and total_weight >= 0:
-                return True
-            continue
-
-        for neighbor in edges.get(current, []):
-            w = weights.get((current, neighbor), 0)
-            new_energy = energy + w
-            state = (neighbor, new_energy)
-            if new_energy >= 0 and state not in visited_states and new_energy <= energy_limit:
-                visited_states.add(state)
-                stack.append((neighbor, path + [neighbor], new_energy))
-
-    return False
+def find_nonnegative_lasso(edges, weights, start=0):
+    """
+    Return a cycle [u, ..., u] of nonnegative total weight reachable from
+    start, i.e. a witness that player 0 wins when she owns every vertex,
+    or None.
+    """
+    return nonnegative_cycle(edges, weights, start)
 
 # ----------------------------
-# 4️⃣ Detect any negative-energy path
+# 4️⃣ Detect a negative-energy cycle
 # ----------------------------
-def exists_negative_energy_path(edges, weights, start=0, energy_limit=1000):
-    stack = [(start, 0)]
-    visited_states = set()
-
-    while stack:
-        current, energy = stack.pop()
-        if (current, energy) in visited_states:
-            continue
-        visited_states.add((current, energy))
-
-        for neighbor in edges.get(current, []):
-            w = weights.get((current, neighbor), 0)
-            new_energy = energy + w
-            if new_energy < 0:
-                return True
-            if new_energy <= energy_limit:
-                stack.append((neighbor, new_energy))
-
-    return False
+def exists_negative_energy_path(edges, weights, start=0):
+    """
+    Return a cycle [u, ..., u] of negative total weight reachable from
+    start, i.e. a witness that player 1 wins when he owns every vertex,
+    or None. A negative path without such a cycle is paid for by the
+    initial credit.
+    """
+    return negative_cycle(edges, weights, start)
 
 # ----------------------------
 # Parse solver output (updated)
@@ -125,6 +100,34 @@ def parse_solver_output(output):
     # fallback
     return 0
 
+def parse_solver_regions(output):
+    """
+    Parse "The winning region is: {...}" into {vertex_id: winning_player},
+    where player 0 wins every vertex with a value >= 0.
+    """
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("The winning region is:"):
+            start = line.find("{")
+            end = line.find("}", start)
+            if start != -1 and end != -1:
+                try:
+                    region = eval(line[start:end+1])
+                    return {v: 0 if value >= 0 else 1 for v, value in region.items()}
+                except Exception as e:
+                    print(f"Error parsing winning region: {e}")
+    return {}
+
+def run_egsolver(json_file):
+    """Run `egsolver solve` on a JSON game and return its output."""
+    try:
+        return subprocess.check_output(
+            ["egsolver", "solve", json_file],
+            text=True
+        )
+    except subprocess.CalledProcessError as e:
+        return e.output or f"Solver error: {e}"
+
 
 # ----------------------------
 # 6️⃣ Main experiment
@@ -133,7 +136,27 @@ def main():
     parser = argparse.ArgumentParser(description="Analyze Energy Game JSON and enumerate player assignments.")
     parser.add_argument("input_file", help="Path to the JSON input file.")
     parser.add_argument("output_file", help="Path to save temporary JSON with player assignments.")
+    parser.add_argument("--solver", choices=["python", "egsolver"], default="python",
+                        help="Minimal-credit fixpoint over blocks of assignments in-process (python), "
+                             "or one `egsolver solve` call per assignment.")
+    parser.add_argument("--block-size", type=int, default=4096,
+                        help="Assignments per block with --solver python.")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="Enumerate owners of vertices unreachable from v0 as well.")
+    parser.add_argument("--no-reduce", action="store_true",
+                        help="Enumerate owners of single-successor and always-decided vertices as well.")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="Enumerate only the i-th of k contiguous slices of the assignments (i/k, "
+                             "0 <= i < k) and write a partial result for merge-shards.py.")
+    parser.add_argument("--db", default=None,
+                        help="Also record the result in this SQLite results database (see results_db.py).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint.")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="Seconds between progress checkpoints.")
     args = parser.parse_args()
+    if args.db is not None and args.shard is not None:
+        parser.error("--db records complete runs; pass it to merge-shards.py instead of the shards")
 
     vertices, edges, weights, game_data = read_energy_game(args.input_file)
 
@@ -141,35 +164,105 @@ def main():
     v0_can_win = find_nonnegative_lasso(edges, weights, start=0)
     v0_has_neg_path = exists_negative_energy_path(edges, weights, start=0)
 
-    print(f"v0 has nonnegative-energy lasso: {v0_can_win}")
-    print(f"v0 can reach a negative-energy path: {v0_has_neg_path}")
+    print(f"v0 has nonnegative-energy lasso: {v0_can_win is not None}")
+    if v0_can_win:
+        print(f"  cycle {v0_can_win} of weight {cycle_weight(v0_can_win, weights)}")
+    print(f"v0 can reach a negative-energy cycle: {v0_has_neg_path is not None}")
+    if v0_has_neg_path:
+        print(f"  cycle {v0_has_neg_path} of weight {cycle_weight(v0_has_neg_path, weights)}")
 
     if not v0_can_win or not v0_has_neg_path:
         print("Early termination: graph unsuitable for exhaustive analysis.")
         return
 
+    # Restrict to the arena reachable from node 0
+    scale_bits = 0
+    if not args.no_prune:
+        game_data, scale_bits = prune_energy_game(game_data)
+        vertices = {v["id"]: v["owner"] for v in game_data["nodes"]}
+        if scale_bits:
+            print(f"Pruned {scale_bits} vertices unreachable from v0.")
+
     n = len(vertices)
-    total_games = 2 ** n
-    print(f"{n} vertices detected, enumerating all {total_games} player assignments...")
+    arena = EnergyArena.from_game_data(game_data)
+
+    # Fix owners that cannot influence v0
+    free = list(range(n))
+    if not args.no_reduce:
+        def solve_regions(owners):
+            if args.solver == "python":
+                return arena.regions(owners)
+            replace_players_in_json(game_data, "".join(map(str, owners)), args.output_file)
+            regions = parse_solver_regions(run_egsolver(args.output_file))
+            return [regions.get(i) for i in range(n)]
+
+        free, v0_winner = free_vertices(n, energy_successors(game_data), solve_regions)
+        if v0_winner is not None:
+            print(f"v0 is won by player {v0_winner} under every assignment.")
+            free = []
+        print(f"Fixed {n - len(free)} owner-irrelevant vertices.")
+    scale_bits += n - len(free)
+
+    k = len(free)
+    total_games = 2 ** k
+    print(f"{n} vertices detected, enumerating all {total_games} player assignments "
+          f"over {k} free vertices (counts scaled by 2^{scale_bits})...")
 
     log_file = f"{os.path.splitext(args.input_file)[0]}_energy_results.txt"
     total_aggregated = 0
     total_time_ms = 0.0
     games_solved = 0
 
-    with open(log_file, "w") as logf:
-        for bits in itertools.product("01", repeat=n):
-            bit_string = "".join(bits)
+    # Shard: this run covers assignments first_index .. stop_index - 1
+    first_index, stop_index = (0, total_games) if args.shard is None else shard_range(total_games, args.shard)
+    result_file = log_file if args.shard is None else partial_path(log_file, args.shard)
+    if args.shard is not None:
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: assignments {first_index} .. {stop_index - 1}.")
+    solver_path = inspect.getfile(EnergyArena) if args.solver == "python" else shutil.which("egsolver")
+
+    # Checkpoint: assignments first_index .. first_index + games_solved - 1 are done
+    checkpoint = Checkpoint(checkpoint_path(result_file), args.input_file,
+                            {"free": free, "prune": not args.no_prune, "reduce": not args.no_reduce,
+                             "shard": args.shard},
+                            args.checkpoint_interval)
+    try:
+        progress = checkpoint.load() if args.resume else None
+    except ValueError as e:
+        parser.error(str(e))
+    if progress is not None:
+        games_solved, total_aggregated, total_time_ms = progress["next"], progress["wins"], progress["time_ms"]
+        print(f"Resuming after {games_solved}/{total_games} assignments.")
+    run = None
+    if args.db is not None:
+        run = Run(args.db, args.input_file, checkpoint.digest, "energy", "exact", solver=args.solver,
+                  run_id=progress.get("run_id") if progress is not None else None)
+
+    def save_progress():
+        checkpoint.save({"next": games_solved, "wins": total_aggregated, "time_ms": total_time_ms,
+                         "run_id": run.id if run is not None else None})
+
+    if args.solver == "python":
+        for block_start in range(first_index + games_solved, stop_index, args.block_size):
+            count = min(args.block_size, stop_index - block_start)
+
+            # One fixpoint over the whole block of assignments
+            start_time = time.perf_counter()
+            wins = arena.v0_wins(enumeration_owners(n, block_start, count, free))
+            end_time = time.perf_counter()
+            total_time_ms += (end_time - start_time) * 1000
+
+            total_aggregated += int(wins.sum())
+            games_solved += count
+            print(f"Solved {games_solved}/{total_games} | Agg: {total_aggregated} | "
+                  f"Time: {(end_time - start_time) * 1000:.3f} ms")
+            if checkpoint.due():
+                save_progress()
+    else:
+        for bit_string in product_bit_strings(n, free, first_index + games_solved, stop_index):
             replace_players_in_json(game_data, bit_string, args.output_file)
 
             start_time = time.perf_counter()
-            try:
-                solver_output = subprocess.check_output(
-                    ["egsolver", "solve", args.output_file],
-                    text=True
-                )
-            except subprocess.CalledProcessError as e:
-                solver_output = e.output or f"Solver error: {e}"
+            solver_output = run_egsolver(args.output_file)
             end_time = time.perf_counter()
 
             elapsed_ms = (end_time - start_time) * 1000
@@ -189,11 +282,26 @@ def main():
 
             if games_solved % 1000 == 0:
                 print(f"Solved {games_solved}/{total_games} | Agg: {total_aggregated} | Time: {elapsed_ms:.3f} ms")
-        logf.write(f"{total_aggregated}/{games_solved}")
+            if checkpoint.due():
+                save_progress()
+
+    if args.shard is not None:
+        write_partial(result_file, {
+            "input_file": args.input_file, "input_sha256": checkpoint.digest, "results_file": log_file,
+            "solver": args.solver, "solver_version": solver_version(solver_path),
+            "free": free, "scale_bits": scale_bits, "total": total_games,
+            "game": "energy", "shard": list(args.shard), "range": [first_index, stop_index],
+            "wins": total_aggregated, "games": games_solved, "time_ms": total_time_ms})
+    else:
+        with open(log_file, "w") as logf:
+            logf.write(f"{total_aggregated << scale_bits}/{games_solved << scale_bits}")
+        if run is not None:
+            run.finish(total_aggregated, games_solved, total_time_ms, scale_bits=scale_bits)
+    checkpoint.clear()
 
-    print(f"\n All results saved to {log_file}")
+    print(f"\n All results saved to {result_file}")
     print(f"Total games solved: {games_solved}/{total_games}")
-    print(f"Total aggregated value: {total_aggregated}")
+    print(f"Total aggregated value: {total_aggregated << scale_bits}/{games_solved << scale_bits}")
     print(f"Total solver time: {total_time_ms:.3f} ms")
     if games_solved > 0:
         print(f"Average per game: {total_time_ms / games_solved:.3f} ms")
@@ -1,17 +1,37 @@
 import re
 import argparse
-import itertools
+import inspect
 import os
-import subprocess
 import time
 from collections import deque
+from multiprocessing import Pool
+
+from arena_cache import KIND_DOT, load_arena
+from attractor import enumeration_lanes
+from checkpoint import Checkpoint, checkpoint_path
+from dot_template import DotTemplate, run_csv_solver
+from enumeration import branch_and_bound, branching_order, gray_code_flips, product_bit_strings, split_range
+from lasso import highest_cycle_parities
+from reduction import free_vertices, prune_parity_game, write_parity_dot
+from results_db import Run
+from shards import parse_shard, partial_path, shard_range, solver_version, write_partial
+from solver_worker import SolverWorker, winner_regions
+from zielonka import ParityArena
+
+PRIORITY_PROMOTION_SOLVER = "../ggg/build/solvers/parity/priority_promotion/priority_promotion_solver"
 
 def read_graph(dot_file):
     """
     Parse the DOT file and return:
       - vertices: dict of {vertex_name: priority}
       - edges: adjacency list {vertex: [neighbors]}
+    Read from the binary arena cache instead if the file has been converted
+    (cache-arenas.py).
     """
+    cached = load_arena(dot_file, KIND_DOT)
+    if cached is not None:
+        return cached.parity_graph()
+
     vertex_pattern = re.compile(
         r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
     )
@@ -47,27 +67,7 @@ def find_lasso_highest_priority(vertices, edges, parity=0):
     parity = 0 for even, 1 for odd.
     Returns True if such a lasso exists.
     """
-    stack = [("v0", [])]  # (current_vertex, path_so_far)
-
-    while stack:
-        current, path = stack.pop()
-
-        if current in path:
-            # Found a cycle: cycle = path from first occurrence to end
-            cycle_start = path.index(current)
-            cycle = path[cycle_start:] + [current]
-
-            # Highest priority in the cycle
-            max_priority = max(vertices[v] for v in cycle)
-            if max_priority % 2 == parity:
-                return True
-            continue
-
-        new_path = path + [current]
-        for neighbor in edges.get(current, []):
-            stack.append((neighbor, new_path))
-
-    return False
+    return parity in highest_cycle_parities(vertices, edges)
 
 
 # ----------------------------
@@ -81,30 +81,6 @@ def v0_lasso_odd(vertices, edges):
     """Check if there exists a lasso reachable from v0 with cycle's highest priority odd."""
     return find_lasso_highest_priority(vertices, edges, parity=1)
 
-def replace_players_in_dot(dot_file, output_file, bit_string):
-    """Replace player assignments in DOT file according to bit_string."""
-    vertex_pattern = re.compile(
-        r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
-    )
-
-    with open(dot_file, "r") as f:
-        lines = f.readlines()
-
-    updated_lines = []
-    for line in lines:
-        match = vertex_pattern.match(line.strip())
-        if match:
-            vertex_name = match.group("vertex")
-            vertex_index = int(vertex_name[1:])
-            new_player = bit_string[vertex_index]
-            new_line = re.sub(r'player=\d+', f'player={new_player}', line)
-            updated_lines.append(new_line)
-        else:
-            updated_lines.append(line)
-
-    with open(output_file, "w") as f:
-        f.writelines(updated_lines)
-
 def parse_solver_csv(output):
     """
     Parse solver output in CSV mode.
@@ -120,19 +96,105 @@ def parse_solver_csv(output):
                 return 1 if third == "0" else 0
     return 0
 
+def parse_solver_regions(output):
+    """
+    Parse solver output in CSV mode into {vertex_name: winning_player}.
+    Rows look like 'v3,1,0,v7,0.012' (vertex, player, winning_player, ...).
+    """
+    regions = {}
+    for line in output.splitlines():
+        parts = line.split(",")
+        if len(parts) >= 3 and parts[0].startswith("v") and parts[2].strip() in ("0", "1"):
+            regions[parts[0]] = int(parts[2])
+    return regions
+
+def run_priority_promotion(template, output_file, bit_string):
+    """Solve one assignment with the ggg priority promotion solver and return its CSV output."""
+    return run_csv_solver(PRIORITY_PROMOTION_SOLVER, template, output_file, bit_string)
+
+def count_range(task):
+    """
+    Pool worker: count the assignments start .. stop - 1 (product order over
+    the free vertices) under which player 0 wins v0. Returns
+    (wins, games, solver time in ms).
+    """
+    solver, dot_file, scratch, vertices, edges, free, start, stop, block_size, use_worker = task
+    scratch_file = f"{scratch}_{os.getpid()}.dot"
+    n = len(vertices)
+    wins = 0
+    start_time = time.perf_counter()
+    if solver == "bitsliced":
+        arena = ParityArena(vertices, edges)
+        for block_start in range(start, stop, block_size):
+            count = min(block_size, stop - block_start)
+            wins += int(arena.v0_wins_lanes(enumeration_lanes(n, block_start, count, free), count).sum())
+    elif use_worker:
+        with SolverWorker(PRIORITY_PROMOTION_SOLVER, dot_file) as worker:
+            solved = worker.solve_many(product_bit_strings(n, free, start, stop))
+            wins = sum(1 for _, winners in solved if winners[0] == "0")
+    else:
+        template = DotTemplate(dot_file)
+        wins = sum(parse_solver_csv(run_priority_promotion(template, scratch_file, b))
+                   for b in product_bit_strings(n, free, start, stop))
+    return wins, stop - start, (time.perf_counter() - start_time) * 1000
+
 def main():
     parser = argparse.ArgumentParser(description="Analyze ParityGame DOT file and run solver.")
     parser.add_argument("input_file", help="Path to the input DOT file.")
     parser.add_argument("output_file", help="Path to save the modified DOT file.")
+    parser.add_argument("--solver", choices=("bitsliced", "ggg"), default="bitsliced",
+                        help="Solve blocks of assignments with the bit-sliced Zielonka solver in-process "
+                             "(bitsliced), or every assignment with priority_promotion_solver (ggg).")
+    parser.add_argument("--block-size", type=int, default=1 << 16,
+                        help="Assignments per bit-sliced Zielonka pass.")
+    parser.add_argument("--gray-code", action="store_true",
+                        help="Walk assignments in Gray-code order and reuse the previous solution "
+                             "whenever the flipped vertex is already won by its new owner (ggg solver "
+                             "only; the bit-sliced solver is faster solving whole blocks).")
+    parser.add_argument("--branch-and-bound", action="store_true",
+                        help="Fix owners one vertex at a time in BFS order from v0 and count every "
+                             "subtree at once whose lower and upper bound games agree on v0.")
+    parser.add_argument("--worker", action="store_true",
+                        help="Keep one solver process running in batch mode instead of starting it "
+                             "for every assignment.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Split the assignments into contiguous ranges solved by this many processes.")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="Enumerate owners of vertices unreachable from v0 as well.")
+    parser.add_argument("--no-reduce", action="store_true",
+                        help="Enumerate owners of single-successor and always-decided vertices as well.")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="Enumerate only the i-th of k contiguous slices of the assignments (i/k, "
+                             "0 <= i < k) and write a partial result for merge-shards.py.")
+    parser.add_argument("--db", default=None,
+                        help="Also record the result in this SQLite results database (see results_db.py).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (not with --gray-code or "
+                             "--branch-and-bound).")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="Seconds between progress checkpoints.")
     args = parser.parse_args()
+    if args.db is not None and args.shard is not None:
+        parser.error("--db records complete runs; pass it to merge-shards.py instead of the shards")
+    if args.gray_code and args.solver != "ggg":
+        parser.error("--gray-code saves per-assignment solver calls; use it with --solver ggg")
+    if args.workers > 1 and (args.gray_code or args.branch_and_bound):
+        parser.error("--workers cannot be combined with --gray-code or --branch-and-bound")
+    if args.resume and (args.gray_code or args.branch_and_bound):
+        parser.error("--resume cannot be combined with --gray-code or --branch-and-bound")
+    if args.shard is not None and (args.gray_code or args.branch_and_bound):
+        parser.error("--shard cannot be combined with --gray-code or --branch-and-bound")
 
     # --- Graph Analysis ---
     vertices, edges = read_graph(args.input_file)
 
-    v0_has_even_cycle = v0_lasso_even(vertices, edges)
+    # Both screens come from one pass over the priorities
+    cycle_parities = highest_cycle_parities(vertices, edges)
+
+    v0_has_even_cycle = 0 in cycle_parities
     print(f"v0 can reach a simple cycle with highest priority even: {v0_has_even_cycle}")
 
-    v0_has_odd_cycle = v0_lasso_odd(vertices, edges)
+    v0_has_odd_cycle = 1 in cycle_parities
     print(f"All simple cycles reachable from v0 have highest priority even: {v0_has_odd_cycle}")
 
     # --- Early Termination Condition ---
@@ -141,41 +203,177 @@ def main():
               "or all simple cycles reachable from v0 have highest priority even.")
         return
 
-    # --- Player Assignment Iteration ---
+    # --- Restrict to the arena reachable from v0 ---
+    dot_file = args.input_file
+    scale_bits = 0
+    if not args.no_prune:
+        vertices, edges, scale_bits = prune_parity_game(vertices, edges)
+        if scale_bits:
+            dot_file = f"{os.path.splitext(args.output_file)[0]}_pruned.dot"
+            write_parity_dot(dot_file, vertices, edges)
+            print(f"Pruned {scale_bits} vertices unreachable from v0.")
+    # The ggg solver reads the DOT text; the in-process solver only needs the parsed graph
+    template = DotTemplate(dot_file) if args.solver == "ggg" else None
+    arena = ParityArena(vertices, edges)
+    worker = SolverWorker(PRIORITY_PROMOTION_SOLVER, dot_file) if args.worker and args.solver == "ggg" else None
+
+    def solve_assignment(bit_string):
+        """Return {vertex_name: winning_player} for one assignment."""
+        if args.solver == "bitsliced":
+            return dict(zip(arena.names, arena.regions(bit_string)))
+        if worker is not None:
+            return winner_regions(worker.solve(bit_string))
+        return parse_solver_regions(run_priority_promotion(template, args.output_file, bit_string))
+
     n = len(vertices)
-    total_games = 2 ** n
-    print(f"Detected {n} vertices. Iterating all {total_games} player assignments...")
+
+    # --- Fix owners that cannot influence v0 ---
+    free = list(range(n))
+    if not args.no_reduce:
+        def solve_regions(owners):
+            regions = solve_assignment("".join(map(str, owners)))
+            return [regions.get(f"v{i}") for i in range(n)]
+
+        successors = [[int(t[1:]) for t in edges[f"v{i}"]] for i in range(n)]
+        free, v0_winner = free_vertices(n, successors, solve_regions)
+        if v0_winner is not None:
+            print(f"v0 is won by player {v0_winner} under every assignment.")
+            free = []
+        print(f"Fixed {n - len(free)} owner-irrelevant vertices.")
+    scale_bits += n - len(free)
+
+    # --- Player Assignment Iteration ---
+    k = len(free)
+    total_games = 2 ** k
+    print(f"Detected {n} vertices. Iterating all {total_games} player assignments "
+          f"over {k} free vertices (counts scaled by 2^{scale_bits})...")
 
     # Prepare log file for this input DOT file
     log_file = f"{os.path.splitext(args.input_file)[0]}_results.txt"
     total_aggregated = 0
     total_time_ms = 0.0
     games_solved = 0  # Counter for games solved
-
-    with open(log_file, "w") as logf:
-        for bits in itertools.product("01", repeat=n):
-            bit_string = "".join(bits)
-
-            # Replace players
-            replace_players_in_dot(args.input_file, args.output_file, bit_string)
-
-            # Time the solver call
+    reused = 0  # Gray-code steps answered without calling the solver
+    evaluations = 0  # Bound games solved by branch-and-bound
+
+    # --- Shard: this run covers assignments first_index .. stop_index - 1 ---
+    first_index, stop_index = (0, total_games) if args.shard is None else shard_range(total_games, args.shard)
+    result_file = log_file if args.shard is None else partial_path(log_file, args.shard)
+    if args.shard is not None:
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: assignments {first_index} .. {stop_index - 1}.")
+
+    # --- Checkpoint: assignments first_index .. first_index + games_solved - 1 are done ---
+    checkpoint = Checkpoint(checkpoint_path(result_file), args.input_file,
+                            {"free": free, "prune": not args.no_prune, "reduce": not args.no_reduce,
+                             "shard": args.shard},
+                            args.checkpoint_interval)
+    solver_path = PRIORITY_PROMOTION_SOLVER if args.solver == "ggg" else inspect.getfile(ParityArena)
+    try:
+        progress = checkpoint.load() if args.resume else None
+    except ValueError as e:
+        parser.error(str(e))
+    if progress is not None:
+        games_solved, total_aggregated, total_time_ms = progress["next"], progress["wins"], progress["time_ms"]
+        print(f"Resuming after {games_solved}/{total_games} assignments.")
+    run = None
+    if args.db is not None:
+        run = Run(args.db, args.input_file, checkpoint.digest, "parity", "exact", solver=args.solver,
+                  run_id=progress.get("run_id") if progress is not None else None)
+
+    def save_progress():
+        checkpoint.save({"next": games_solved, "wins": total_aggregated, "time_ms": total_time_ms,
+                         "run_id": run.id if run is not None else None})
+
+    if args.workers > 1:
+        # Contiguous ranges, several per worker so that checkpoints
+        # advance; results come back in order, so a prefix is done
+        scratch = os.path.splitext(args.output_file)[0]
+        first = first_index + games_solved
+        tasks = [(args.solver, dot_file, scratch, vertices, edges, free,
+                  first + start, first + stop, args.block_size, args.worker)
+                 for start, stop in split_range(stop_index - first, args.workers * 16)]
+        with Pool(processes=args.workers) as pool:
+            for wins, count, elapsed_ms in pool.imap(count_range, tasks):
+                total_aggregated += wins
+                games_solved += count
+                total_time_ms += elapsed_ms
+                print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games}")
+                if checkpoint.due():
+                    save_progress()
+    elif args.branch_and_bound:
+        def v0_wins(owners):
+            nonlocal total_time_ms
+            start_time = time.perf_counter()
+            regions = solve_assignment("".join(map(str, owners)))
+            end_time = time.perf_counter()
+            total_time_ms += (end_time - start_time) * 1000
+            return 1 if regions.get("v0") == 0 else 0
+
+        total_aggregated, evaluations = branch_and_bound(n, branching_order(edges, free), v0_wins)
+        games_solved = total_games
+    elif args.gray_code:
+        # Handing a vertex to the player who already wins it changes
+        # neither winning region: the winner's strategy keeps working
+        # and the loser's region never contains that vertex. Only the
+        # other flips need a fresh solve.
+        owners = [0] * n
+        regions = None
+        flips = gray_code_flips(k)
+        flipped = None
+        while True:
+            if regions is not None and regions.get(f"v{flipped}") == owners[flipped]:
+                reused += 1
+            else:
+                bit_string = "".join(map(str, owners))
+                start_time = time.perf_counter()
+                regions = solve_assignment(bit_string)
+                end_time = time.perf_counter()
+                total_time_ms += (end_time - start_time) * 1000
+
+            total_aggregated += 1 if regions.get("v0") == 0 else 0
+            games_solved += 1
+            if games_solved % 1000 == 0:
+                print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games} "
+                      f"(reused {reused})")
+
+            step = next(flips, None)
+            if step is None:
+                break
+            flipped = free[step]
+            owners[flipped] ^= 1
+    elif args.solver == "bitsliced":
+        for block_start in range(first_index + games_solved, stop_index, args.block_size):
+            count = min(args.block_size, stop_index - block_start)
+
+            # One Zielonka pass resolves the whole block of assignments
             start_time = time.perf_counter()
-            try:
-                solver_output = subprocess.check_output([
-                    "../ggg/build/solvers/parity/priority_promotion/priority_promotion_solver",
-                    "-i", args.output_file,
-                    "--csv"
-                ], text=True)
-            except subprocess.CalledProcessError as e:
-                solver_output = f"Solver error: {e}"
+            wins = arena.v0_wins_lanes(enumeration_lanes(n, block_start, count, free), count)
+            end_time = time.perf_counter()
+            total_time_ms += (end_time - start_time) * 1000
+
+            total_aggregated += int(wins.sum())
+            games_solved += count
+            print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games}")
+            if checkpoint.due():
+                save_progress()
+    else:
+        bit_strings = product_bit_strings(n, free, first_index + games_solved, stop_index)
+        if worker is not None:
+            # Requests are pipelined, so the time is taken per answer received
+            solved = ((b, winner_regions(w)) for b, w in worker.solve_many(bit_strings))
+        else:
+            solved = ((b, solve_assignment(b)) for b in bit_strings)
+
+        # Time the solver calls
+        start_time = time.perf_counter()
+        for bit_string, regions in solved:
             end_time = time.perf_counter()
 
             elapsed_ms = (end_time - start_time) * 1000
             total_time_ms += elapsed_ms
 
-            # Parse solver CSV output for aggregation
-            agg_value = parse_solver_csv(solver_output)
+            # Aggregate the winner of v0
+            agg_value = 1 if regions.get("v0") == 0 else 0
             total_aggregated += agg_value
 
             # Update counter
@@ -196,13 +394,36 @@ def main():
             # print(f"Solved game #{games_solved}/{total_games} | "
                 #   f"Bit string: {bit_string} | Time: {elapsed_ms:.3f} ms | Aggregated: {agg_value}")
             print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games} \n")
-        logf.write(f"{total_aggregated}/{games_solved}") 
-        
-    print(f"\nAll results saved to {log_file}")
+            if checkpoint.due():
+                save_progress()
+            start_time = time.perf_counter()
+
+    if args.shard is not None:
+        write_partial(result_file, {
+            "input_file": args.input_file, "input_sha256": checkpoint.digest, "results_file": log_file,
+            "solver": args.solver, "solver_version": solver_version(solver_path),
+            "free": free, "scale_bits": scale_bits, "total": total_games,
+            "game": "parity", "shard": list(args.shard), "range": [first_index, stop_index],
+            "wins": total_aggregated, "games": games_solved, "time_ms": total_time_ms})
+    else:
+        with open(log_file, "w") as logf:
+            logf.write(f"{total_aggregated << scale_bits}/{games_solved << scale_bits}")
+        if run is not None:
+            run.finish(total_aggregated, games_solved, total_time_ms, scale_bits=scale_bits)
+    checkpoint.clear()
+
+    if worker is not None:
+        worker.close()
+
+    print(f"\nAll results saved to {result_file}")
     print(f"Total games solved: {games_solved}/{total_games}")
-    print(f"Total aggregated value: {total_aggregated}")
+    print(f"Total aggregated value: {total_aggregated << scale_bits}/{games_solved << scale_bits}")
     print(f"Total Python-measured solver time: {total_time_ms:.3f} ms")
-    print(f"Average time per configuration: {total_time_ms / games_solved:.3f} ms")
+    print(f"Average time per configuration: {total_time_ms / max(games_solved, 1):.3f} ms")
+    if args.branch_and_bound:
+        print(f"Bound games solved by branch-and-bound: {evaluations}/{games_solved}")
+    elif args.gray_code:
+        print(f"Solver calls saved by Gray-code reuse: {reused}/{games_solved}")
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,39 @@
 import re
 import argparse
+import inspect
 import itertools
 import os
-import subprocess
 import time
 from collections import deque
+from fractions import Fraction
+from multiprocessing import Pool
+
+from arena_cache import KIND_DOT, load_arena
+from attractor import IncrementalAttractor, ReachabilityArena, enumeration_lanes
+from bdd import BDD, FALSE
+from checkpoint import Checkpoint, checkpoint_path
+from dot_template import DotTemplate, run_csv_solver
+from enumeration import branch_and_bound, branching_order, gray_code_flips, product_bit_strings, split_range
+from lasso import find_lasso
+from reduction import expand_owners, free_vertices, prune_parity_game, write_parity_dot
+from results_db import Run
+from shards import parse_shard, partial_path, shard_range, solver_version, write_partial
+from solver_worker import SolverWorker
+
+GGG_REACHABILITY = "../ggg/build/solvers/parity/reachability/ggg_reachability"
 
 def read_graph(dot_file):
     """
     Parse the DOT file and return:
       - vertices: dict of {vertex_name: priority}
       - edges: adjacency list {vertex: [neighbors]}
+    Read from the binary arena cache instead if the file has been converted
+    (cache-arenas.py).
     """
+    cached = load_arena(dot_file, KIND_DOT)
+    if cached is not None:
+        return cached.parity_graph()
+
     vertex_pattern = re.compile(
         r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
     )
@@ -93,63 +115,25 @@ def v0_reaches_only_priority0(vertices, edges):
 
     return True
 
+def priority0_lasso(vertices, edges):
+    """
+    Return a lasso (stem, cycle) from v0 on which every vertex has
+    priority 0, or None. Linear time via the SCCs of the priority-0
+    subgraph reachable from v0.
+    """
+    priority0 = {v for v, priority in vertices.items() if priority == 0}
+    return find_lasso(edges, "v0", priority0)
+
 def has_full_priority0_lasso(vertices, edges):
     """
     Check if there is a lasso-like path starting from v0 such that
     every vertex along the path and in the cycle has priority 0.
     Returns True if such a lasso exists, otherwise False.
     """
-    if "v0" not in vertices or vertices["v0"] != 0:
-        return False
-
-    stack = [("v0", [])]  # (current_vertex, path_from_v0)
-
-    while stack:
-        current, path = stack.pop()
-
-        # Check priority along the path
-        if vertices.get(current, -1) != 0:
-            continue  # skip this path; violates priority-0 requirement
-
-        # Cycle detection
-        if current in path:
-            cycle = path[path.index(current):] + [current]
-            # entire path + cycle already guaranteed priority 0 by previous checks
-            return True
-
-        new_path = path + [current]
-
-        for neighbor in edges.get(current, []):
-            stack.append((neighbor, new_path))
-
-    return False
+    return priority0_lasso(vertices, edges) is not None
 # ------------------------------------------------
 
 
-def replace_players_in_dot(dot_file, output_file, bit_string):
-    """Replace player assignments in DOT file according to bit_string."""
-    vertex_pattern = re.compile(
-        r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
-    )
-
-    with open(dot_file, "r") as f:
-        lines = f.readlines()
-
-    updated_lines = []
-    for line in lines:
-        match = vertex_pattern.match(line.strip())
-        if match:
-            vertex_name = match.group("vertex")
-            vertex_index = int(vertex_name[1:])
-            new_player = bit_string[vertex_index]
-            new_line = re.sub(r'player=\d+', f'player={new_player}', line)
-            updated_lines.append(new_line)
-        else:
-            updated_lines.append(line)
-
-    with open(output_file, "w") as f:
-        f.writelines(updated_lines)
-
 def parse_solver_csv(output):
     """
     Parse solver output in CSV mode.
@@ -165,11 +149,85 @@ def parse_solver_csv(output):
                 return 1 if third == "0" else 0
     return 0
 
+def run_ggg_reachability(template, output_file, bit_string):
+    """Solve one assignment with the ggg_reachability binary; return 1 if v0 is won by player 0."""
+    return parse_solver_csv(run_csv_solver(GGG_REACHABILITY, template, output_file, bit_string))
+
+def count_range(task):
+    """
+    Pool worker: count the assignments start .. stop - 1 (product order over
+    the free vertices) under which player 0 wins v0. Returns
+    (wins, games, solver time in ms).
+    """
+    solver, dot_file, scratch, vertices, edges, free, start, stop, block_size, use_worker = task
+    scratch_file = f"{scratch}_{os.getpid()}.dot"
+    n = len(vertices)
+    wins = 0
+    start_time = time.perf_counter()
+    if solver == "bitsliced":
+        arena = ReachabilityArena(vertices, edges)
+        for block_start in range(start, stop, block_size):
+            count = min(block_size, stop - block_start)
+            wins += int(arena.v0_wins_lanes(enumeration_lanes(n, block_start, count, free), count).sum())
+    elif solver == "python":
+        arena = ReachabilityArena(vertices, edges)
+        wins = sum(arena.v0_wins(b) for b in product_bit_strings(n, free, start, stop))
+    elif use_worker:
+        with SolverWorker(GGG_REACHABILITY, dot_file) as worker:
+            solved = worker.solve_many(product_bit_strings(n, free, start, stop))
+            wins = sum(1 for _, winners in solved if winners[0] == "0")
+    else:
+        template = DotTemplate(dot_file)
+        wins = sum(run_ggg_reachability(template, scratch_file, b) for b in product_bit_strings(n, free, start, stop))
+    return wins, stop - start, (time.perf_counter() - start_time) * 1000
+
 def main():
     parser = argparse.ArgumentParser(description="Analyze ParityGame DOT file and run solver.")
     parser.add_argument("input_file", help="Path to the input DOT file.")
     parser.add_argument("output_file", help="Path to save the modified DOT file.")
+    parser.add_argument("--solver", choices=("bitsliced", "incremental", "branch-and-bound", "bdd", "python", "ggg"),
+                        default="bitsliced",
+                        help="Solve blocks of assignments bit-sliced in-process (bitsliced), walk them in "
+                             "Gray-code order repairing one attractor (incremental), count whole subtrees "
+                             "of partial assignments whose winner is already fixed (branch-and-bound), "
+                             "compile the winner of v0 into a BDD and count its models (bdd), "
+                             "solve them one at a time in-process (python) or with the ggg_reachability binary.")
+    parser.add_argument("--block-size", type=int, default=1 << 20,
+                        help="Assignments per bit-sliced fixpoint pass.")
+    parser.add_argument("--cross-check", action="store_true",
+                        help="Solve every assignment with both backends and abort on disagreement.")
+    parser.add_argument("--worker", action="store_true",
+                        help="Keep one ggg_reachability process running in batch mode instead of "
+                             "starting it for every assignment.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Split the assignments into contiguous ranges solved by this many processes "
+                             "(bitsliced, python and ggg solvers).")
+    parser.add_argument("--p1-probability", type=Fraction, default=Fraction(1, 2),
+                        help="Probability that a vertex belongs to player 1, e.g. 1/3 (bdd solver only).")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="Enumerate owners of vertices unreachable from v0 as well.")
+    parser.add_argument("--no-reduce", action="store_true",
+                        help="Enumerate owners of single-successor and always-decided vertices as well.")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="Enumerate only the i-th of k contiguous slices of the assignments (i/k, "
+                             "0 <= i < k) and write a partial result for merge-shards.py.")
+    parser.add_argument("--db", default=None,
+                        help="Also record the result in this SQLite results database (see results_db.py).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (bitsliced, python and ggg solvers).")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="Seconds between progress checkpoints.")
     args = parser.parse_args()
+    if args.db is not None and args.shard is not None:
+        parser.error("--db records complete runs; pass it to merge-shards.py instead of the shards")
+    if args.p1_probability != Fraction(1, 2) and args.solver != "bdd":
+        parser.error("--p1-probability requires --solver bdd")
+    if args.workers > 1 and (args.solver not in ("bitsliced", "python", "ggg") or args.cross_check):
+        parser.error("--workers supports the bitsliced, python and ggg solvers without --cross-check")
+    if args.resume and args.solver not in ("bitsliced", "python", "ggg"):
+        parser.error("--resume supports the bitsliced, python and ggg solvers")
+    if args.shard is not None and args.solver not in ("bitsliced", "python", "ggg"):
+        parser.error("--shard supports the bitsliced, python and ggg solvers")
 
     # --- Graph Analysis ---
     vertices, edges = read_graph(args.input_file)
@@ -186,10 +244,43 @@ def main():
               "or there is no priority-0-only lasso path from v0.")
         return
 
-    # --- Player Assignment Iteration ---
+    # --- Restrict to the arena reachable from v0 ---
+    dot_file = args.input_file
+    scale_bits = 0
+    if not args.no_prune:
+        vertices, edges, scale_bits = prune_parity_game(vertices, edges)
+        if scale_bits:
+            dot_file = f"{os.path.splitext(args.output_file)[0]}_pruned.dot"
+            write_parity_dot(dot_file, vertices, edges)
+            print(f"Pruned {scale_bits} vertices unreachable from v0.")
+    # The ggg solver reads the DOT text; the in-process solvers only need the parsed graph
+    template = DotTemplate(dot_file) if args.solver == "ggg" or args.cross_check else None
+    # Parallel runs start one worker per process instead
+    worker = SolverWorker(GGG_REACHABILITY, dot_file) if args.worker and args.workers == 1 else None
+
+    def solve_ggg(bit_string):
+        if worker is not None:
+            return 1 if worker.solve(bit_string)[0] == "0" else 0
+        return run_ggg_reachability(template, args.output_file, bit_string)
+
     n = len(vertices)
-    total_games = 2 ** n
-    print(f"Detected {n} vertices. Iterating all {total_games} player assignments...")
+    arena = ReachabilityArena(vertices, edges)
+
+    # --- Fix owners that cannot influence v0 ---
+    free = list(range(n))
+    if not args.no_reduce:
+        free, v0_winner = free_vertices(n, arena.successors, arena.regions)
+        if v0_winner is not None:
+            print(f"v0 is won by player {v0_winner} under every assignment.")
+            free = []
+        print(f"Fixed {n - len(free)} owner-irrelevant vertices.")
+    scale_bits += n - len(free)
+
+    # --- Player Assignment Iteration ---
+    k = len(free)
+    total_games = 2 ** k
+    print(f"Detected {n} vertices. Iterating all {total_games} player assignments "
+          f"over {k} free vertices (counts scaled by 2^{scale_bits})...")
 
     # Prepare log file for this input DOT file
     log_file = f"{os.path.splitext(args.input_file)[0]}_results.txt"
@@ -197,30 +288,167 @@ def main():
     total_time_ms = 0.0
     games_solved = 0  # Counter for games solved
 
-    with open(log_file, "w") as logf:
-        for bits in itertools.product("01", repeat=n):
-            bit_string = "".join(bits)
-
-            # Replace players
-            replace_players_in_dot(args.input_file, args.output_file, bit_string)
+    # --- Shard: this run covers assignments first_index .. stop_index - 1 ---
+    first_index, stop_index = (0, total_games) if args.shard is None else shard_range(total_games, args.shard)
+    result_file = log_file if args.shard is None else partial_path(log_file, args.shard)
+    if args.shard is not None:
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: assignments {first_index} .. {stop_index - 1}.")
+
+    # --- Checkpoint: assignments first_index .. first_index + games_solved - 1 are done ---
+    checkpoint = Checkpoint(checkpoint_path(result_file), args.input_file,
+                            {"free": free, "prune": not args.no_prune, "reduce": not args.no_reduce,
+                             "shard": args.shard},
+                            args.checkpoint_interval)
+    solver_path = GGG_REACHABILITY if args.solver == "ggg" else inspect.getfile(ReachabilityArena)
+    try:
+        progress = checkpoint.load() if args.resume else None
+    except ValueError as e:
+        parser.error(str(e))
+    if progress is not None:
+        games_solved, total_aggregated, total_time_ms = progress["next"], progress["wins"], progress["time_ms"]
+        print(f"Resuming after {games_solved}/{total_games} assignments.")
+    run = None
+    if args.db is not None:
+        run = Run(args.db, args.input_file, checkpoint.digest, "reach", "exact", solver=args.solver,
+                  run_id=progress.get("run_id") if progress is not None else None)
+
+    def save_progress():
+        checkpoint.save({"next": games_solved, "wins": total_aggregated, "time_ms": total_time_ms,
+                         "run_id": run.id if run is not None else None})
+
+    if args.workers > 1:
+        # Contiguous ranges, several per worker so that checkpoints
+        # advance; results come back in order, so a prefix is done
+        scratch = os.path.splitext(args.output_file)[0]
+        first = first_index + games_solved
+        tasks = [(args.solver, dot_file, scratch, vertices, edges, free,
+                  first + start, first + stop, args.block_size, args.worker)
+                 for start, stop in split_range(stop_index - first, args.workers * 16)]
+        with Pool(processes=args.workers) as pool:
+            for wins, count, elapsed_ms in pool.imap(count_range, tasks):
+                total_aggregated += wins
+                games_solved += count
+                total_time_ms += elapsed_ms
+                print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games}")
+                if checkpoint.due():
+                    save_progress()
+    elif args.solver == "bitsliced":
+        for block_start in range(first_index + games_solved, stop_index, args.block_size):
+            count = min(args.block_size, stop_index - block_start)
 
-            # Time the solver call
+            # One fixpoint pass resolves the whole block of assignments
             start_time = time.perf_counter()
-            try:
-                solver_output = subprocess.check_output([
-                    "../ggg/build/solvers/parity/reachability/ggg_reachability",
-                    "-i", args.output_file,
-                    "--csv"
-                ], text=True)
-            except subprocess.CalledProcessError as e:
-                solver_output = f"Solver error: {e}"
+            wins = arena.v0_wins_lanes(enumeration_lanes(n, block_start, count, free), count)
+            end_time = time.perf_counter()
+            total_time_ms += (end_time - start_time) * 1000
+
+            if args.cross_check:
+                for offset in range(count):
+                    bits = format(block_start + offset, f"0{k}b")
+                    bit_string = "".join(map(str, expand_owners(free, bits, n)))
+                    other_value = solve_ggg(bit_string)
+                    if other_value != wins[offset]:
+                        raise RuntimeError(f"Solver mismatch on {bit_string}: "
+                                           f"bitsliced={int(wins[offset])}, other={other_value}")
+
+            total_aggregated += int(wins.sum())
+            games_solved += count
+            print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games}")
+            if checkpoint.due():
+                save_progress()
+    elif args.solver == "incremental":
+        # Consecutive Gray-code assignments differ in one owner, so the
+        # attractor is repaired around the flipped vertex instead of rebuilt.
+        start_time = time.perf_counter()
+        incremental = IncrementalAttractor(arena, [0] * n)
+        flips = gray_code_flips(k)
+        while True:
+            agg_value = incremental.v0_wins()
+
+            if args.cross_check:
+                bit_string = "".join(map(str, incremental.owners))
+                other_value = solve_ggg(bit_string)
+                if other_value != agg_value:
+                    raise RuntimeError(f"Solver mismatch on {bit_string}: "
+                                       f"incremental={agg_value}, other={other_value}")
+
+            total_aggregated += agg_value
+            games_solved += 1
+            if games_solved % 100000 == 0:
+                print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games}")
+
+            flipped = next(flips, None)
+            if flipped is None:
+                break
+            incremental.flip(free[flipped])
+        total_time_ms += (time.perf_counter() - start_time) * 1000
+    elif args.solver == "branch-and-bound":
+        def v0_wins(owners):
+            agg_value = arena.v0_wins(owners)
+            if args.cross_check:
+                bit_string = "".join(map(str, owners))
+                other_value = solve_ggg(bit_string)
+                if other_value != agg_value:
+                    raise RuntimeError(f"Solver mismatch on {bit_string}: "
+                                       f"python={agg_value}, other={other_value}")
+            return agg_value
+
+        start_time = time.perf_counter()
+        total_aggregated, evaluations = branch_and_bound(n, branching_order(edges, free), v0_wins)
+        total_time_ms += (time.perf_counter() - start_time) * 1000
+        games_solved = total_games
+        print(f"Branch-and-bound solved {evaluations} bound games for {total_games} assignments.")
+    elif args.solver == "bdd":
+        # One BDD variable per free vertex, in BFS order from v0
+        start_time = time.perf_counter()
+        order = branching_order(edges, free)
+        bdd = BDD(k)
+        owner_nodes = [FALSE] * n
+        for i, v in enumerate(order):
+            owner_nodes[v] = bdd.var(i)
+        v0_diagram = arena.attractor_symbolic(bdd, owner_nodes)[0]
+        total_aggregated = bdd.count(v0_diagram)
+        probability = bdd.probability(v0_diagram, args.p1_probability)
+        total_time_ms += (time.perf_counter() - start_time) * 1000
+        games_solved = total_games
+        print(f"BDD of v0 has {bdd.size(v0_diagram)} nodes over {k} variables.")
+
+        if args.cross_check:
+            for bits in itertools.product("01", repeat=k):
+                owners = expand_owners(free, bits, n)
+                bit_string = "".join(map(str, owners))
+                agg_value = int(bdd.evaluate(v0_diagram, [owners[v] for v in order]))
+                other_value = solve_ggg(bit_string)
+                if other_value != agg_value:
+                    raise RuntimeError(f"Solver mismatch on {bit_string}: "
+                                       f"bdd={agg_value}, other={other_value}")
+    else:
+        bit_strings = product_bit_strings(n, free, first_index + games_solved, stop_index)
+        if args.solver == "ggg" and worker is not None:
+            # Requests are pipelined, so the time is taken per answer received
+            solved = ((b, 1 if w[0] == "0" else 0) for b, w in worker.solve_many(bit_strings))
+        elif args.solver == "ggg":
+            solved = ((b, solve_ggg(b)) for b in bit_strings)
+        else:
+            solved = ((b, arena.v0_wins(b)) for b in bit_strings)
+
+        # Time the solver calls
+        start_time = time.perf_counter()
+        for bit_string, agg_value in solved:
             end_time = time.perf_counter()
 
             elapsed_ms = (end_time - start_time) * 1000
             total_time_ms += elapsed_ms
 
-            # Parse solver CSV output for aggregation
-            agg_value = parse_solver_csv(solver_output)
+            if args.cross_check:
+                if args.solver == "ggg":
+                    other_value = arena.v0_wins(bit_string)
+                else:
+                    other_value = solve_ggg(bit_string)
+                if other_value != agg_value:
+                    raise RuntimeError(f"Solver mismatch on {bit_string}: "
+                                       f"{args.solver}={agg_value}, other={other_value}")
+
             total_aggregated += agg_value
 
             # Update counter
@@ -242,13 +470,43 @@ def main():
                 #   f"Bit string: {bit_string} | Time: {elapsed_ms:.3f} ms | Aggregated: {agg_value}")
             if games_solved % 1000 == 0:
                 print(f"Agg winning/agg games/total games/: {total_aggregated}, {games_solved}, {total_games}")
-        logf.write(f"{total_aggregated}/{games_solved}")
+            if checkpoint.due():
+                save_progress()
+            start_time = time.perf_counter()
 
-    print(f"\nAll results saved to {log_file}")
+    if args.shard is not None:
+        write_partial(result_file, {
+            "input_file": args.input_file, "input_sha256": checkpoint.digest, "results_file": log_file,
+            "solver": args.solver, "solver_version": solver_version(solver_path),
+            "free": free, "scale_bits": scale_bits, "total": total_games,
+            "game": "reach", "shard": list(args.shard), "range": [first_index, stop_index],
+            "wins": total_aggregated, "games": games_solved, "time_ms": total_time_ms})
+    else:
+        with open(log_file, "w") as logf:
+            if args.p1_probability == Fraction(1, 2):
+                logf.write(f"{total_aggregated << scale_bits}/{games_solved << scale_bits}")
+            else:
+                # Removed owners are irrelevant, so no scaling is needed
+                logf.write(f"{probability}")
+        if run is not None and args.p1_probability == Fraction(1, 2):
+            run.finish(total_aggregated, games_solved, total_time_ms, scale_bits=scale_bits)
+        elif run is not None:
+            # A probability, not a count: its denominator can exceed 64 bits, so it is kept as text
+            run.finish(solver_ms=total_time_ms, estimate=float(probability),
+                       summary=f"P(player 1) = {args.p1_probability}: {probability}")
+    checkpoint.clear()
+
+    if worker is not None:
+        worker.close()
+
+    print(f"\nAll results saved to {result_file}")
     print(f"\nTotal games solved: {games_solved}/{total_games}")
-    print(f"\nTotal aggregated value: {total_aggregated}/{games_solved}")
+    print(f"\nTotal aggregated value: {total_aggregated << scale_bits}/{games_solved << scale_bits}")
     print(f"\nTotal Python-measured solver time: {total_time_ms:.3f} ms")
-    print(f"\nAverage time per configuration: {total_time_ms / games_solved:.3f} ms")
+    print(f"\nAverage time per configuration: {total_time_ms / max(games_solved, 1):.3f} ms")
+    if args.p1_probability != Fraction(1, 2):
+        print(f"\nWinning probability with P(player 1) = {args.p1_probability}: "
+              f"{probability} ~ {float(probability):.6f}")
     
 
 if __name__ == "__main__":
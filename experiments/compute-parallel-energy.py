@@ -8,10 +8,20 @@ import time
 from multiprocessing import Pool, cpu_count
 from functools import partial
 
+from arena_cache import KIND_ENERGY, load_arena
+from energy_screen import cycle_weight, negative_cycle, nonnegative_cycle
+from energy_solver import EnergyArena, enumeration_owners
+from enumeration import split_range
+from reduction import energy_successors, expand_owners, free_vertices, prune_energy_game
+
 # ----------------------------
 # 1️⃣ Read JSON energy game
 # ----------------------------
 def read_energy_game(json_file):
+    cached = load_arena(json_file, KIND_ENERGY)
+    if cached is not None:
+        return cached.energy_game()
+
     with open(json_file, "r") as f:
         game_data = json.load(f)
 
@@ -44,60 +54,26 @@ def replace_players_in_json(base_game, bit_string, tmp_filename):
 # ----------------------------
 # 3️⃣ Find a nonnegative-energy lasso
 # ----------------------------
-def find_nonnegative_lasso(edges, weights, start=0, energy_limit=1000):
-    stack = [(start, [start], 0)]
-    visited_states = set()
-
-    while stack:
-        current, path, energy = stack.pop()
-        if energy < 0:
-            continue
-        if current in path[:-1]:
-            cycle_start = path.index(current)
-            cycle = path[cycle_start:]
-            total_weight = 0
-            valid = True
-            cycle_energy = 0
-            for i in range(len(cycle) - 1):
-                w = weights.get((cycle[i], cycle[i + 1]), 0)
-                cycle_energy += w
-                if cycle_energy < 0:
-                    valid = False
-                    break
-                total_weight += w
-            if valid and total_weight >= 0:
-                return True
-            continue
-        for neighbor in edges.get(current, []):
-            w = weights.get((current, neighbor), 0)
-            new_energy = energy + w
-            state = (neighbor, new_energy)
-            if new_energy >= 0 and state not in visited_states and new_energy <= energy_limit:
-                visited_states.add(state)
-                stack.append((neighbor, path + [neighbor], new_energy))
-    return False
+def find_nonnegative_lasso(edges, weights, start=0):
+    """
+    Return a cycle [u, ..., u] of nonnegative total weight reachable from
+    start, i.e. a witness that player 0 wins when she owns every vertex,
+    or None.
+    """
+    return nonnegative_cycle(edges, weights, start)
 
 
 # ----------------------------
-# 4️⃣ Detect any negative-energy path
+# 4️⃣ Detect a negative-energy cycle
 # ----------------------------
-def exists_negative_energy_path(edges, weights, start=0, energy_limit=1000):
-    stack = [(start, 0)]
-    visited_states = set()
-
-    while stack:
-        current, energy = stack.pop()
-        if (current, energy) in visited_states:
-            continue
-        visited_states.add((current, energy))
-        for neighbor in edges.get(current, []):
-            w = weights.get((current, neighbor), 0)
-            new_energy = energy + w
-            if new_energy < 0:
-                return True
-            if new_energy <= energy_limit:
-                stack.append((neighbor, new_energy))
-    return False
+def exists_negative_energy_path(edges, weights, start=0):
+    """
+    Return a cycle [u, ..., u] of negative total weight reachable from
+    start, i.e. a witness that player 1 wins when he owns every vertex,
+    or None. A negative path without such a cycle is paid for by the
+    initial credit.
+    """
+    return negative_cycle(edges, weights, start)
 
 
 # ----------------------------
@@ -120,6 +96,22 @@ def parse_solver_output(output):
     return 0
 
 
+def parse_solver_regions(output):
+    """Parse the winning region into {vertex_id: winning_player} (player 0 wins values >= 0)."""
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("The winning region is:"):
+            start = line.find("{")
+            end = line.find("}", start)
+            if start != -1 and end != -1:
+                try:
+                    region = eval(line[start:end+1])
+                    return {v: 0 if value >= 0 else 1 for v, value in region.items()}
+                except Exception:
+                    return {}
+    return {}
+
+
 # ----------------------------
 # 6️⃣ Worker function (runs in parallel)
 # ----------------------------
@@ -140,6 +132,23 @@ def solve_one(bit_string, base_game, tmp_dir):
         return (bit_string, 0, 0.0, f"Solver error: {e}")
 
 
+def count_range(task):
+    """
+    Pool worker for the in-process solver: count the assignments start ..
+    stop - 1 (product order over the free vertices) under which player 0
+    wins v0. Returns (start, stop, wins, solver time in ms).
+    """
+    game_data, free, start, stop, block_size = task
+    arena = EnergyArena.from_game_data(game_data)
+    n = len(game_data["nodes"])
+    wins = 0
+    start_time = time.perf_counter()
+    for block_start in range(start, stop, block_size):
+        count = min(block_size, stop - block_start)
+        wins += int(arena.v0_wins(enumeration_owners(n, block_start, count, free)).sum())
+    return start, stop, wins, (time.perf_counter() - start_time) * 1000
+
+
 # ----------------------------
 # 7️⃣ Main driver
 # ----------------------------
@@ -148,6 +157,15 @@ def main():
     parser.add_argument("input_file", help="Path to the JSON input file.")
     parser.add_argument("--tmpdir", default="tmp_solvers", help="Temporary directory for intermediate JSONs.")
     parser.add_argument("--workers", type=int, default=cpu_count(), help="Number of parallel worker processes.")
+    parser.add_argument("--solver", choices=["python", "egsolver"], default="python",
+                        help="Minimal-credit fixpoint over blocks of assignments in-process (python), "
+                             "or one `egsolver solve` call per assignment.")
+    parser.add_argument("--block-size", type=int, default=4096,
+                        help="Assignments per block with --solver python.")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="Enumerate owners of vertices unreachable from v0 as well.")
+    parser.add_argument("--no-reduce", action="store_true",
+                        help="Enumerate owners of single-successor and always-decided vertices as well.")
     args = parser.parse_args()
 
     os.makedirs(args.tmpdir, exist_ok=True)
@@ -157,18 +175,46 @@ def main():
     v0_can_win = find_nonnegative_lasso(edges, weights)
     v0_has_neg_path = exists_negative_energy_path(edges, weights)
 
-    print(f"v0 has nonnegative-energy lasso: {v0_can_win}")
-    print(f"v0 can reach a negative-energy path: {v0_has_neg_path}")
+    print(f"v0 has nonnegative-energy lasso: {v0_can_win is not None}")
+    if v0_can_win:
+        print(f"  cycle {v0_can_win} of weight {cycle_weight(v0_can_win, weights)}")
+    print(f"v0 can reach a negative-energy cycle: {v0_has_neg_path is not None}")
+    if v0_has_neg_path:
+        print(f"  cycle {v0_has_neg_path} of weight {cycle_weight(v0_has_neg_path, weights)}")
 
     if not v0_can_win or not v0_has_neg_path:
         print("Early termination: graph unsuitable for exhaustive analysis.")
         return
 
+    # Restrict to the arena reachable from node 0
+    scale_bits = 0
+    if not args.no_prune:
+        game_data, scale_bits = prune_energy_game(game_data)
+        vertices = {v["id"]: v["owner"] for v in game_data["nodes"]}
+        if scale_bits:
+            print(f"Pruned {scale_bits} vertices unreachable from v0.")
+
     n = len(vertices)
-    total_games = 2 ** n
-    print(f"Enumerating {total_games} player assignments using {args.workers} cores...")
 
-    bit_strings = ["".join(bits) for bits in itertools.product("01", repeat=n)]
+    # Fix owners that cannot influence v0
+    free = list(range(n))
+    if not args.no_reduce:
+        def solve_regions(owners):
+            if args.solver == "python":
+                return EnergyArena.from_game_data(game_data).regions(owners)
+            _, _, _, solver_output = solve_one("".join(map(str, owners)), game_data, args.tmpdir)
+            regions = parse_solver_regions(solver_output)
+            return [regions.get(i) for i in range(n)]
+
+        free, v0_winner = free_vertices(n, energy_successors(game_data), solve_regions)
+        if v0_winner is not None:
+            print(f"v0 is won by player {v0_winner} under every assignment.")
+            free = []
+        print(f"Fixed {n - len(free)} owner-irrelevant vertices.")
+    scale_bits += n - len(free)
+
+    total_games = 2 ** len(free)
+    print(f"Enumerating {total_games} player assignments using {args.workers} cores...")
 
     start_global = time.perf_counter()
     total_aggregated = 0
@@ -177,20 +223,33 @@ def main():
     log_file = f"{os.path.splitext(args.input_file)[0]}_energy_results.txt"
     with open(log_file, "w") as logf:
         with Pool(processes=args.workers) as pool:
-            worker = partial(solve_one, base_game=game_data, tmp_dir=args.tmpdir)
-            for bit_string, agg_value, elapsed_ms, solver_output in pool.imap_unordered(worker, bit_strings):
-                total_aggregated += agg_value
-                total_time_ms += elapsed_ms
-                logf.write(f"Bit string: {bit_string}\n")
-                logf.write(solver_output.strip() + "\n")
-                logf.write(f"Winner (1=MAX wins, 0=LOSES): {agg_value}\n")
-                logf.write(f"Time: {elapsed_ms:.3f} ms\n")
-                logf.write("-" * 40 + "\n")
-                logf.flush()
+            if args.solver == "python":
+                tasks = [(game_data, free, start, stop, args.block_size)
+                         for start, stop in split_range(total_games, args.workers)]
+                for start, stop, wins, elapsed_ms in pool.imap_unordered(count_range, tasks):
+                    total_aggregated += wins
+                    total_time_ms += elapsed_ms
+                    logf.write(f"Assignments {start}..{stop - 1}: {wins}/{stop - start}\n")
+                    logf.write(f"Time: {elapsed_ms:.3f} ms\n")
+                    logf.write("-" * 40 + "\n")
+                    logf.flush()
+            else:
+                bit_strings = ["".join(map(str, expand_owners(free, bits, n)))
+                               for bits in itertools.product("01", repeat=len(free))]
+                worker = partial(solve_one, base_game=game_data, tmp_dir=args.tmpdir)
+                for bit_string, agg_value, elapsed_ms, solver_output in pool.imap_unordered(worker, bit_strings):
+                    total_aggregated += agg_value
+                    total_time_ms += elapsed_ms
+                    logf.write(f"Bit string: {bit_string}\n")
+                    logf.write(solver_output.strip() + "\n")
+                    logf.write(f"Winner (1=MAX wins, 0=LOSES): {agg_value}\n")
+                    logf.write(f"Time: {elapsed_ms:.3f} ms\n")
+                    logf.write("-" * 40 + "\n")
+                    logf.flush()
 
     elapsed_total = (time.perf_counter() - start_global) * 1000
     print(f"\n✅ All results saved to {log_file}")
-    print(f"Total aggregated value: {total_aggregated}")
+    print(f"Total aggregated value: {total_aggregated << scale_bits}/{total_games << scale_bits}")
     print(f"Total solver time (wall-clock): {elapsed_total:.3f} ms using {args.workers} workers")
 
 
@@ -0,0 +1,128 @@
+"""
+Anytime-valid confidence sequences for the FPRAAS samplers.
+
+A fixed-N Hoeffding bound has to assume the worst-case variance 1/4. The
+predictable plug-in empirical-Bernstein confidence sequence of
+Waudby-Smith & Ramdas ("Estimating means of bounded random variables by
+betting", 2023, Thm. 2) adapts to the observed variance and holds
+uniformly over time: with probability at least 1 - delta, every interval
+it reports contains p, so sampling may stop as soon as the interval is
+narrow enough. For win probabilities near 0 or 1 the half-width shrinks
+like log(1/delta) / t instead of 1 / sqrt(t).
+
+For 0/1 outcomes X_1, X_2, ..., with a predictable bet lambda_t in (0, c]:
+
+    center_t = sum(lambda_i X_i) / sum(lambda_i)
+    radius_t = (log(2 / delta) + sum(v_i psi(lambda_i))) / sum(lambda_i)
+
+where v_i = 4 (X_i - mu_{i-1})^2, psi(l) = (-log(1 - l) - l) / 4, and
+mu, sigma^2 are the regularised running mean and variance.
+"""
+
+import math
+
+import numpy as np
+
+
+class EmpiricalBernsteinCS:
+    """Running confidence sequence for the mean of 0/1 samples."""
+
+    def __init__(self, delta, c=0.5):
+        self.delta = delta
+        self.c = c
+        self.log_term = math.log(2 / delta)
+        self.t = 0
+        self.total = 0.0           # sum of X_i
+        self.squares = 0.0         # sum of (X_i - mu_i)^2
+        self.bets = 0.0            # sum of lambda_i
+        self.weighted = 0.0        # sum of lambda_i X_i
+        self.penalty = 0.0         # sum of v_i psi(lambda_i)
+
+    def update(self, outcomes):
+        """
+        Feed a block of outcomes in sampling order. Returns (lower, upper)
+        arrays with the interval after each of them.
+        """
+        x = np.asarray(outcomes, dtype=np.float64)
+        t = self.t + np.arange(1, len(x) + 1, dtype=np.float64)
+
+        # mu_t and sigma^2_t include sample t; the bet and v of step t use t - 1
+        mu = (0.5 + self.total + np.cumsum(x)) / (t + 1)
+        squares = self.squares + np.cumsum((x - mu) ** 2)
+        sigma2 = (0.25 + squares) / (t + 1)
+        mu_prev = np.concatenate(([(0.5 + self.total) / (self.t + 1)], mu[:-1]))
+        sigma2_prev = np.concatenate(([(0.25 + self.squares) / (self.t + 1)], sigma2[:-1]))
+
+        bet = np.minimum(np.sqrt(2 * self.log_term / (sigma2_prev * t * np.log1p(t))), self.c)
+        psi = (-np.log1p(-bet) - bet) / 4
+
+        bets = self.bets + np.cumsum(bet)
+        weighted = self.weighted + np.cumsum(bet * x)
+        penalty = self.penalty + np.cumsum(4 * (x - mu_prev) ** 2 * psi)
+
+        if len(x):
+            self.t += len(x)
+            self.total += float(x.sum())
+            self.squares = float(squares[-1])
+            self.bets = float(bets[-1])
+            self.weighted = float(weighted[-1])
+            self.penalty = float(penalty[-1])
+
+        center = weighted / bets
+        radius = (self.log_term + penalty) / bets
+        return np.maximum(center - radius, 0.0), np.minimum(center + radius, 1.0)
+
+
+def first_within(lower, upper, epsilon):
+    """Index of the first interval of half-width <= epsilon, or None."""
+    hits = np.flatnonzero(upper - lower <= 2 * epsilon)
+    return int(hits[0]) if hits.size else None
+
+
+class SequentialStop:
+    """
+    Stopping rule for a sampler: stop at the first sample after which the
+    (1 - delta) confidence sequence has half-width <= epsilon. Stopping is
+    decided on the confidence sequence itself, so the reported interval
+    keeps its coverage despite the data-dependent sample count.
+    """
+
+    def __init__(self, epsilon, delta):
+        self.epsilon = epsilon
+        self.sequence = EmpiricalBernsteinCS(delta)
+        self.interval = (0.0, 1.0)
+        self.stopped = False
+
+    def feed(self, outcomes):
+        """
+        Feed a block of outcomes; return how many of them count, i.e. all
+        of them unless the rule fires inside the block.
+        """
+        lower, upper = self.sequence.update(outcomes)
+        stop = first_within(lower, upper, self.epsilon)
+        keep = len(lower) if stop is None else stop + 1
+        if keep:
+            self.interval = (float(lower[keep - 1]), float(upper[keep - 1]))
+        self.stopped = stop is not None
+        return keep
+
+    def state(self):
+        """JSON-serialisable state, for checkpoints."""
+        sequence = self.sequence
+        return {"interval": list(self.interval), "stopped": self.stopped,
+                "sums": [sequence.t, sequence.total, sequence.squares, sequence.bets,
+                         sequence.weighted, sequence.penalty]}
+
+    def restore(self, state):
+        """Continue from a `state()` taken earlier."""
+        sequence = self.sequence
+        self.interval = tuple(state["interval"])
+        self.stopped = state["stopped"]
+        (sequence.t, sequence.total, sequence.squares, sequence.bets,
+         sequence.weighted, sequence.penalty) = state["sums"]
+
+    def summary(self, samples):
+        lower, upper = self.interval
+        state = "reached" if self.stopped else "not reached"
+        return (f"epsilon={self.epsilon:g} {state} after {samples} samples: "
+                f"p in [{lower:.6f}, {upper:.6f}] with confidence {1 - self.sequence.delta:g}")
@@ -0,0 +1,125 @@
+"""
+Low-discrepancy owner assignments.
+
+An owner bit is a coordinate thresholded at 1/2, so of a digital net (such
+as the Sobol' points) only the leading digit of every coordinate matters:
+the 2^m points of the net become the codewords G i of a binary linear code,
+with one m-bit generator row g_v per vertex and owner_v(i) = parity(g_v & i).
+Scrambling the net reduces to XOR-ing a uniformly random shift onto every
+point, which makes each point uniform on {0, 1}^n and the average unbiased.
+
+The variance of the average is the sum of the squared Walsh coefficients
+f^(S) over the vertex sets S whose rows XOR to zero. If any t rows are
+linearly independent, all interactions of up to t owners are integrated
+exactly (the points form an orthogonal array of strength t). The rows are
+therefore taken from the duals of good codes, as strong as m allows:
+
+    strength 5: (1, b, b^3) for distinct b in GF(2^r)*, m >= 2r + 1
+                (dual of the extended double-error-correcting BCH code),
+                with random bits in the m - 2r - 1 leading positions
+    strength 3: (1, b) for distinct b in GF(2^(m - 1))
+    strength 2: distinct nonzero rows of m bits
+    strength 1: random nonzero rows, if n > 2^m - 1
+
+Within each construction the rows are redrawn until they have rank m (for
+m <= n), since rows spanning fewer bits would repeat every point of the
+net 2^(m - rank) times.
+"""
+
+import numpy as np
+
+# Primitive polynomials over GF(2), bit k = coefficient of x^k
+PRIMITIVE_POLYNOMIALS = {
+    2: 0b111,
+    3: 0b1011,
+    4: 0b10011,
+    5: 0b100101,
+    6: 0b1000011,
+    7: 0b10001001,
+    8: 0b100011101,
+    9: 0b1000010001,
+    10: 0b10000001001,
+    11: 0b100000000101,
+    12: 0b1000001010011,
+    13: 0b10000000011011,
+    14: 0b100010001000011,
+    15: 0b1000000000000011,
+    16: 0b10001000000001011,
+}
+
+
+def gf_multiply(a, b, r):
+    """Product of a and b in GF(2^r) modulo PRIMITIVE_POLYNOMIALS[r]."""
+    polynomial = PRIMITIVE_POLYNOMIALS[r]
+    product = 0
+    while b:
+        if b & 1:
+            product ^= a
+        b >>= 1
+        a <<= 1
+        if a >> r:
+            a ^= polynomial
+    return product
+
+
+def gf2_rank(rows):
+    """Rank over GF(2) of a list of integer bit rows."""
+    basis = {}  # leading bit -> row
+    for row in rows:
+        while row:
+            top = row.bit_length() - 1
+            if top not in basis:
+                basis[top] = row
+                break
+            row ^= basis[top]
+    return len(basis)
+
+
+def generator_rows(n, m, rng, attempts=100):
+    """
+    One m-bit generator row per vertex, as strong as m allows, with the
+    code elements assigned to vertices at random. The rows have rank
+    min(n, m), so for m <= n the 2^m points of the net are distinct.
+    """
+    def full_rank(rows):
+        return gf2_rank(map(int, rows)) == min(n, m)
+
+    r = max(2, n.bit_length())  # 2^r - 1 >= n nonzero field elements
+    if 2 * r + 1 <= m and r in PRIMITIVE_POLYNOMIALS:
+        # Random bits above the 2r + 1 code bits keep every 5 rows independent
+        for _ in range(attempts):
+            elements = rng.choice(np.arange(1, 2 ** r), size=n, replace=False)
+            high = rng.integers(0, 2 ** (m - 2 * r - 1), size=n)
+            rows = []
+            for b, h in zip(map(int, elements), map(int, high)):
+                cube = gf_multiply(gf_multiply(b, b, r), b, r)
+                rows.append((h << (2 * r + 1)) | (1 << (2 * r)) | (b << r) | cube)
+            if full_rank(rows):
+                return np.array(rows, dtype=np.uint64)
+    if n <= 2 ** (m - 1):
+        for _ in range(attempts):
+            elements = rng.choice(np.arange(2 ** (m - 1)), size=n, replace=False)
+            rows = (np.uint64(1) << np.uint64(m - 1)) | elements.astype(np.uint64)
+            if full_rank(rows):
+                return rows
+    if n <= 2 ** m - 1:
+        for _ in range(attempts):
+            rows = rng.choice(np.arange(1, 2 ** m), size=n, replace=False).astype(np.uint64)
+            if full_rank(rows):
+                return rows
+    while True:
+        rows = rng.integers(1, 2 ** m, size=n).astype(np.uint64)
+        if full_rank(rows):
+            return rows
+
+
+def owner_net(n, m, rng):
+    """
+    The 2^m owner assignments (rows) of a randomly shifted linear code over
+    n vertices. Every row is uniform on {0, 1}^n, and for m <= n the rows
+    are distinct.
+    """
+    rows = generator_rows(n, m, rng)
+    index = np.arange(2 ** m, dtype=np.uint64)
+    owners = (np.bitwise_count(index[:, None] & rows[None, :]) & 1).astype(bool)
+    return owners ^ rng.integers(0, 2, size=n, dtype=bool)
@@ -0,0 +1,75 @@
+"""
+Owner-templated DOT files.
+
+`replace_players_in_dot` re-reads and re-matches the whole DOT file for
+every assignment. A `DotTemplate` parses the file once into byte chunks with
+one owner slot per vertex line, so an assignment is serialised with a single
+join and can be piped straight into a ggg solver (`-i -` reads stdin)
+instead of going through a scratch file.
+"""
+
+import re
+import subprocess
+
+VERTEX_PATTERN = re.compile(
+    rb'^\s*(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
+)
+
+OWNER_BYTES = {"0": b"0", "1": b"1", 0: b"0", 1: b"1"}
+
+
+class DotTemplate:
+    """A parsed DOT file whose `player=` values can be filled in per assignment."""
+
+    def __init__(self, dot_file):
+        with open(dot_file, "rb") as f:
+            data = f.read()
+
+        # parts alternates text chunks and owner slots; slots[j] is the
+        # position in parts of the owner of vertex vertex_of[j].
+        self.parts = []
+        self.slots = []
+        self.vertex_of = []
+        chunk = []
+        for line in data.splitlines(keepends=True):
+            match = VERTEX_PATTERN.match(line)
+            if not match:
+                chunk.append(line)
+                continue
+            start, end = match.span("player")
+            chunk.append(line[:start])
+            self.parts.append(b"".join(chunk))
+            self.slots.append(len(self.parts))
+            self.vertex_of.append(int(match.group("vertex")[1:]))
+            self.parts.append(b"")
+            chunk = [line[end:]]
+        self.parts.append(b"".join(chunk))
+
+    def render(self, bit_string):
+        """Return the DOT file with vertex v<i> owned by bit_string[i], as bytes."""
+        parts = list(self.parts)
+        for slot, vertex in zip(self.slots, self.vertex_of):
+            parts[slot] = OWNER_BYTES[bit_string[vertex]]
+        return b"".join(parts)
+
+    def write(self, output_file, bit_string):
+        """Write the rendered assignment to output_file."""
+        with open(output_file, "wb") as f:
+            f.write(self.render(bit_string))
+
+
+def run_csv_solver(solver, template, output_file, bit_string):
+    """
+    Pipe one assignment into a ggg solver and return its CSV output. The
+    assignment is only written to output_file if the solver fails, so the
+    failing game can be inspected.
+    """
+    try:
+        return subprocess.check_output([
+            solver,
+            "-i", "-",
+            "--csv"
+        ], input=template.render(bit_string)).decode()
+    except subprocess.CalledProcessError as e:
+        template.write(output_file, bit_string)
+        return f"Solver error: {e} (game written to {output_file})"
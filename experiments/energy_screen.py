@@ -0,0 +1,72 @@
+"""
+Cycle-weight screens for energy games.
+
+With a finite but unbounded initial credit, player 0 wins from v0 when she
+owns every vertex iff a cycle of nonnegative total weight is reachable from
+v0, and player 1 wins when he owns every vertex iff a cycle of negative
+total weight is reachable. Both are decided with Bellman-Ford restricted to
+the vertices reachable from v0, in O(n * m) and without an energy cap, and
+come with a witness cycle.
+
+`edges` and `weights` are the adjacency lists and (source, target) -> effect
+map returned by `read_energy_game`.
+"""
+
+from reduction import forward_reachable
+
+
+def negative_cycle(edges, weights, start=0):
+    """
+    Return a cycle [u, ..., u] reachable from `start` whose total weight is
+    negative, or None.
+    """
+    reachable = forward_reachable(edges, start)
+    arcs = [(u, v, weights.get((u, v), 0)) for u in reachable for v in edges.get(u, [])]
+    distance = {start: 0}
+    parent = {}
+
+    # After |reachable| - 1 rounds every shortest path has settled, so an
+    # edge that still relaxes in the next round lies behind a negative cycle.
+    for _ in range(len(reachable)):
+        relaxed = None
+        for u, v, w in arcs:
+            if u in distance and (v not in distance or distance[u] + w < distance[v]):
+                distance[v] = distance[u] + w
+                parent[v] = u
+                relaxed = v
+        if relaxed is None:
+            return None
+
+    # Walking back |reachable| parents from a vertex relaxed in the last
+    # round ends on the cycle.
+    u = relaxed
+    for _ in range(len(reachable)):
+        u = parent[u]
+    cycle = [u]
+    v = parent[u]
+    while v != u:
+        cycle.append(v)
+        v = parent[v]
+    cycle.append(u)
+    return cycle[::-1]
+
+
+def nonnegative_cycle(edges, weights, start=0):
+    """
+    Return a cycle [u, ..., u] reachable from `start` whose total weight is
+    nonnegative, or None.
+    """
+    # A simple cycle has at most n edges, so with w' = -(w * (n + 1) + 1) a
+    # simple cycle has negative w'-weight iff its w-weight is >= 0; any
+    # cycle with w-weight >= 0 contains such a simple cycle.
+    scale = len(forward_reachable(edges, start)) + 1
+    scaled = {e: -(w * scale + 1) for e, w in weights.items()}
+    for u, targets in edges.items():
+        for v in targets:
+            scaled.setdefault((u, v), -1)
+    return negative_cycle(edges, scaled, start)
+
+
+def cycle_weight(cycle, weights):
+    """Total weight of a cycle [u, ..., u]."""
+    return sum(weights.get((u, v), 0) for u, v in zip(cycle, cycle[1:]))
@@ -0,0 +1,110 @@
+"""
+In-process energy game solver.
+
+Replaces `egsolver solve` in the energy scripts. With a finite initial
+credit, player 0 wins a vertex iff its minimal initial credit is finite,
+and the minimal credits are the least fixpoint of the progress measure
+(Brim et al., "Faster algorithms for mean-payoff games"):
+
+    f(v) = min / max over edges (v, u) of max(0, f(u) - effect(v, u))
+
+taking the min at player-0 vertices and the max at player-1 vertices. A
+finite credit never exceeds the deficit of a simple path, so any value
+above that bound is infinite (player 1 wins). The arena is taken as the
+`edges`/`weights` returned by `read_energy_game`, and an owner assignment
+is a row of n bits (bit i = owner of node i, a set bit means player 1).
+
+The fixpoint runs on a whole batch of assignments at once: the credits
+are a (batch, n) matrix and every sweep updates all rows that are still
+changing with a few NumPy operations over the edge arrays.
+"""
+
+import numpy as np
+
+
+def enumeration_owners(n, start, count, free=None):
+    """
+    Owner matrix for assignments start .. start + count - 1 in the order of
+    `itertools.product("01", repeat=k)` over the k vertices in `free`
+    (default: all n vertices), one row per assignment. Vertices outside
+    `free` belong to player 0.
+    """
+    if free is None:
+        free = range(n)
+    free = list(free)
+    k = len(free)
+    index = np.arange(start, start + count, dtype=np.uint64)
+    shifts = np.arange(k - 1, -1, -1, dtype=np.uint64)
+    owners = np.zeros((count, n), dtype=bool)
+    owners[:, free] = (index[:, None] >> shifts) & np.uint64(1)
+    return owners
+
+
+class EnergyArena:
+    """
+    Index-based view of a parsed energy arena. Successors are stored as an
+    (n, max out-degree) matrix, short rows padded by repeating their first
+    edge (a repeated edge changes neither the min nor the max), so a sweep
+    is a gather and one reduction along the last axis.
+    """
+
+    def __init__(self, n, edges, weights):
+        self.n = n
+        rows = []
+        for u in range(n):
+            successors = edges.get(u, [])
+            if not successors:
+                raise ValueError(f"Node {u} has no outgoing edge")
+            rows.append([(v, weights.get((u, v), 0)) for v in successors])
+        width = max(len(row) for row in rows)
+        rows = [row + [row[0]] * (width - len(row)) for row in rows]
+
+        self.successors = np.array([[v for v, _ in row] for row in rows], dtype=np.intp)
+        effects = np.array([[w for _, w in row] for row in rows], dtype=np.int64)
+
+        # Largest credit a simple path can need: the worst effect out of every vertex
+        self.bound = int(-np.minimum(effects.min(axis=1), 0).sum())
+        # Credits are integers up to bound or inf; float32 holds them exactly up to 2^24
+        self.dtype = np.float32 if self.bound < 2 ** 24 else np.float64
+        self.effects = effects.astype(self.dtype)
+
+    @classmethod
+    def from_game_data(cls, game_data):
+        """Build the arena of a JSON energy game as loaded by `read_energy_game`."""
+        edges = {}
+        weights = {}
+        for e in game_data["edges"]:
+            edges.setdefault(e["source"], []).append(e["target"])
+            weights[(e["source"], e["target"])] = e.get("effect", 0)
+        return cls(len(game_data["nodes"]), edges, weights)
+
+    def minimal_credits(self, owners):
+        """
+        Return the (batch, n) matrix of minimal initial credits for a
+        (batch, n) owner matrix; player 1 wins where the credit is inf.
+        """
+        owners = np.asarray(owners, dtype=bool)
+        credits = np.zeros(owners.shape, dtype=self.dtype)
+        active = np.arange(len(owners))
+
+        # Jacobi sweeps from 0 only ever raise credits; rows leave the
+        # active set once a sweep leaves them unchanged.
+        while active.size:
+            current = credits[active]
+            need = np.maximum(current[:, self.successors] - self.effects, 0)
+            updated = np.where(owners[active], need.max(axis=2), need.min(axis=2))
+            updated[updated > self.bound] = np.inf
+            changed = (updated != current).any(axis=1)
+            credits[active] = updated
+            active = active[changed]
+
+        return credits
+
+    def v0_wins(self, owners):
+        """Return a boolean array telling, per owner row, whether player 0 wins v0."""
+        return np.isfinite(self.minimal_credits(owners)[:, 0])
+
+    def regions(self, owners):
+        """Return the winning player (0/1) of every vertex under a single assignment."""
+        credits = self.minimal_credits(np.asarray([owners], dtype=np.int8))[0]
+        return [0 if np.isfinite(c) else 1 for c in credits]
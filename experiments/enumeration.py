@@ -0,0 +1,95 @@
+"""
+Enumeration orders over owner assignments.
+
+Assignments are bit vectors over the vertices (bit i = owner of v<i>). The
+exact scripts walk all 2^n of them; the helpers here provide orders that let
+a solver reuse work between consecutive assignments, skip whole subtrees
+of assignments whose winner is already determined, or split the enumeration
+into contiguous ranges for parallel workers.
+"""
+
+from reduction import expand_owners, forward_reachable
+
+
+def gray_code_flips(n):
+    """
+    Yield the vertex flipped at each step of a binary-reflected Gray-code
+    walk starting from the all-zero assignment. The 2^n - 1 flips visit
+    every assignment exactly once.
+    """
+    for k in range(1, 2 ** n):
+        yield (k & -k).bit_length() - 1
+
+
+def branching_order(edges, free):
+    """
+    Order the free vertex indices by BFS distance from v0 in a parsed DOT
+    arena; free vertices unreachable from v0 come last. Owners close to v0
+    tend to decide its winner first, so branching on them prunes earliest.
+    """
+    free_set = set(free)
+    order = [int(v[1:]) for v in forward_reachable(edges, "v0") if int(v[1:]) in free_set]
+    reached = set(order)
+    return order + [v for v in free if v not in reached]
+
+
+def branch_and_bound(n, order, v0_wins):
+    """
+    Count the assignments of the vertices in `order` under which player 0
+    wins v0; all other vertices keep owner 0. Returns (wins, evaluations).
+
+    Owners are fixed one vertex at a time in the given order. For a partial
+    assignment, handing every undecided vertex to player 1 gives a lower
+    bound and handing them to player 0 an upper bound (winning regions are
+    monotone in the owners); when both agree on v0, all 2^k completions are
+    counted at once. `v0_wins(owners)` returns 1 if player 0 wins v0.
+    """
+    owners = [0] * n
+    evaluations = 0
+
+    def bound(depth, player):
+        nonlocal evaluations
+        for v in order[depth:]:
+            owners[v] = player
+        evaluations += 1
+        return v0_wins(owners)
+
+    def count(depth, lower, upper):
+        # lower/upper are the bounds of this node if already known, else None
+        rest = len(order) - depth
+        if lower is None:
+            lower = bound(depth, 1)
+        if lower:
+            return 2 ** rest
+        if upper is None:
+            upper = bound(depth, 0)
+        if not upper:
+            return 0
+
+        v = order[depth]
+        # The 0-child shares this node's upper bound, the 1-child its lower bound
+        owners[v] = 0
+        wins = count(depth + 1, None, upper)
+        owners[v] = 1
+        wins += count(depth + 1, lower, None)
+        return wins
+
+    return count(0, None, None), evaluations
+
+
+def split_range(total, parts):
+    """Split range(total) into at most `parts` contiguous (start, stop) ranges of near-equal size."""
+    parts = max(1, min(parts, total))
+    return [(total * i // parts, total * (i + 1) // parts) for i in range(parts)]
+
+
+def product_bit_strings(n, free, start, stop):
+    """
+    Owner bit strings of the assignments start .. stop - 1 in the order of
+    `itertools.product("01", repeat=len(free))` over the free vertices; all
+    other vertices belong to player 0.
+    """
+    k = len(free)
+    for index in range(start, stop):
+        bits = format(index, f"0{k}b")
+        yield "".join(map(str, expand_owners(free, bits, n)))
@@ -0,0 +1,155 @@
+"""
+Variance-reduced estimators for the FPRAAS samplers.
+
+All estimators take `solve(owners)`, which maps a (count, n) boolean owner
+matrix (True = player 1) to a boolean array telling per row whether player
+0 wins v0, and return (estimate, variance, solver calls) for the
+probability that player 0 wins under uniformly random owners. The
+stratified and importance estimators use a small uniform pilot run to tune
+themselves and estimate only from the samples drawn afterwards, so the
+tuning cannot bias the estimate.
+
+- Stratified: the owners of the k vertices closest to v0 split the
+  assignments into 2^k equally likely strata. Each stratum is sampled
+  separately with Neyman allocation (samples proportional to the pilot
+  standard deviation of the stratum), and the estimate is the mean of the
+  stratum means. Strata whose outcome is already fixed by those owners
+  cost almost nothing.
+- Importance: owners are drawn from a product proposal in which each
+  vertex belongs to player 1 with its own probability q_v, and every
+  sample is reweighted by prod 0.5 / q_v(owner). The q_v are the
+  cross-entropy fit to the rarer outcome on the pilot run: vertices whose
+  owner is pivotal for that outcome move away from 1/2, all others stay
+  at 1/2. q_v is clipped to [clip, 1 - clip] to keep the weights bounded.
+- Antithetic: every assignment is paired with its complement. Winning
+  tends to be monotone in the owners, so the two outcomes of a pair are
+  negatively correlated and the pair mean varies less than two
+  independent samples. The error comes from the spread of the pair means.
+- QMC: randomized quasi-Monte Carlo over `digital_nets.owner_net`, whose
+  points balance every small set of owners exactly. The points of one net
+  are dependent, so the samples are split into independently randomized
+  replicate nets and the error comes from the spread of the replicate
+  means.
+"""
+
+import numpy as np
+
+from digital_nets import owner_net
+
+
+def nearest_vertices(successors, count, start=0):
+    """The first `count` vertices in BFS order from `start` over index successor lists."""
+    order = [start]
+    seen = {start}
+    for v in order:
+        if len(order) >= count:
+            break
+        for w in successors[v]:
+            if w not in seen:
+                seen.add(w)
+                order.append(w)
+    return order[:count]
+
+
+def solve_in_blocks(solve, owners, block_size):
+    """Apply `solve` to `owners` in blocks of at most `block_size` rows."""
+    return np.concatenate([solve(owners[i:i + block_size]) for i in range(0, len(owners), block_size)]
+                          or [np.zeros(0, dtype=bool)])
+
+
+def stratified_estimate(solve, n, strata, samples, rng, pilot=0.1, block_size=16384):
+    """
+    Stratify on the owners of the vertices in `strata`. Uses `samples`
+    solver calls in total, a fraction `pilot` of them for the allocation.
+    """
+    k = len(strata)
+    count = 2 ** k
+    shifts = np.arange(k - 1, -1, -1)
+
+    def draw(h, size):
+        owners = rng.integers(0, 2, size=(size, n), dtype=bool)
+        owners[:, strata] = (h >> shifts) & 1
+        return owners
+
+    # Pilot: equal allocation; smoothed so no stratum looks certain yet
+    per_stratum = max(2, int(samples * pilot) // count)
+    deviations = np.empty(count)
+    for h in range(count):
+        wins = solve_in_blocks(solve, draw(h, per_stratum), block_size).sum()
+        p = (wins + 0.5) / (per_stratum + 1)
+        deviations[h] = np.sqrt(p * (1 - p))
+
+    budget = max(2 * count, samples - per_stratum * count)
+    allocation = np.maximum(2, np.floor(budget * deviations / deviations.sum()).astype(int))
+
+    estimate = 0.0
+    variance = 0.0
+    for h in range(count):
+        outcomes = solve_in_blocks(solve, draw(h, allocation[h]), block_size)
+        estimate += outcomes.mean() / count
+        variance += outcomes.var(ddof=1) / allocation[h] / count ** 2
+    return estimate, variance, per_stratum * count + int(allocation.sum())
+
+
+def importance_estimate(solve, n, samples, rng, pilot=0.1, clip=0.1, block_size=16384):
+    """
+    Importance sampling with a cross-entropy product proposal. Uses
+    `samples` solver calls in total, a fraction `pilot` of them for the
+    proposal.
+    """
+    trial = rng.integers(0, 2, size=(max(2, int(samples * pilot)), n), dtype=bool)
+    outcomes = solve_in_blocks(solve, trial, block_size)
+
+    # Fit the rarer outcome; its indicator has the smaller relative variance to fix
+    flip = outcomes.mean() > 0.5
+    target = outcomes ^ flip
+    q = trial[target].mean(axis=0) if target.any() else np.full(n, 0.5)
+    q = np.clip(q, clip, 1 - clip)
+
+    size = max(2, samples - len(trial))
+    owners = rng.random((size, n)) < q
+    log_weights = np.where(owners, np.log(0.5 / q), np.log(0.5 / (1 - q))).sum(axis=1)
+    values = (solve_in_blocks(solve, owners, block_size) ^ flip) * np.exp(log_weights)
+
+    estimate = values.mean()
+    variance = values.var(ddof=1) / size
+    return (1 - estimate if flip else estimate), variance, len(trial) + size
+
+
+def antithetic_estimate(solve, n, samples, rng, block_size=16384):
+    """Antithetic pairs; uses `samples` solver calls (rounded up to even)."""
+    pairs = max(2, (samples + 1) // 2)
+    half = max(1, block_size // 2)
+    means = np.empty(pairs)
+    for i in range(0, pairs, half):
+        owners = rng.integers(0, 2, size=(min(half, pairs - i), n), dtype=bool)
+        means[i:i + len(owners)] = (solve(owners).astype(float) + solve(~owners)) / 2
+    return means.mean(), means.var(ddof=1) / pairs, 2 * pairs
+
+
+def qmc_net_bits(n, samples, replicates):
+    """
+    log2 of the net size of `qmc_estimate`: the largest m for which the
+    replicate nets fit into `samples` solver calls, at most n since a net
+    cannot hold more than the 2^n distinct assignments.
+    """
+    return max(1, min(n, (max(1, samples // replicates)).bit_length() - 1))
+
+
+def qmc_estimate(solve, n, samples, rng, replicates=16, block_size=16384):
+    """
+    Randomized QMC with `replicates` independent nets of 2^m points each,
+    m = qmc_net_bits(n, samples, replicates).
+    """
+    m = qmc_net_bits(n, samples, replicates)
+    means = np.array([solve_in_blocks(solve, owner_net(n, m, rng), block_size).mean()
+                      for _ in range(replicates)])
+    return means.mean(), means.var(ddof=1) / replicates, replicates * 2 ** m
+
+
+def describe(name, estimate, variance, samples):
+    """One-line report of an estimate next to the variance of plain uniform sampling."""
+    uniform = estimate * (1 - estimate) / samples
+    ratio = f"{uniform / variance:.2f}x" if variance > 0 else "inf"
+    return (f"{name} estimate: {estimate:.6f} (standard error {np.sqrt(variance):.6f}; "
+            f"uniform sampling: {np.sqrt(uniform):.6f}, variance reduced {ratio})")
@@ -0,0 +1,57 @@
+import argparse
+import os
+
+from results_db import connect, exact_line, latest_runs, progress_lines
+
+# Results file suffixes of the scripts, per game type
+EXACT_SUFFIX = {"reach": "_results.txt", "parity": "_results.txt", "energy": "_energy_results.txt"}
+SAMPLED_SUFFIX = {"reach": "_sampled_results.txt", "parity": "_sampled_results.txt",
+                  "energy": "_energy_results_sampled.txt"}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export a SQLite results database (--db of the scripts) to the text results files.")
+    parser.add_argument("db", help="Results database.")
+    parser.add_argument("output_dir", help="Directory to write the results files to, e.g. results/reach-sample.")
+    parser.add_argument("--game", choices=("reach", "parity", "energy"), required=True,
+                        help="Game type to export.")
+    parser.add_argument("--exact", action="store_true",
+                        help="Export the exact results (<name>_results.txt) instead of the sampled ones.")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="Export only sampler runs with this N (default: the latest run of each arena).")
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    exact = latest_runs(db, args.game, "exact")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.exact:
+        for row in exact.values():
+            name = os.path.splitext(os.path.basename(row["arena"]))[0] + EXACT_SUFFIX[args.game]
+            with open(os.path.join(args.output_dir, name), "w") as f:
+                f.write(exact_line(row))
+        print(f"Exported {len(exact)} exact results to {args.output_dir}")
+        return
+
+    # First line the exact probability, then the sampler's log, as plot.py reads them
+    missing = 0
+    # Variance-reduced estimates have no wins/samples log to export
+    sampled = latest_runs(db, args.game, "fpraas", args.samples, estimator="uniform")
+    for digest, row in sampled.items():
+        lines = progress_lines(db, row["id"])
+        if row["summary"] is not None:
+            lines.append(f"# {row['summary']}")
+        if digest in exact:
+            lines.insert(0, exact_line(exact[digest]))
+        else:
+            missing += 1
+            print(f"No exact result for {row['arena']}; exported without the first line.")
+        name = os.path.splitext(os.path.basename(row["arena"]))[0] + SAMPLED_SUFFIX[args.game]
+        with open(os.path.join(args.output_dir, name), "w") as f:
+            f.write("".join(line + "\n" for line in lines))
+    print(f"Exported {len(sampled)} sampled results to {args.output_dir} ({missing} without exact results)")
+
+
+if __name__ == "__main__":
+    main()
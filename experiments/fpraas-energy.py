@@ -4,14 +4,26 @@ import argparse
 import os
 import subprocess
 import time
-import random
 from multiprocessing import Pool, cpu_count
 from functools import partial
 
+from arena_cache import KIND_ENERGY, load_arena
+from checkpoint import Checkpoint, check_log, checkpoint_path, resume_log
+from confidence import SequentialStop
+from energy_solver import EnergyArena
+from estimators import (antithetic_estimate, describe, importance_estimate, nearest_vertices,
+                        qmc_estimate, stratified_estimate)
+from results_db import Run
+from sampling import OwnerSampler, owner_strings
+
 # ----------------------------
 # 1️⃣ Read JSON energy game
 # ----------------------------
 def read_energy_game(json_file):
+    cached = load_arena(json_file, KIND_ENERGY)
+    if cached is not None:
+        return cached.energy_game()
+
     with open(json_file, "r") as f:
         game_data = json.load(f)
 
@@ -82,6 +94,13 @@ def solve_one(bit_string, base_game, tmp_dir):
             pass
 
 
+def solve_block(owners, base_game):
+    """In-process worker: return (boolean array telling per owner row whether player 0 wins v0, time in ms)."""
+    start_time = time.perf_counter()
+    wins = EnergyArena.from_game_data(base_game).v0_wins(owners)
+    return wins, (time.perf_counter() - start_time) * 1000
+
+
 # ----------------------------
 # 5️⃣ Main driver with sampling + periodic aggregated logging
 # ----------------------------
@@ -93,56 +112,198 @@ def main():
     parser.add_argument("--samples", "-N", type=int, default=100000, help="Number of random bitstrings to sample.")
     parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducibility.")
     parser.add_argument("--interval", type=int, default=1000, help="How often to log aggregated progress.")
+    parser.add_argument("--replacement", choices=("with", "without"), default="without",
+                        help="Sample assignments with replacement, or never the same one twice "
+                             "(at most 2^n samples); uniform sampling only.")
+    parser.add_argument("--solver", choices=["python", "egsolver"], default="python",
+                        help="Minimal-credit fixpoint over blocks of --interval samples in-process (python), "
+                             "or one `egsolver solve` call per sample.")
+    parser.add_argument("--estimator", default="uniform",
+                        choices=("uniform", "stratified", "importance", "antithetic", "qmc"),
+                        help="Plain uniform sampling, stratification on the owners of the vertices closest "
+                             "to node 0, importance sampling with a proposal fitted on a pilot run, "
+                             "antithetic pairs, or randomized quasi-Monte Carlo nets.")
+    parser.add_argument("--strata", type=int, default=4,
+                        help="Number of vertices closest to node 0 to stratify on (2^k strata).")
+    parser.add_argument("--pilot", type=float, default=0.1,
+                        help="Fraction of the samples used to tune the stratified/importance estimator.")
+    parser.add_argument("--replicates", type=int, default=16,
+                        help="Independently randomized nets for --estimator qmc; the standard error "
+                             "comes from the spread of their means.")
+    parser.add_argument("--epsilon", type=float, default=None,
+                        help="Stop before N samples as soon as an anytime-valid confidence sequence "
+                             "certifies the probability to within +/- epsilon.")
+    parser.add_argument("--delta", type=float, default=0.05,
+                        help="Error probability of the --epsilon confidence sequence.")
+    parser.add_argument("--db", default=None,
+                        help="Also record the run and its progress lines in this SQLite results database "
+                             "(see results_db.py).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (uniform sampling only).")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="Seconds between progress checkpoints.")
     args = parser.parse_args()
+    if args.estimator != "uniform" and (args.solver != "python" or args.epsilon is not None):
+        parser.error("--estimator other than uniform needs --solver python and no --epsilon")
+    if args.resume and args.estimator != "uniform":
+        parser.error("--resume supports --estimator uniform only")
 
     os.makedirs(args.tmpdir, exist_ok=True)
-    random.seed(args.seed)
     print(f"Using random seed: {args.seed}")
 
     vertices, edges, weights, game_data = read_energy_game(args.input_file)
     n = len(vertices)
     total_possible = 2 ** n
 
+    # The checkpoint keeps the seed entropy next to the progress
+    log_file = f"{os.path.splitext(args.input_file)[0]}_energy_results_sampled.txt"
+    checkpoint = Checkpoint(checkpoint_path(log_file), args.input_file,
+                            {"samples": args.samples, "interval": args.interval, "replacement": args.replacement,
+                             "seed": args.seed, "epsilon": args.epsilon, "delta": args.delta},
+                            args.checkpoint_interval)
+    try:
+        progress = checkpoint.load() if args.resume else None
+        check_log(log_file, progress)
+    except ValueError as e:
+        parser.error(str(e))
+
+    seed = args.seed if progress is None else progress["entropy"]
+    sampler = OwnerSampler(n, seed, replace=args.replacement == "with")
+    if sampler.limit(args.samples) < args.samples:
+        print(f"Only {total_possible} distinct assignments exist; sampling all of them.")
+        args.samples = sampler.limit(args.samples)
+
     print(f"{n} vertices detected. Sampling {args.samples} / {total_possible} assignments using {args.workers} workers...")
+    run = None
+    if args.db is not None:
+        run = Run(args.db, args.input_file, checkpoint.digest, "energy", "fpraas", solver=args.solver,
+                  estimator=args.estimator, samples=args.samples, seed=sampler.entropy,
+                  run_id=progress.get("run_id") if progress is not None else None,
+                  resume_at=progress["solved"] if progress is not None else 0)
 
-    # ✅ Random unique bitstrings
-    bit_strings = set()
-    while len(bit_strings) < args.samples:
-        bit_strings.add("".join(random.choice("01") for _ in range(n)))
-    bit_strings = list(bit_strings)
+    if args.estimator != "uniform":
+        # Variance-reduced estimate with the in-process solver, in this process
+        arena = EnergyArena(n, edges, weights)
+        rng = sampler.rng
+        start = time.perf_counter()
+        if args.estimator == "stratified":
+            strata = nearest_vertices([edges.get(v, []) for v in range(n)], args.strata)
+            estimate, variance, used = stratified_estimate(arena.v0_wins, n, strata, args.samples, rng,
+                                                           args.pilot, args.interval)
+        elif args.estimator == "importance":
+            estimate, variance, used = importance_estimate(arena.v0_wins, n, args.samples, rng,
+                                                           args.pilot, block_size=args.interval)
+        elif args.estimator == "antithetic":
+            estimate, variance, used = antithetic_estimate(arena.v0_wins, n, args.samples, rng, args.interval)
+        else:
+            estimate, variance, used = qmc_estimate(arena.v0_wins, n, args.samples, rng, args.replicates,
+                                                    args.interval)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        summary = describe(args.estimator, estimate, variance, used)
+        # The estimate is not a wins/samples count, so it gets its own file next to the uniform log
+        estimator_file = f"{os.path.splitext(log_file)[0]}_{args.estimator}.txt"
+        with open(estimator_file, "w") as logf:
+            logf.write(f"{estimate:.6f}; {elapsed_ms:.3f}\n# {summary}\n")
+        if run is not None:
+            run.finish(games=used, solver_ms=elapsed_ms, estimate=estimate, summary=summary)
+        print(f"\n Finished sampling {used} bitstrings")
+        print(summary)
+        print(f"Total solver time (wall-clock): {elapsed_ms:.3f} ms")
+        return
 
-    log_file = f"{os.path.splitext(args.input_file)[0]}_energy_results_sampled.txt"
     total_aggregated = 0
     total_time_ms = 0.0
     solved = 0
+    stopper = SequentialStop(args.epsilon, args.delta) if args.epsilon is not None else None
+
+    # Samples are drawn in blocks of --interval, so a checkpoint is taken at a block boundary
+    first_block = 0
+    if progress is not None:
+        first_block = progress["next_block"]
+        solved, total_aggregated, total_time_ms = progress["solved"], progress["wins"], progress["time_ms"]
+        if stopper is not None:
+            stopper.restore(progress["stopper"])
+        print(f"Resuming after {solved}/{args.samples} samples.")
+
+    def save_progress(logf):
+        # The database is never behind the checkpoint; rows beyond it are dropped on resume
+        if run is not None:
+            run.flush()
+        checkpoint.save({"entropy": sampler.entropy, "next_block": solved // args.interval,
+                         "solved": solved, "wins": total_aggregated, "time_ms": total_time_ms,
+                         "stopper": stopper.state() if stopper is not None else None,
+                         "log_size": logf.tell(), "run_id": run.id if run is not None else None})
 
     start_global = time.perf_counter()
 
-    with open(log_file, "w") as logf:
+    with resume_log(log_file, progress) as logf:
         with Pool(processes=args.workers) as pool:
-            worker = partial(solve_one, base_game=game_data, tmp_dir=args.tmpdir)
-            for idx, (bit_string, agg_value, elapsed_ms, solver_output) in enumerate(pool.imap_unordered(worker, bit_strings), 1):
-                total_aggregated += agg_value
-                total_time_ms += elapsed_ms
-
-                # logf.write(f"Bit string: {bit_string}\n")
-                # logf.write(solver_output.strip() + "\n")
-                # logf.write(f"Winner (1=MAX wins, 0=LOSES): {agg_value}\n")
-                # logf.write(f"Time: {elapsed_ms:.3f} ms\n")
-                # logf.write("-" * 40 + "\n")
-
-                # every 1000 samples, log progress summary
-                if idx % 1000 == 0:
-                    elapsed_sec = (time.perf_counter() - start_global)
-                    summary = f"{total_aggregated}/{idx}; {total_time_ms:.3f}\n"
+            if args.solver == "python":
+                worker = partial(solve_block, base_game=game_data)
+                blocks = sampler.blocks(args.samples, args.interval, first_block)
+                for wins, elapsed_ms in pool.imap(worker, blocks):
+                    if stopper is not None:
+                        wins = wins[:stopper.feed(wins)]
+                    total_aggregated += int(wins.sum())
+                    total_time_ms += elapsed_ms
+                    solved += len(wins)
+                    summary = f"{total_aggregated}/{solved}; {total_time_ms:.3f}\n"
                     print(summary.strip())
                     logf.write(summary)
                     logf.flush()
+                    if run is not None:
+                        run.progress(solved, total_aggregated, total_time_ms)
+                    if stopper is not None and stopper.stopped:
+                        break
+                    if checkpoint.due():
+                        save_progress(logf)
+            else:
+                worker = partial(solve_one, base_game=game_data, tmp_dir=args.tmpdir)
+                bit_strings = (b for owners in sampler.blocks(args.samples, args.interval, first_block)
+                               for b in owner_strings(owners))
+                # Completion order may depend on the outcome, so sequential
+                # stopping and checkpoints take the samples in the order they were drawn
+                results = pool.imap(worker, bit_strings)
+                for idx, (bit_string, agg_value, elapsed_ms, solver_output) in enumerate(results, solved + 1):
+                    total_aggregated += agg_value
+                    total_time_ms += elapsed_ms
+                    solved = idx
+
+                    # logf.write(f"Bit string: {bit_string}\n")
+                    # logf.write(solver_output.strip() + "\n")
+                    # logf.write(f"Winner (1=MAX wins, 0=LOSES): {agg_value}\n")
+                    # logf.write(f"Time: {elapsed_ms:.3f} ms\n")
+                    # logf.write("-" * 40 + "\n")
+
+                    # every 1000 samples, log progress summary
+                    if idx % 1000 == 0:
+                        elapsed_sec = (time.perf_counter() - start_global)
+                        summary = f"{total_aggregated}/{idx}; {total_time_ms:.3f}\n"
+                        print(summary.strip())
+                        logf.write(summary)
+                        logf.flush()
+                        if run is not None:
+                            run.progress(idx, total_aggregated, total_time_ms)
+
+                    if stopper is not None:
+                        stopper.feed([agg_value])
+                        if stopper.stopped:
+                            break
+                    if idx % args.interval == 0 and checkpoint.due():
+                        save_progress(logf)
 
     elapsed_total = (time.perf_counter() - start_global) * 1000
-    print(f"\n Finished sampling {args.samples} bitstrings")
-    print(f"Total aggregated value: {total_aggregated}/{args.samples}")
+    print(f"\n Finished sampling {solved} bitstrings")
+    print(f"Total aggregated value: {total_aggregated}/{solved}")
     print(f"Total solver time (wall-clock): {elapsed_total:.3f} ms")
+    if stopper is not None:
+        print(stopper.summary(solved))
+        with open(log_file, "a") as logf:
+            logf.write(f"# {stopper.summary(solved)}\n")
+    if run is not None:
+        run.finish(total_aggregated, solved, total_time_ms,
+                   summary=stopper.summary(solved) if stopper is not None else None)
+    checkpoint.clear()
 
     # with open(log_file, "a") as logf:
     #     logf.write(f"\n✅ All results saved to {log_file}\n")
@@ -1,17 +1,38 @@
 import re
 import argparse
-import random
 import os
-import subprocess
 import time
 from collections import deque
 
+import numpy as np
+
+from arena_cache import KIND_DOT, load_arena
+from attractor import pack_lanes
+from checkpoint import Checkpoint, check_log, checkpoint_path, resume_log
+from confidence import SequentialStop
+from dot_template import DotTemplate, run_csv_solver
+from estimators import (antithetic_estimate, describe, importance_estimate, nearest_vertices,
+                        qmc_estimate, stratified_estimate)
+from lasso import highest_cycle_parities
+from results_db import Run
+from sampling import OwnerSampler, owner_strings
+from solver_worker import SolverWorker
+from zielonka import ParityArena
+
+PRIORITY_PROMOTION_SOLVER = "../ggg/build/solvers/parity/priority_promotion/priority_promotion_solver"
+
 def read_graph(dot_file):
     """
     Parse the DOT file and return:
       - vertices: dict of {vertex_name: priority}
       - edges: adjacency list {vertex: [neighbors]}
+    Read from the binary arena cache instead if the file has been converted
+    (cache-arenas.py).
     """
+    cached = load_arena(dot_file, KIND_DOT)
+    if cached is not None:
+        return cached.parity_graph()
+
     vertex_pattern = re.compile(
         r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
     )
@@ -47,27 +68,7 @@ def find_lasso_highest_priority(vertices, edges, parity=0):
     parity = 0 for even, 1 for odd.
     Returns True if such a lasso exists.
     """
-    stack = [("v0", [])]  # (current_vertex, path_so_far)
-
-    while stack:
-        current, path = stack.pop()
-
-        if current in path:
-            # Found a cycle: cycle = path from first occurrence to end
-            cycle_start = path.index(current)
-            cycle = path[cycle_start:] + [current]
-
-            # Highest priority in the cycle
-            max_priority = max(vertices[v] for v in cycle)
-            if max_priority % 2 == parity:
-                return True
-            continue
-
-        new_path = path + [current]
-        for neighbor in edges.get(current, []):
-            stack.append((neighbor, new_path))
-
-    return False
+    return parity in highest_cycle_parities(vertices, edges)
 
 
 # ----------------------------
@@ -81,30 +82,6 @@ def v0_lasso_odd(vertices, edges):
     """Check if there exists a lasso reachable from v0 with cycle's highest priority odd."""
     return find_lasso_highest_priority(vertices, edges, parity=1)
 
-def replace_players_in_dot(dot_file, output_file, bit_string):
-    """Replace player assignments in DOT file according to bit_string."""
-    vertex_pattern = re.compile(
-        r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
-    )
-
-    with open(dot_file, "r") as f:
-        lines = f.readlines()
-
-    updated_lines = []
-    for line in lines:
-        match = vertex_pattern.match(line.strip())
-        if match:
-            vertex_name = match.group("vertex")
-            vertex_index = int(vertex_name[1:])
-            new_player = bit_string[vertex_index]
-            new_line = re.sub(r'player=\d+', f'player={new_player}', line)
-            updated_lines.append(new_line)
-        else:
-            updated_lines.append(line)
-
-    with open(output_file, "w") as f:
-        f.writelines(updated_lines)
-
 def parse_solver_csv(output):
     """
     Parse solver output in CSV mode.
@@ -127,16 +104,60 @@ def main():
     parser.add_argument("input_file", help="Path to the input DOT file.")
     parser.add_argument("output_file", help="Path to save the modified DOT file.")
     parser.add_argument("N", type=int, help="Number of random samples to generate.")
+    parser.add_argument("--solver", choices=("bitsliced", "ggg"), default="bitsliced",
+                        help="Solve blocks of samples with the bit-sliced Zielonka solver in-process "
+                             "(bitsliced), or every sample with priority_promotion_solver (ggg).")
+    parser.add_argument("--block-size", type=int, default=16384,
+                        help="Samples drawn and solved together with --solver bitsliced.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for the sampled owners.")
+    parser.add_argument("--replacement", choices=("with", "without"), default="with",
+                        help="Sample assignments with replacement, or never the same one twice "
+                             "(at most 2^n samples); uniform sampling only.")
+    parser.add_argument("--estimator", default="uniform",
+                        choices=("uniform", "stratified", "importance", "antithetic", "qmc"),
+                        help="Plain uniform sampling, stratification on the owners of the vertices closest "
+                             "to v0, importance sampling with a proposal fitted on a pilot run, "
+                             "antithetic pairs, or randomized quasi-Monte Carlo nets.")
+    parser.add_argument("--strata", type=int, default=4,
+                        help="Number of vertices closest to v0 to stratify on (2^k strata).")
+    parser.add_argument("--pilot", type=float, default=0.1,
+                        help="Fraction of the samples used to tune the stratified/importance estimator.")
+    parser.add_argument("--replicates", type=int, default=16,
+                        help="Independently randomized nets for --estimator qmc; the standard error "
+                             "comes from the spread of their means.")
+    parser.add_argument("--epsilon", type=float, default=None,
+                        help="Stop before N samples as soon as an anytime-valid confidence sequence "
+                             "certifies the probability to within +/- epsilon.")
+    parser.add_argument("--delta", type=float, default=0.05,
+                        help="Error probability of the --epsilon confidence sequence.")
+    parser.add_argument("--worker", action="store_true",
+                        help="Keep one solver process running in batch mode instead of starting it "
+                             "for every sample.")
+    parser.add_argument("--db", default=None,
+                        help="Also record the run and its progress lines in this SQLite results database "
+                             "(see results_db.py).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (uniform sampling only).")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="Seconds between progress checkpoints.")
     args = parser.parse_args()
+    if args.estimator != "uniform" and (args.solver != "bitsliced" or args.epsilon is not None):
+        parser.error("--estimator other than uniform needs --solver bitsliced and no --epsilon")
+    if args.resume and args.estimator != "uniform":
+        parser.error("--resume supports --estimator uniform only")
 
     # --- Graph Analysis ---
     vertices, edges = read_graph(args.input_file)
     n = len(vertices)
 
-    v0_has_even_cycle = v0_lasso_even(vertices, edges)
+    # Both screens come from one pass over the priorities
+    cycle_parities = highest_cycle_parities(vertices, edges)
+
+    v0_has_even_cycle = 0 in cycle_parities
     print(f"v0 can reach a simple cycle with highest priority even: {v0_has_even_cycle}")
 
-    v0_has_odd_cycle = v0_lasso_odd(vertices, edges)
+    v0_has_odd_cycle = 1 in cycle_parities
     print(f"All simple cycles reachable from v0 have highest priority even: {v0_has_odd_cycle}")
 
     # --- Early Termination Condition ---
@@ -145,59 +166,194 @@ def main():
               "or all simple cycles reachable from v0 have highest priority even.")
         return
 
-    # Prepare log file for this input DOT file
+    # Prepare log file for this input DOT file; the checkpoint keeps the
+    # seed entropy, so unseeded runs resume too
     log_file = f"{os.path.splitext(args.input_file)[0]}_sampled_results.txt"
+    checkpoint = Checkpoint(checkpoint_path(log_file), args.input_file,
+                            {"N": args.N, "block_size": args.block_size, "replacement": args.replacement,
+                             "seed": args.seed, "epsilon": args.epsilon, "delta": args.delta},
+                            args.checkpoint_interval)
+    try:
+        progress = checkpoint.load() if args.resume else None
+        check_log(log_file, progress)
+    except ValueError as e:
+        parser.error(str(e))
+
+    seed = args.seed if progress is None else progress["entropy"]
+    sampler = OwnerSampler(n, seed, replace=args.replacement == "with")
+    if sampler.limit(args.N) < args.N:
+        print(f"Only {sampler.limit(args.N)} distinct assignments exist; sampling all of them.")
+        args.N = sampler.limit(args.N)
+    # The ggg solver reads the DOT text; the in-process solver only needs the parsed graph
+    template = DotTemplate(args.input_file) if args.solver == "ggg" else None
+
     total_aggregated = 0
     total_time_ms = 0.0
     games_solved = 0  # Counter for games solved
 
-    with open(log_file, "w") as logf:
-        for i in range(args.N):
-            bit_string = "".join(random.choice("01") for _ in range(n))
+    stopper = SequentialStop(args.epsilon, args.delta) if args.epsilon is not None else None
+
+    # Samples are drawn in blocks, so a checkpoint is taken at a block boundary
+    first_block = 0
+    if progress is not None:
+        first_block = progress["next_block"]
+        games_solved, total_aggregated, total_time_ms = progress["solved"], progress["wins"], progress["time_ms"]
+        if stopper is not None:
+            stopper.restore(progress["stopper"])
+        print(f"Resuming after {games_solved}/{args.N} samples.")
+    run = None
+    if args.db is not None:
+        run = Run(args.db, args.input_file, checkpoint.digest, "parity", "fpraas", solver=args.solver,
+                  estimator=args.estimator, samples=args.N, seed=sampler.entropy,
+                  run_id=progress.get("run_id") if progress is not None else None, resume_at=games_solved)
+
+    def save_progress(logf):
+        # The database is never behind the checkpoint; rows beyond it are dropped on resume
+        if run is not None:
+            run.flush()
+        checkpoint.save({"entropy": sampler.entropy, "next_block": games_solved // args.block_size,
+                         "solved": games_solved, "wins": total_aggregated, "time_ms": total_time_ms,
+                         "stopper": stopper.state() if stopper is not None else None,
+                         "log_size": logf.tell(), "run_id": run.id if run is not None else None})
+    if args.estimator != "uniform":
+        # Variance-reduced estimate with the in-process bit-sliced Zielonka solver
+        arena = ParityArena(vertices, edges)
+
+        def solve_rows(owners):
+            return arena.v0_wins_lanes(pack_lanes(owners.T), len(owners))
+
+        successors = [[int(t[1:]) for t in edges[f"v{i}"]] for i in range(n)]
+        rng = sampler.rng
+        start = time.perf_counter()
+        if args.estimator == "stratified":
+            strata = nearest_vertices(successors, args.strata)
+            estimate, variance, used = stratified_estimate(solve_rows, n, strata, args.N, rng,
+                                                           args.pilot, args.block_size)
+        elif args.estimator == "importance":
+            estimate, variance, used = importance_estimate(solve_rows, n, args.N, rng,
+                                                           args.pilot, block_size=args.block_size)
+        elif args.estimator == "antithetic":
+            estimate, variance, used = antithetic_estimate(solve_rows, n, args.N, rng, args.block_size)
+        else:
+            estimate, variance, used = qmc_estimate(solve_rows, n, args.N, rng, args.replicates,
+                                                    args.block_size)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        summary = describe(args.estimator, estimate, variance, used)
+        # The estimate is not a wins/samples count, so it gets its own file next to the uniform log
+        estimator_file = f"{os.path.splitext(log_file)[0]}_{args.estimator}.txt"
+        with open(estimator_file, "w") as logf:
+            logf.write(f"{estimate:.6f}; {elapsed_ms:.3f}\n# {summary}\n")
+        if run is not None:
+            run.finish(games=used, solver_ms=elapsed_ms, estimate=estimate, summary=summary)
+        print(f"\nAll results saved to {estimator_file}")
+        print(f"Total samples solved: {used}")
+        print(summary)
+        print(f"Total Python-measured solver time: {elapsed_ms:.3f} ms")
+        return
 
-            # Replace players
-            replace_players_in_dot(args.input_file, args.output_file, bit_string)
+    worker = None
+    if args.solver == "bitsliced":
+        arena = ParityArena(vertices, edges)
+        with resume_log(log_file, progress) as logf:
+            for owners in sampler.blocks(args.N, args.block_size, first_block):
+                count = len(owners)
+
+                # One owner lane matrix and one Zielonka pass for the whole block
+                start_time = time.perf_counter()
+                owner_lanes = pack_lanes(owners.T)
+                wins = arena.v0_wins_lanes(owner_lanes, count)
+                end_time = time.perf_counter()
+                elapsed_ms = (end_time - start_time) * 1000
+
+                if stopper is not None:
+                    count = stopper.feed(wins)
+                    wins = wins[:count]
+
+                # Keep one log line per 1000 samples; the block time is spread evenly
+                running = np.cumsum(wins)
+                for solved in range(games_solved + 1000 - games_solved % 1000, games_solved + count + 1, 1000):
+                    offset = solved - games_solved
+                    wins_so_far = total_aggregated + int(running[offset - 1])
+                    time_so_far = total_time_ms + elapsed_ms * offset / count
+                    logf.write(f"{wins_so_far}/{solved}; {time_so_far:.3f}\n")
+                    if run is not None:
+                        run.progress(solved, wins_so_far, time_so_far)
+                logf.flush()
+
+                total_aggregated += int(running[-1])
+                total_time_ms += elapsed_ms
+                games_solved += count
+                print(f"Solved {games_solved}/{args.N} | "
+                    f"Agg: {total_aggregated}/{games_solved} | Time: {total_time_ms:.3f} ms")
+                if stopper is not None and stopper.stopped:
+                    break
+                if checkpoint.due():
+                    save_progress(logf)
+    else:
+        bit_strings = (b for owners in sampler.blocks(args.N, args.block_size, first_block)
+                       for b in owner_strings(owners))
+        worker = SolverWorker(PRIORITY_PROMOTION_SOLVER, args.input_file) if args.worker else None
+        if worker is not None:
+            # Requests are pipelined, so the time is taken per answer received
+            solved = ((b, 1 if w[0] == "0" else 0) for b, w in worker.solve_many(bit_strings))
+        else:
+            solved = ((b, parse_solver_csv(run_csv_solver(PRIORITY_PROMOTION_SOLVER, template, args.output_file, b)))
+                      for b in bit_strings)
 
-            # Time the solver call
+        with resume_log(log_file, progress) as logf:
+            # Time the solver calls
             start_time = time.perf_counter()
-            try:
-                solver_output = subprocess.check_output([
-                    "../ggg/build/solvers/parity/priority_promotion/priority_promotion_solver",
-                    "-i", args.output_file,
-                    "--csv"
-                ], text=True)
-            except subprocess.CalledProcessError as e:
-                solver_output = f"Solver error: {e}"
-            end_time = time.perf_counter()
-
-            elapsed_ms = (end_time - start_time) * 1000
-            total_time_ms += elapsed_ms
-
-            # Parse solver CSV output for aggregation
-            agg_value = parse_solver_csv(solver_output)
-            total_aggregated += agg_value
-
-            # Update counter
-            games_solved += 1
+            for bit_string, agg_value in solved:
+                end_time = time.perf_counter()
+
+                elapsed_ms = (end_time - start_time) * 1000
+                total_time_ms += elapsed_ms
+
+                # Aggregate the winner of v0
+                total_aggregated += agg_value
+
+                # Update counter
+                games_solved += 1
             
-            # logf.write(f"Sample {i+1}/{args.N} bitstring: {bit_string}\n")
-            # logf.write(solver_output.strip() + "\n")
-            # logf.write(f"Python measured time: {elapsed_ms:.3f} ms\n")
-            # logf.write(f"Winner aggregated value: {agg_value}\n")
-            # logf.write("-" * 40 + "\n")
-
-            # Console progress (print only every 1000 games)
-            if games_solved % 1000 == 0:
-                logf.write(f"{total_aggregated}/{games_solved}; {total_time_ms:.3f}\n")
-                logf.flush()  # <-- force write to disk
-                print(f"Solved {games_solved}/{args.N} | "
-                    f"Agg: {total_aggregated}/{games_solved} | Time: {total_time_ms:.3f} ms")
+                # logf.write(f"Sample {i+1}/{args.N} bitstring: {bit_string}\n")
+                # logf.write(solver_output.strip() + "\n")
+                # logf.write(f"Python measured time: {elapsed_ms:.3f} ms\n")
+                # logf.write(f"Winner aggregated value: {agg_value}\n")
+                # logf.write("-" * 40 + "\n")
+
+                # Console progress (print only every 1000 games)
+                if games_solved % 1000 == 0:
+                    logf.write(f"{total_aggregated}/{games_solved}; {total_time_ms:.3f}\n")
+                    logf.flush()  # <-- force write to disk
+                    if run is not None:
+                        run.progress(games_solved, total_aggregated, total_time_ms)
+                    print(f"Solved {games_solved}/{args.N} | "
+                        f"Agg: {total_aggregated}/{games_solved} | Time: {total_time_ms:.3f} ms")
+
+                if stopper is not None:
+                    stopper.feed([agg_value])
+                    if stopper.stopped:
+                        break
+                if games_solved % args.block_size == 0 and checkpoint.due():
+                    save_progress(logf)
+                start_time = time.perf_counter()
+
+    if worker is not None:
+        worker.close()
 
     print(f"\nAll results saved to {log_file}")
     print(f"Total samples solved: {games_solved}/{args.N}")
     print(f"Total aggregated value: {total_aggregated}")
     print(f"Total Python-measured solver time: {total_time_ms:.3f} ms")
     print(f"Average time per sample: {total_time_ms / games_solved:.3f} ms")
+    if stopper is not None:
+        print(stopper.summary(games_solved))
+        with open(log_file, "a") as logf:
+            logf.write(f"# {stopper.summary(games_solved)}\n")
+    if run is not None:
+        run.finish(total_aggregated, games_solved, total_time_ms,
+                   summary=stopper.summary(games_solved) if stopper is not None else None)
+    checkpoint.clear()
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,25 @@
 import re
 import argparse
-import random
 import os
-import subprocess
 import time
 from collections import deque
 
+import numpy as np
+
+from arena_cache import KIND_DOT, load_arena
+from attractor import ReachabilityArena
+from checkpoint import Checkpoint, check_log, checkpoint_path, resume_log
+from confidence import SequentialStop
+from dot_template import DotTemplate, run_csv_solver
+from estimators import (antithetic_estimate, describe, importance_estimate, nearest_vertices,
+                        qmc_estimate, stratified_estimate)
+from lasso import find_lasso
+from results_db import Run
+from sampling import OwnerSampler, owner_strings
+from solver_worker import SolverWorker
+
+GGG_REACHABILITY = "../ggg/build/solvers/parity/reachability/ggg_reachability"
+
 # ------------------------------------------------
 # Parse DOT graph
 # ------------------------------------------------
@@ -14,7 +28,13 @@ def read_graph(dot_file):
     Parse the DOT file and return:
       - vertices: dict of {vertex_name: priority}
       - edges: adjacency list {vertex: [neighbors]}
+    Read from the binary arena cache instead if the file has been converted
+    (cache-arenas.py).
     """
+    cached = load_arena(dot_file, KIND_DOT)
+    if cached is not None:
+        return cached.parity_graph()
+
     vertex_pattern = re.compile(
         r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
     )
@@ -98,60 +118,22 @@ def v0_reaches_only_priority0(vertices, edges):
     return True
 
 
+def priority0_lasso(vertices, edges):
+    """
+    Return a lasso (stem, cycle) from v0 on which every vertex has
+    priority 0, or None. Linear time via the SCCs of the priority-0
+    subgraph reachable from v0.
+    """
+    priority0 = {v for v, priority in vertices.items() if priority == 0}
+    return find_lasso(edges, "v0", priority0)
+
+
 def has_full_priority0_lasso(vertices, edges):
     """
     Check if there is a lasso-like path starting from v0 such that
     every vertex along the path and in the cycle has priority 0.
     """
-    if "v0" not in vertices or vertices["v0"] != 0:
-        return False
-
-    stack = [("v0", [])]  # (current_vertex, path_from_v0)
-
-    while stack:
-        current, path = stack.pop()
-
-        if vertices.get(current, -1) != 0:
-            continue
-
-        # Cycle detection
-        if current in path:
-            # All vertices along path have already been checked for priority=0
-            return True
-
-        new_path = path + [current]
-        for neighbor in edges.get(current, []):
-            stack.append((neighbor, new_path))
-
-    return False
-
-
-# ------------------------------------------------
-# Player replacement
-# ------------------------------------------------
-def replace_players_in_dot(dot_file, output_file, bit_string):
-    """Replace player assignments in DOT file according to bit_string."""
-    vertex_pattern = re.compile(
-        r'^(?P<vertex>v\d+)\s+\[name="[^"]+",\s+player=(?P<player>\d+),\s+priority=(?P<priority>\d+)\];'
-    )
-
-    with open(dot_file, "r") as f:
-        lines = f.readlines()
-
-    updated_lines = []
-    for line in lines:
-        match = vertex_pattern.match(line.strip())
-        if match:
-            vertex_name = match.group("vertex")
-            vertex_index = int(vertex_name[1:])
-            new_player = bit_string[vertex_index]
-            new_line = re.sub(r'player=\d+', f'player={new_player}', line)
-            updated_lines.append(new_line)
-        else:
-            updated_lines.append(line)
-
-    with open(output_file, "w") as f:
-        f.writelines(updated_lines)
+    return priority0_lasso(vertices, edges) is not None
 
 
 # ------------------------------------------------
@@ -171,6 +153,11 @@ def parse_solver_csv(output):
     return 0
 
 
+def run_ggg_reachability(template, output_file, bit_string):
+    """Solve one assignment with the ggg_reachability binary; return 1 if v0 is won by player 0."""
+    return parse_solver_csv(run_csv_solver(GGG_REACHABILITY, template, output_file, bit_string))
+
+
 # ------------------------------------------------
 # Main
 # ------------------------------------------------
@@ -181,7 +168,50 @@ def main():
     parser.add_argument("input_file", help="Path to the input DOT file.")
     parser.add_argument("output_file", help="Path to save the modified DOT file.")
     parser.add_argument("N", type=int, help="Number of random samples to generate.")
+    parser.add_argument("--solver", choices=("batch", "python", "ggg"), default="batch",
+                        help="Solve blocks of samples with one array attractor (batch), samples one by one "
+                             "in-process (python), or with the ggg_reachability binary.")
+    parser.add_argument("--block-size", type=int, default=16384,
+                        help="Samples drawn and solved together with --solver batch.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for the sampled owners.")
+    parser.add_argument("--replacement", choices=("with", "without"), default="with",
+                        help="Sample assignments with replacement, or never the same one twice "
+                             "(at most 2^n samples); uniform sampling only.")
+    parser.add_argument("--estimator", default="uniform",
+                        choices=("uniform", "stratified", "importance", "antithetic", "qmc"),
+                        help="Plain uniform sampling, stratification on the owners of the vertices closest "
+                             "to v0, importance sampling with a proposal fitted on a pilot run, "
+                             "antithetic pairs, or randomized quasi-Monte Carlo nets.")
+    parser.add_argument("--strata", type=int, default=4,
+                        help="Number of vertices closest to v0 to stratify on (2^k strata).")
+    parser.add_argument("--pilot", type=float, default=0.1,
+                        help="Fraction of the samples used to tune the stratified/importance estimator.")
+    parser.add_argument("--replicates", type=int, default=16,
+                        help="Independently randomized nets for --estimator qmc; the standard error "
+                             "comes from the spread of their means.")
+    parser.add_argument("--epsilon", type=float, default=None,
+                        help="Stop before N samples as soon as an anytime-valid confidence sequence "
+                             "certifies the probability to within +/- epsilon.")
+    parser.add_argument("--delta", type=float, default=0.05,
+                        help="Error probability of the --epsilon confidence sequence.")
+    parser.add_argument("--cross-check", action="store_true",
+                        help="Solve every sample with both backends and abort on disagreement.")
+    parser.add_argument("--worker", action="store_true",
+                        help="Keep one ggg_reachability process running in batch mode instead of "
+                             "starting it for every sample.")
+    parser.add_argument("--db", default=None,
+                        help="Also record the run and its progress lines in this SQLite results database "
+                             "(see results_db.py).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (uniform sampling only).")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="Seconds between progress checkpoints.")
     args = parser.parse_args()
+    if args.estimator != "uniform" and (args.solver != "batch" or args.epsilon is not None):
+        parser.error("--estimator other than uniform needs --solver batch and no --epsilon")
+    if args.resume and args.estimator != "uniform":
+        parser.error("--resume supports --estimator uniform only")
 
     # --- Graph Analysis ---
     vertices, edges = read_graph(args.input_file)
@@ -198,54 +228,205 @@ def main():
         print("Early termination: no need to sample.")
         return
 
+    # Prepare log; the checkpoint keeps the seed entropy, so unseeded runs resume too
+    log_file = f"{os.path.splitext(args.input_file)[0]}_sampled_results.txt"
+    checkpoint = Checkpoint(checkpoint_path(log_file), args.input_file,
+                            {"N": args.N, "block_size": args.block_size, "replacement": args.replacement,
+                             "seed": args.seed, "epsilon": args.epsilon, "delta": args.delta},
+                            args.checkpoint_interval)
+    try:
+        progress = checkpoint.load() if args.resume else None
+        check_log(log_file, progress)
+    except ValueError as e:
+        parser.error(str(e))
+
+    seed = args.seed if progress is None else progress["entropy"]
+    sampler = OwnerSampler(n, seed, replace=args.replacement == "with")
+    if sampler.limit(args.N) < args.N:
+        print(f"Only {sampler.limit(args.N)} distinct assignments exist; sampling all of them.")
+        args.N = sampler.limit(args.N)
     print(f"Detected {n} vertices. Sampling {args.N} random player assignments...")
+    arena = ReachabilityArena(vertices, edges)
+    # The ggg solver reads the DOT text; the in-process solvers only need the parsed graph
+    template = DotTemplate(args.input_file) if args.solver == "ggg" or args.cross_check else None
+    worker = SolverWorker(GGG_REACHABILITY, args.input_file) if args.worker else None
+
+    def solve_ggg(bit_string):
+        if worker is not None:
+            return 1 if worker.solve(bit_string)[0] == "0" else 0
+        return run_ggg_reachability(template, args.output_file, bit_string)
 
-    # Prepare log
-    log_file = f"{os.path.splitext(args.input_file)[0]}_sampled_results.txt"
     total_aggregated = 0
     total_time_ms = 0.0
     games_solved = 0
+    stopper = SequentialStop(args.epsilon, args.delta) if args.epsilon is not None else None
+
+    # Samples are drawn in blocks, so a checkpoint is taken at a block boundary
+    first_block = 0
+    if progress is not None:
+        first_block = progress["next_block"]
+        games_solved, total_aggregated, total_time_ms = progress["solved"], progress["wins"], progress["time_ms"]
+        if stopper is not None:
+            stopper.restore(progress["stopper"])
+        print(f"Resuming after {games_solved}/{args.N} samples.")
+    run = None
+    if args.db is not None:
+        run = Run(args.db, args.input_file, checkpoint.digest, "reach", "fpraas", solver=args.solver,
+                  estimator=args.estimator, samples=args.N, seed=sampler.entropy,
+                  run_id=progress.get("run_id") if progress is not None else None, resume_at=games_solved)
+
+    def save_progress(logf):
+        # The database is never behind the checkpoint; rows beyond it are dropped on resume
+        if run is not None:
+            run.flush()
+        checkpoint.save({"entropy": sampler.entropy, "next_block": games_solved // args.block_size,
+                         "solved": games_solved, "wins": total_aggregated, "time_ms": total_time_ms,
+                         "stopper": stopper.state() if stopper is not None else None,
+                         "log_size": logf.tell(), "run_id": run.id if run is not None else None})
+
+    if args.estimator != "uniform":
+        # Variance-reduced estimate with the in-process batch solver
+        rng = sampler.rng
+        start = time.perf_counter()
+        if args.estimator == "stratified":
+            strata = nearest_vertices(arena.successors, args.strata)
+            estimate, variance, used = stratified_estimate(arena.v0_wins_batch, n, strata, args.N, rng,
+                                                           args.pilot, args.block_size)
+        elif args.estimator == "importance":
+            estimate, variance, used = importance_estimate(arena.v0_wins_batch, n, args.N, rng,
+                                                           args.pilot, block_size=args.block_size)
+        elif args.estimator == "antithetic":
+            estimate, variance, used = antithetic_estimate(arena.v0_wins_batch, n, args.N, rng,
+                                                           args.block_size)
+        else:
+            estimate, variance, used = qmc_estimate(arena.v0_wins_batch, n, args.N, rng, args.replicates,
+                                                    args.block_size)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        summary = describe(args.estimator, estimate, variance, used)
+        # The estimate is not a wins/samples count, so it gets its own file next to the uniform log
+        estimator_file = f"{os.path.splitext(log_file)[0]}_{args.estimator}.txt"
+        with open(estimator_file, "w") as logf:
+            logf.write(f"{estimate:.6f}; {elapsed_ms:.3f}\n# {summary}\n")
+        if run is not None:
+            run.finish(games=used, solver_ms=elapsed_ms, estimate=estimate, summary=summary)
+        print(f"\nAll results saved to {estimator_file}")
+        print(f"Total samples solved: {used}")
+        print(summary)
+        print(f"Total Python-measured solver time: {elapsed_ms:.3f} ms")
+        return
 
-    with open(log_file, "w") as logf:
-        for i in range(args.N):
-            bit_string = "".join(random.choice("01") for _ in range(n))
-            replace_players_in_dot(args.input_file, args.output_file, bit_string)
-
-            start = time.perf_counter()
-            try:
-                solver_output = subprocess.check_output([
-                    "../ggg/build/solvers/parity/reachability/ggg_reachability",
-                    "-i", args.output_file,
-                    "--csv"
-                ], text=True)
-            except subprocess.CalledProcessError as e:
-                solver_output = f"Solver error: {e}"
-            end = time.perf_counter()
-
-            elapsed_ms = (end - start) * 1000
-            total_time_ms += elapsed_ms
-            agg_value = parse_solver_csv(solver_output)
-            total_aggregated += agg_value
-            games_solved += 1
-
-            # logf.write(f"Sample {i+1}/{args.N} bitstring: {bit_string}\n")
-            # logf.write(solver_output.strip() + "\n")
-            # logf.write(f"Python measured time: {elapsed_ms:.3f} ms\n")
-            # logf.write(f"Winner aggregated value: {agg_value}\n")
-            # logf.write("-" * 40 + "\n")
-
-            # Console progress (print only every 1000 games)
-            if games_solved % 1000 == 0:
-                logf.write(f"{total_aggregated}/{games_solved}; {total_time_ms:.3f}\n")
-                logf.flush()  # <-- force write to disk
+    if args.solver == "batch":
+        with resume_log(log_file, progress) as logf:
+            for owners in sampler.blocks(args.N, args.block_size, first_block):
+                count = len(owners)
+
+                # One attractor fixpoint for the whole block
+                start = time.perf_counter()
+                wins = arena.v0_wins_batch(owners)
+                end = time.perf_counter()
+                elapsed_ms = (end - start) * 1000
+
+                if args.cross_check:
+                    for bit_string, value in zip(owner_strings(owners), wins):
+                        other_value = solve_ggg(bit_string)
+                        if other_value != value:
+                            raise RuntimeError(f"Solver mismatch on {bit_string}: "
+                                               f"batch={int(value)}, other={other_value}")
+
+                if stopper is not None:
+                    count = stopper.feed(wins)
+                    wins = wins[:count]
+
+                # Keep one log line per 1000 samples; the block time is spread evenly
+                running = np.cumsum(wins)
+                for solved in range(games_solved + 1000 - games_solved % 1000, games_solved + count + 1, 1000):
+                    offset = solved - games_solved
+                    wins_so_far = total_aggregated + int(running[offset - 1])
+                    time_so_far = total_time_ms + elapsed_ms * offset / count
+                    logf.write(f"{wins_so_far}/{solved}; {time_so_far:.3f}\n")
+                    if run is not None:
+                        run.progress(solved, wins_so_far, time_so_far)
+                logf.flush()
+
+                total_aggregated += int(running[-1])
+                total_time_ms += elapsed_ms
+                games_solved += count
                 print(f"Solved {games_solved}/{args.N} | "
                     f"Agg: {total_aggregated}/{games_solved} | Time: {total_time_ms:.3f} ms")
+                if stopper is not None and stopper.stopped:
+                    break
+                if checkpoint.due():
+                    save_progress(logf)
+    else:
+        bit_strings = (b for owners in sampler.blocks(args.N, args.block_size, first_block)
+                       for b in owner_strings(owners))
+        if args.solver == "ggg" and worker is not None:
+            # Requests are pipelined, so the time is taken per answer received
+            solved = ((b, 1 if w[0] == "0" else 0) for b, w in worker.solve_many(bit_strings))
+        elif args.solver == "ggg":
+            solved = ((b, solve_ggg(b)) for b in bit_strings)
+        else:
+            solved = ((b, arena.v0_wins(b)) for b in bit_strings)
+
+        with resume_log(log_file, progress) as logf:
+            start = time.perf_counter()
+            for bit_string, agg_value in solved:
+                end = time.perf_counter()
+
+                elapsed_ms = (end - start) * 1000
+                total_time_ms += elapsed_ms
+
+                if args.cross_check:
+                    if args.solver == "ggg":
+                        other_value = arena.v0_wins(bit_string)
+                    else:
+                        other_value = solve_ggg(bit_string)
+                    if other_value != agg_value:
+                        raise RuntimeError(f"Solver mismatch on {bit_string}: "
+                                           f"{args.solver}={agg_value}, other={other_value}")
+
+                total_aggregated += agg_value
+                games_solved += 1
+
+                # logf.write(f"Sample {i+1}/{args.N} bitstring: {bit_string}\n")
+                # logf.write(solver_output.strip() + "\n")
+                # logf.write(f"Python measured time: {elapsed_ms:.3f} ms\n")
+                # logf.write(f"Winner aggregated value: {agg_value}\n")
+                # logf.write("-" * 40 + "\n")
+
+                # Console progress (print only every 1000 games)
+                if games_solved % 1000 == 0:
+                    logf.write(f"{total_aggregated}/{games_solved}; {total_time_ms:.3f}\n")
+                    logf.flush()  # <-- force write to disk
+                    if run is not None:
+                        run.progress(games_solved, total_aggregated, total_time_ms)
+                    print(f"Solved {games_solved}/{args.N} | "
+                        f"Agg: {total_aggregated}/{games_solved} | Time: {total_time_ms:.3f} ms")
+
+                if stopper is not None:
+                    stopper.feed([agg_value])
+                    if stopper.stopped:
+                        break
+                if games_solved % args.block_size == 0 and checkpoint.due():
+                    save_progress(logf)
+                start = time.perf_counter()
+
+    if worker is not None:
+        worker.close()
 
     print(f"\nAll results saved to {log_file}")
     print(f"Total samples solved: {games_solved}/{args.N}")
     print(f"Total aggregated value: {total_aggregated}")
     print(f"Total Python-measured solver time: {total_time_ms:.3f} ms")
     print(f"Average time per sample: {total_time_ms / games_solved:.3f} ms")
+    if stopper is not None:
+        print(stopper.summary(games_solved))
+        with open(log_file, "a") as logf:
+            logf.write(f"# {stopper.summary(games_solved)}\n")
+    if run is not None:
+        run.finish(total_aggregated, games_solved, total_time_ms,
+                   summary=stopper.summary(games_solved) if stopper is not None else None)
+    checkpoint.clear()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+"""
+Polynomial lasso and cycle-priority screens on parsed arenas.
+
+A lasso from v0 is a path from v0 into a cycle. Restricted to a set of
+allowed vertices, one exists iff the allowed subgraph reachable from v0 has
+a strongly connected component with a cycle, i.e. iff a depth-first search
+from v0 through allowed vertices meets a back edge. The search visits every
+vertex and edge at most once, unlike enumerating simple paths, and stops at
+the first back edge.
+
+For parity screens, a cycle reachable from v0 whose highest priority is p
+exists iff the reachable subgraph restricted to priorities <= p has a
+strongly connected component with a cycle that contains a vertex of
+priority p. One Tarjan pass per priority answers this in O(d * (n + m)).
+"""
+
+from reduction import forward_reachable
+
+
+def find_lasso(edges, start, allowed):
+    """
+    Look for a lasso from `start` that only visits vertices in `allowed`.
+    Returns (stem, cycle) with stem = [start, ..., u] and cycle =
+    [u, ..., u], or None if there is no such lasso.
+    """
+    if start not in allowed:
+        return None
+
+    # path holds the DFS stack, position[v] its index for vertices on it
+    path = [start]
+    position = {start: 0}
+    visited = {start}
+    work = [iter(edges.get(start, []))]
+
+    while work:
+        for w in work[-1]:
+            if w not in allowed:
+                continue
+            if w in position:
+                # Back edge: the stack from w onwards closes a cycle
+                at = position[w]
+                return path[:at + 1], path[at:] + [w]
+            if w not in visited:
+                visited.add(w)
+                position[w] = len(path)
+                path.append(w)
+                work.append(iter(edges.get(w, [])))
+                break
+        else:
+            work.pop()
+            del position[path.pop()]
+
+    return None
+
+
+def strongly_connected_components(successors):
+    """
+    Tarjan's algorithm, iterative. `successors` maps every vertex to its
+    successor list (all successors must be keys). Returns the components as
+    lists, in reverse topological order.
+    """
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+
+    for root in successors:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors[root]))]
+
+        while work:
+            v, neighbors = work[-1]
+            for w in neighbors:
+                if w not in index:
+                    index[w] = low[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(successors[w])))
+                    break
+                if w in on_stack:
+                    low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+
+    return components
+
+
+def highest_cycle_parities(vertices, edges, start="v0"):
+    """
+    Return the set of parities (0 = even, 1 = odd) of the highest priority
+    of the cycles reachable from `start`. `vertices` maps names to
+    priorities as returned by `read_graph`.
+    """
+    reachable = forward_reachable(edges, start)
+    priorities = sorted({vertices[v] for v in reachable}, reverse=True)
+
+    parities = set()
+    for p in priorities:
+        if p % 2 in parities:
+            continue
+        below = {v for v in reachable if vertices[v] <= p}
+        successors = {v: [t for t in edges.get(v, []) if t in below] for v in below}
+        for component in strongly_connected_components(successors):
+            cyclic = len(component) > 1 or component[0] in successors[component[0]]
+            if cyclic and any(vertices[v] == p for v in component):
+                parities.add(p % 2)
+                break
+        if len(parities) == 2:
+            break
+    return parities
@@ -0,0 +1,45 @@
+import argparse
+import sys
+
+from results_db import Run
+from shards import merge_partials, read_partial
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge the partial results of a sharded exact run (--shard i/k) into its results file.")
+    parser.add_argument("partials", nargs="+",
+                        help="Partial-result files (*.shard-i-of-k.json), one per shard.")
+    parser.add_argument("--output", default=None,
+                        help="Results file to write (default: the results file of the unsharded run).")
+    parser.add_argument("--db", default=None,
+                        help="Also record the merged result in this SQLite results database (see results_db.py).")
+    args = parser.parse_args()
+
+    try:
+        records = [read_partial(path) for path in args.partials]
+        wins, total, scale_bits = merge_partials(records)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot merge: {e}")
+
+    output = args.output or records[0]["results_file"]
+    with open(output, "w") as logf:
+        logf.write(f"{wins << scale_bits}/{total << scale_bits}")
+
+    solvers = sorted({(r["solver"], r["solver_version"]) for r in records})
+    if args.db is not None:
+        record = records[0]
+        run = Run(args.db, record["input_file"], record["input_sha256"], record.get("game", "unknown"), "exact",
+                  solver=",".join(sorted({solver for solver, _ in solvers})))
+        run.finish(wins, total, sum(r["time_ms"] for r in records), scale_bits=scale_bits)
+    for solver, version in solvers:
+        print(f"Solver: {solver} ({version})")
+    if len(solvers) > 1:
+        print("Warning: the shards were solved with different solvers.")
+    print(f"Merged {len(records)} shards of {records[0]['input_file']} into {output}")
+    print(f"Total aggregated value: {wins << scale_bits}/{total << scale_bits}")
+    print(f"Total solver time: {sum(r['time_ms'] for r in records):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Arena reductions applied before exhaustive enumeration.
+
+A reduction removes owner bits that cannot influence the winner of v0 and
+reports how many were removed; the exact scripts enumerate the reduced
+arena and scale their win counts by 2 ** removed, so `wins/total` is
+identical to the brute-force enumeration over the original file.
+"""
+
+from collections import deque
+
+
+# ------------------------------------------------
+# Forward reachability from v0
+# ------------------------------------------------
+def forward_reachable(edges, start):
+    """Return the vertices reachable from `start` in BFS order (start first)."""
+    order = [start]
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        for neighbor in edges.get(current, []):
+            if neighbor not in seen:
+                seen.add(neighbor)
+                order.append(neighbor)
+                queue.append(neighbor)
+    return order
+
+
+def restrict_parity_game(vertices, edges, keep):
+    """
+    Restrict a parsed DOT arena (`read_graph` output) to the vertices in
+    `keep`, renaming keep[i] to v<i>. Returns (vertices, edges).
+    """
+    rename = {old: f"v{i}" for i, old in enumerate(keep)}
+    new_vertices = {rename[old]: vertices[old] for old in keep}
+    new_edges = {
+        rename[old]: [rename[t] for t in edges.get(old, []) if t in rename]
+        for old in keep
+    }
+    return new_vertices, new_edges
+
+
+def restrict_energy_game(game_data, keep):
+    """
+    Restrict a JSON energy game to the node ids in `keep`, renumbering
+    keep[i] to i. Returns a new game_data dict.
+    """
+    rename = {old: i for i, old in enumerate(keep)}
+    owners = {v["id"]: v["owner"] for v in game_data["nodes"]}
+    restricted = {k: v for k, v in game_data.items() if k not in ("nodes", "edges")}
+    restricted["nodes"] = [{"id": rename[old], "owner": owners[old]} for old in keep]
+    restricted["edges"] = [
+        {**e, "source": rename[e["source"]], "target": rename[e["target"]]}
+        for e in game_data["edges"]
+        if e["source"] in rename and e["target"] in rename
+    ]
+    return restricted
+
+
+def write_parity_dot(dot_file, vertices, edges):
+    """Write a parsed arena back to DOT in the format of generate_parity_games.py."""
+    with open(dot_file, "w") as f:
+        f.write("digraph ParityGame {\n")
+        for v, priority in vertices.items():
+            f.write(f'  {v} [name="{v}", player=0, priority={priority}];\n')
+        for v, targets in edges.items():
+            for t in targets:
+                f.write(f'  {v} -> {t} [label="edge_{v[1:]}_{t[1:]}"];\n')
+        f.write("}\n")
+
+
+def prune_parity_game(vertices, edges):
+    """
+    Restrict a parsed DOT arena to the part reachable from v0.
+    Returns (vertices, edges, removed) where `removed` is the number of
+    owner bits dropped.
+    """
+    # Keep the original relative order so that nothing is renamed when
+    # every vertex is reachable.
+    keep = sorted(forward_reachable(edges, "v0"), key=lambda v: int(v[1:]))
+    vertices_kept, edges_kept = restrict_parity_game(vertices, edges, keep)
+    return vertices_kept, edges_kept, len(vertices) - len(keep)
+
+
+def prune_energy_game(game_data):
+    """
+    Restrict a JSON energy game to the part reachable from node 0.
+    Returns (game_data, removed).
+    """
+    edges = {}
+    for e in game_data["edges"]:
+        edges.setdefault(e["source"], []).append(e["target"])
+    keep = sorted(forward_reachable(edges, 0))
+    return restrict_energy_game(game_data, keep), len(game_data["nodes"]) - len(keep)
+
+
+# ------------------------------------------------
+# Owner-irrelevant vertices
+# ------------------------------------------------
+def single_choice_vertices(successors):
+    """Indices of vertices with exactly one distinct move; their owner never matters."""
+    return [v for v, succ in enumerate(successors) if len(set(succ)) == 1]
+
+
+def decided_vertices(all_player0, all_player1):
+    """
+    Indices of vertices won by the same player when every vertex belongs to
+    player 0 (`all_player0`, winner per vertex or None if unknown) and when
+    every vertex belongs to player 1 (`all_player1`).
+
+    Winning regions are monotone in the owners (handing a vertex to player 0
+    never shrinks player 0's region), so such a vertex has the same winner
+    under every assignment, and handing a vertex to the player who wins it
+    changes no region: its owner bit is irrelevant.
+    """
+    return [
+        v for v in range(len(all_player0))
+        if all_player0[v] is not None and all_player0[v] == all_player1[v]
+    ]
+
+
+def free_vertices(n, successors, solve_regions):
+    """
+    Return (free, v0_winner): the vertices whose owners still have to be
+    enumerated, and the winner of v0 if it is the same under every
+    assignment (None otherwise). All other owners can be fixed to 0.
+
+    `solve_regions(owners)` must return the winner of every vertex.
+    """
+    all_player0 = solve_regions([0] * n)
+    all_player1 = solve_regions([1] * n)
+    decided = set(decided_vertices(all_player0, all_player1))
+    fixed = decided | set(single_choice_vertices(successors))
+    v0_winner = all_player0[0] if 0 in decided else None
+    return [v for v in range(n) if v not in fixed], v0_winner
+
+
+def expand_owners(free, bits, n):
+    """Owner list over all n vertices with `bits` on the free vertices and 0 elsewhere."""
+    owners = [0] * n
+    for v, b in zip(free, bits):
+        owners[v] = int(b)
+    return owners
+
+
+def energy_successors(game_data):
+    """Successor lists indexed by node id for a JSON energy game."""
+    successors = [[] for _ in game_data["nodes"]]
+    for e in game_data["edges"]:
+        successors[e["source"]].append((e["target"], e.get("effect", 0)))
+    return successors
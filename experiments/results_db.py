@@ -0,0 +1,150 @@
+"""
+SQLite store of exact and FPRAAS results.
+
+With `--db PATH` the scripts record every run in one database next to the
+text results files: a `runs` row per run (arena hash and path, game type,
+mode, solver, estimator, requested N, seed entropy, host, final counts,
+wall-clock and solver time, summary line) and, for the samplers, a
+`progress` row per log line of the text file (wins/samples; solver time).
+Progress rows are buffered and inserted in batches, one transaction per
+`flush`; several processes can write to the same database (WAL journal,
+busy timeout). `export-results.py` writes the database back out in the
+text formats that `plot.py` reads.
+"""
+
+import datetime
+import os
+import socket
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    arena_sha256 TEXT NOT NULL,
+    arena TEXT NOT NULL,
+    game TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    solver TEXT,
+    estimator TEXT,
+    samples INTEGER,
+    seed TEXT,
+    host TEXT NOT NULL,
+    started TEXT NOT NULL,
+    wins INTEGER,
+    games INTEGER,
+    scale_bits INTEGER NOT NULL DEFAULT 0,
+    estimate REAL,
+    wall_ms REAL,
+    solver_ms REAL,
+    summary TEXT
+);
+CREATE TABLE IF NOT EXISTS progress (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    samples INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    solver_ms REAL NOT NULL,
+    PRIMARY KEY (run_id, samples)
+);
+CREATE INDEX IF NOT EXISTS runs_arena ON runs (arena_sha256, game, mode);
+CREATE INDEX IF NOT EXISTS runs_game ON runs (game, mode, samples);
+"""
+
+# Path recorded for the arena instead of the script's input file, set by
+# run-batch.py whose tasks run on scratch copies of the arenas
+ARENA_ENV = "RESULTS_DB_ARENA"
+
+
+def connect(path):
+    """Open (and if needed create) a results database."""
+    db = sqlite3.connect(path, timeout=60)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+class Run:
+    """
+    One run recorded in the database. With `run_id` an interrupted run is
+    continued: its progress rows beyond `resume_at` samples are dropped, as
+    the text log is truncated to the checkpoint.
+    """
+
+    def __init__(self, path, arena, arena_sha256, game, mode, solver=None, estimator=None, samples=None,
+                 seed=None, run_id=None, resume_at=0, batch=1000):
+        self.db = connect(path)
+        self.batch = batch
+        self.pending = []
+        self.started = time.perf_counter()
+        arena = os.environ.get(ARENA_ENV, arena)
+        with self.db:
+            if run_id is None:
+                cursor = self.db.execute(
+                    "INSERT INTO runs (arena_sha256, arena, game, mode, solver, estimator, samples, seed, "
+                    "host, started) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (arena_sha256, arena, game, mode, solver, estimator, samples,
+                     None if seed is None else str(seed), socket.gethostname(),
+                     datetime.datetime.now().isoformat(timespec="seconds")))
+                run_id = cursor.lastrowid
+            else:
+                self.db.execute("DELETE FROM progress WHERE run_id = ? AND samples > ?", (run_id, resume_at))
+        self.id = run_id
+
+    def progress(self, samples, wins, solver_ms):
+        """Record one progress line; inserted with the next `flush`."""
+        self.pending.append((self.id, samples, wins, solver_ms))
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered progress rows in one transaction."""
+        if self.pending:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?)", self.pending)
+            self.pending = []
+
+    def finish(self, wins=None, games=None, solver_ms=None, estimate=None, summary=None, scale_bits=0):
+        """
+        Record the final counts and times and close the database. Exact runs
+        store their counts before scaling by the 2^scale_bits owners of
+        pruned vertices, which keeps them within SQLite's 64-bit integers.
+        """
+        self.flush()
+        if estimate is None and games:
+            estimate = wins / games
+        with self.db:
+            self.db.execute("UPDATE runs SET wins = ?, games = ?, scale_bits = ?, estimate = ?, wall_ms = ?, "
+                            "solver_ms = ?, summary = ? WHERE id = ?",
+                            (wins, games, scale_bits, estimate, (time.perf_counter() - self.started) * 1000,
+                             solver_ms, summary, self.id))
+        self.db.close()
+
+
+def latest_runs(db, game, mode, samples=None, estimator=None):
+    """
+    The most recent completed run of each arena for a game type and mode
+    (and sample count, and estimator), as {arena_sha256: row}. Exact runs
+    with another owner probability than 1/2 have no counts (the fraction is
+    in their summary) and are left out.
+    """
+    query = "SELECT * FROM runs WHERE game = ? AND mode = ? AND games IS NOT NULL"
+    params = [game, mode]
+    if samples is not None:
+        query += " AND samples = ?"
+        params.append(samples)
+    if estimator is not None:
+        query += " AND estimator = ?"
+        params.append(estimator)
+    return {row["arena_sha256"]: row for row in db.execute(query + " ORDER BY id", params)}
+
+
+def exact_line(row):
+    """An exact run as the line the exact scripts write: scaled wins/total."""
+    return f"{row['wins'] << row['scale_bits']}/{row['games'] << row['scale_bits']}"
+
+
+def progress_lines(db, run_id):
+    """A sampler run's progress as the "wins/samples; solver time" lines of its log file."""
+    rows = db.execute("SELECT samples, wins, solver_ms FROM progress WHERE run_id = ? ORDER BY samples", (run_id,))
+    return [f"{wins}/{samples}; {solver_ms:.3f}" for samples, wins, solver_ms in rows]
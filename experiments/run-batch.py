@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Batch runner for the exact and FPRAAS scripts over a folder of arenas.
+
+Builds one task per arena x mode (x N for the samplers), skips tasks whose
+results file is newer than the arena, and runs the rest on a pool of
+`--jobs` concurrent processes. Every task runs on a copy of its arena in a
+scratch directory of its own (`<folder>/.batch/<task>/`), so tasks never
+share the temporary output file and the results file only appears in the
+folder once the task has completed. A failed or interrupted task keeps its
+scratch directory; if it left a checkpoint, the next batch resumes it.
+"""
+
+import argparse
+import datetime
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+from arena_cache import CACHE_DIR
+from checkpoint import checkpoint_path
+from results_db import ARENA_ENV
+
+EXPERIMENTS = os.path.dirname(os.path.abspath(__file__))
+
+# mode: (script, arena extension, results file suffix, sampler)
+MODES = {
+    "exact-reach": ("compute-exact-probability-reach.py", ".dot", "_results.txt", False),
+    "exact-parity": ("compute-exact-probability-parity.py", ".dot", "_results.txt", False),
+    "exact-energy": ("compute-exact-probability-energy.py", ".json", "_energy_results.txt", False),
+    "fpraas-reach": ("fpraas-reach.py", ".dot", "_sampled_results.txt", True),
+    "fpraas-parity": ("fpraas-parity.py", ".dot", "_sampled_results.txt", True),
+    "fpraas-energy": ("fpraas-energy.py", ".json", "_energy_results_sampled.txt", True),
+}
+
+# Exact results file of the game type a sampler mode belongs to
+EXACT_MODE = {"fpraas-reach": "exact-reach", "fpraas-parity": "exact-parity", "fpraas-energy": "exact-energy"}
+
+# Script processes currently running, terminated if the batch is interrupted
+running = set()
+
+
+class Task:
+    """One script run: an arena, a mode and, for the samplers, a sample count."""
+
+    def __init__(self, arena, mode, samples, results_file, scratch, estimator="uniform"):
+        self.arena = arena
+        self.mode = mode
+        self.samples = samples
+        self.estimator = estimator
+        self.results_file = results_file
+        self.scratch = scratch
+
+    @property
+    def name(self):
+        return os.path.basename(self.scratch)
+
+    def up_to_date(self):
+        """True if the results file exists and is newer than the arena."""
+        return (os.path.exists(self.results_file)
+                and os.path.getmtime(self.results_file) >= os.path.getmtime(self.arena))
+
+
+def results_suffix(mode, estimator):
+    """
+    Suffix of the results file a script writes: the samplers write the
+    estimate of a variance-reduced estimator to `<log>_<estimator>.txt`.
+    """
+    suffix = MODES[mode][2]
+    if MODES[mode][3] and estimator != "uniform":
+        suffix = suffix.replace(".txt", f"_{estimator}.txt")
+    return suffix
+
+
+def extra_estimator(extra_args):
+    """The `--estimator` among the extra script arguments (default uniform)."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--estimator", default="uniform")
+    return parser.parse_known_args(extra_args)[0].estimator
+
+
+def arenas(folder, extension):
+    """Arena files of a folder, skipping the scratch files of the old shell loops."""
+    for name in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(name)
+        if ext == extension and stem != "tmp" and not stem.endswith("_pruned"):
+            yield os.path.join(folder, name)
+
+
+def build_tasks(folder, modes, sample_counts, scratch_root, only_solved, estimator="uniform"):
+    """The task list over every arena of `folder`, mode and sample count."""
+    tasks = []
+    for mode in modes:
+        script, extension, suffix, sampler = MODES[mode]
+        suffix = results_suffix(mode, estimator)
+        for arena in arenas(folder, extension):
+            stem = os.path.splitext(os.path.basename(arena))[0]
+            if not sampler:
+                tasks.append(Task(arena, mode, None, os.path.join(folder, stem + suffix),
+                                  os.path.join(scratch_root, f"{stem}.{mode}")))
+                continue
+            if only_solved and not os.path.exists(os.path.join(folder, stem + MODES[EXACT_MODE[mode]][2])):
+                continue
+            for samples in sample_counts:
+                # Several sample counts would otherwise share one results file
+                name = suffix if len(sample_counts) == 1 else suffix.replace(".txt", f"_N{samples}.txt")
+                tasks.append(Task(arena, mode, samples, os.path.join(folder, stem + name),
+                                  os.path.join(scratch_root, f"{stem}.{mode}.N{samples}"), estimator))
+    return tasks
+
+
+def run_task(task, extra_args):
+    """
+    Run one task in its scratch directory and move its results file into
+    place. Returns (task, status, wall-clock seconds).
+    """
+    script, extension, suffix, sampler = MODES[task.mode]
+    os.makedirs(task.scratch, exist_ok=True)
+    arena = os.path.join(task.scratch, os.path.basename(task.arena))
+    shutil.copy2(task.arena, arena)
+    produced = os.path.splitext(arena)[0] + results_suffix(task.mode, task.estimator)
+    # Uniform sampling checkpoints its log, which keeps the uniform suffix
+    log = os.path.splitext(arena)[0] + suffix
+
+    cmd = [sys.executable, os.path.join(EXPERIMENTS, script), arena]
+    if task.mode == "fpraas-energy":
+        # Takes N as an option and writes its egsolver inputs to a directory
+        cmd += ["--samples", str(task.samples), "--tmpdir", os.path.join(task.scratch, "tmp_solvers")]
+    else:
+        cmd.append(os.path.join(task.scratch, "tmp" + extension))
+        if sampler:
+            cmd.append(str(task.samples))
+    cmd += extra_args
+    if task.estimator == "uniform" and os.path.exists(checkpoint_path(log)):
+        cmd.append("--resume")
+
+    start = time.perf_counter()
+    run_log = os.path.join(task.scratch, "run.log")
+    with open(run_log, "w") as logf:
+        # The scripts find the ggg binaries relative to the experiments directory
+        # and record the original arena, not the scratch copy, with --db
+        env = dict(os.environ, **{ARENA_ENV: os.path.abspath(task.arena)})
+        process = subprocess.Popen(cmd, cwd=EXPERIMENTS, env=env, stdout=logf, stderr=subprocess.STDOUT)
+        running.add(process)
+        returncode = process.wait()
+        running.discard(process)
+    elapsed = time.perf_counter() - start
+
+    if returncode != 0:
+        return task, f"failed (exit {returncode}, log in {task.scratch}/run.log)", elapsed
+    if not os.path.exists(produced):
+        # The scripts exit without results only when they skip an unsuitable arena
+        with open(run_log) as logf:
+            if "Early termination" not in logf.read():
+                return task, f"failed (no {os.path.basename(produced)}, log in {run_log})", elapsed
+        shutil.rmtree(task.scratch)
+        return task, "no results (early termination)", elapsed
+    os.replace(produced, task.results_file)
+    shutil.rmtree(task.scratch)
+    return task, "done", elapsed
+
+
+def format_seconds(seconds):
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the exact and FPRAAS scripts over every arena of a folder on a pool of processes.")
+    parser.add_argument("folder", help="Folder of arenas (.dot for reach and parity, .json for energy).")
+    parser.add_argument("--mode", action="append", choices=sorted(MODES), required=True,
+                        help="Script to run on every arena; repeat for several.")
+    parser.add_argument("--samples", type=int, action="append", default=None,
+                        help="Sample count N of the fpraas modes; repeat to sweep several "
+                             "(results then go to *_N<N>.txt). Default 100000.")
+    parser.add_argument("--jobs", type=int, default=cpu_count(),
+                        help="Number of tasks to run at once.")
+    parser.add_argument("--extra", default="",
+                        help='Further arguments for every script, e.g. "--solver ggg --seed 1".')
+    parser.add_argument("--db", default=None,
+                        help="SQLite results database every script also records its run in (see results_db.py).")
+    parser.add_argument("--only-solved", action="store_true",
+                        help="Run the fpraas modes only on arenas that already have exact results.")
+    parser.add_argument("--force", action="store_true",
+                        help="Rerun tasks whose results are up to date.")
+    parser.add_argument("--scratch", default=None,
+                        help="Scratch directory for the tasks (default: <folder>/.batch).")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="List the tasks that would run and exit.")
+    args = parser.parse_args()
+
+    sample_counts = args.samples or [100000]
+    scratch_root = os.path.abspath(args.scratch or os.path.join(args.folder, ".batch"))
+    extra_args = shlex.split(args.extra)
+    tasks = build_tasks(args.folder, args.mode, sample_counts, scratch_root, args.only_solved,
+                        extra_estimator(extra_args))
+    if len({task.results_file for task in tasks}) < len(tasks):
+        parser.error("the modes write the same results files (reach and parity arenas belong in separate folders)")
+    pending = [task for task in tasks if args.force or not task.up_to_date()]
+    print(f"{len(tasks)} tasks, {len(tasks) - len(pending)} up to date, {len(pending)} to run "
+          f"on {args.jobs} processes.")
+    if args.dry_run:
+        for task in pending:
+            print(f"  {task.name} -> {task.results_file}")
+        return
+    if not pending:
+        return
+
+    # Tasks run on copies of the arenas, so point them at the folder's arena cache
+    cache_dir = os.path.abspath(os.path.join(args.folder, CACHE_DIR))
+    if "ARENA_CACHE" not in os.environ and os.path.isdir(cache_dir):
+        os.environ["ARENA_CACHE"] = cache_dir
+
+    if args.db is not None:
+        extra_args += ["--db", os.path.abspath(args.db)]
+    failed = 0
+    start = time.perf_counter()
+    with ThreadPool(args.jobs) as pool:
+        results = pool.imap_unordered(lambda task: run_task(task, extra_args), pending)
+        try:
+            for done, (task, status, elapsed) in enumerate(results, start=1):
+                failed += status.startswith("failed")
+                wall = time.perf_counter() - start
+                eta = wall / done * (len(pending) - done)
+                print(f"[{done}/{len(pending)}] {task.name}: {status} in {elapsed:.1f} s | "
+                      f"{done / wall * 60:.2f} tasks/min | ETA {format_seconds(eta)}")
+        except KeyboardInterrupt:
+            for process in list(running):
+                process.terminate()
+            sys.exit(f"Interrupted; rerun the same command to resume from {scratch_root}.")
+
+    print(f"Finished {len(pending)} tasks in {format_seconds(time.perf_counter() - start)}, {failed} failed.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Owner assignments for the FPRAAS samplers.
+
+Samples are drawn in blocks from a seeded numpy Generator as boolean owner
+matrices (one row per assignment, True = player 1), the form the in-process
+solvers take; `owner_strings` turns a block into the "0101..." strings the
+external solvers need.
+
+Without replacement, assignment indices are a prefix of a uniformly random
+permutation of 0 .. 2^n - 1 (`Generator.choice` with replace=False), and
+index bit n - 1 - v is the owner of v, as in `enumeration_owners`. At most
+2^n distinct assignments exist, so the number of samples is capped there
+and sampling always terminates. Indices beyond 62 bits do not fit into
+int64; there, duplicate rows are redrawn, which almost never happens.
+"""
+
+import numpy as np
+
+# Largest n whose assignment indices fit into int64
+INDEX_BITS = 62
+
+
+def index_owners(index, n):
+    """Owner matrix of the assignments with the given int64 indices."""
+    shifts = np.arange(n - 1, -1, -1, dtype=np.int64)
+    return ((np.asarray(index, dtype=np.int64)[:, None] >> shifts) & 1).astype(bool)
+
+
+def owner_strings(owners):
+    """The rows of a boolean owner matrix as "0101..." strings."""
+    count, n = owners.shape
+    text = (owners.astype(np.uint8) + ord("0")).tobytes().decode()
+    return [text[i * n:(i + 1) * n] for i in range(count)]
+
+
+class OwnerSampler:
+    """
+    Uniformly random owner assignments over n vertices, with or without
+    replacement. Block b is drawn from its own generator, seeded by the
+    root seed entropy and b, so a run can be resumed at any block from the
+    entropy alone.
+    """
+
+    def __init__(self, n, seed=None, replace=True):
+        self.n = n
+        self.replace = replace
+        self.seed = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed)
+
+    @property
+    def entropy(self):
+        """Root seed entropy; passing it as `seed` reproduces the same samples."""
+        return self.seed.entropy
+
+    def limit(self, samples):
+        """Number of samples that can actually be drawn out of `samples`."""
+        return samples if self.replace else min(samples, 2 ** self.n)
+
+    def block_rng(self, b):
+        """Generator of block b."""
+        return np.random.default_rng(np.random.SeedSequence(self.seed.entropy, spawn_key=(b,)))
+
+    def blocks(self, samples, block_size, first_block=0):
+        """
+        Yield owner matrices of at most `block_size` rows, `limit(samples)`
+        rows in total, starting with block `first_block`.
+        """
+        samples = self.limit(samples)
+        starts = range(0, samples, block_size)
+        if self.replace:
+            for b in range(first_block, len(starts)):
+                count = min(block_size, samples - starts[b])
+                yield self.block_rng(b).integers(0, 2, size=(count, self.n), dtype=bool)
+        elif self.n <= INDEX_BITS:
+            index = np.random.default_rng(self.seed).choice(2 ** self.n, size=samples, replace=False)
+            for start in starts[first_block:]:
+                yield index_owners(index[start:start + block_size], self.n)
+        else:
+            # Earlier blocks are redrawn (but not yielded) to know which rows were taken
+            seen = set()
+            for b, start in enumerate(starts):
+                count = min(block_size, samples - start)
+                rng = self.block_rng(b)
+                rows = []
+                while len(rows) < count:
+                    for row in rng.integers(0, 2, size=(count - len(rows), self.n), dtype=bool):
+                        key = np.packbits(row).tobytes()
+                        if key not in seen:
+                            seen.add(key)
+                            rows.append(row)
+                if b >= first_block:
+                    yield np.array(rows)
@@ -0,0 +1,94 @@
+"""
+Sharded exact enumeration.
+
+`--shard i/k` restricts an exact script to the i-th of k contiguous ranges
+of assignment indices (product order over the free vertices, i = 0 .. k-1),
+so the shards can run as separate processes or on separate machines. Each
+shard writes a partial result: a small JSON file describing the arena
+(input hash, free vertices, scale), the solver, the index range it covered
+and the counts in it. `merge_partials` checks that a set of partial results
+belongs to one arena and covers 0 .. 2^k - 1 exactly once before adding
+them up (see merge-shards.py).
+"""
+
+import argparse
+import json
+import os
+
+from checkpoint import file_digest
+
+
+def parse_shard(text):
+    """argparse type for "i/k": returns (i, k) with 0 <= i < k."""
+    try:
+        i, k = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/k, got {text!r}")
+    if not 0 <= i < k:
+        raise argparse.ArgumentTypeError(f"shard index must satisfy 0 <= i < k, got {text!r}")
+    return i, k
+
+
+def shard_range(total, shard):
+    """Index range (start, stop) of shard (i, k) out of `total` assignments; may be empty."""
+    i, k = shard
+    return total * i // k, total * (i + 1) // k
+
+
+def partial_path(log_file, shard):
+    """Partial-result file of a shard, next to the results file of an unsharded run."""
+    i, k = shard
+    return f"{os.path.splitext(log_file)[0]}.shard-{i}-of-{k}.json"
+
+
+def solver_version(path):
+    """Identify a solver by the SHA-256 of its binary or module file, or "unavailable"."""
+    if path is None or not os.path.exists(path):
+        return "unavailable"
+    return f"sha256:{file_digest(path)[:16]}"
+
+
+def write_partial(path, record):
+    """Write a shard's partial result."""
+    with open(path, "w") as f:
+        json.dump(record, f, indent=2)
+        f.write("\n")
+
+
+def read_partial(path):
+    """Read a shard's partial result."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def merge_partials(records):
+    """
+    Add up the partial results of one sharded run. Returns
+    (wins, games, scale_bits). Raises ValueError if they come from
+    different arenas or reductions, or if their index ranges leave a gap,
+    overlap or were not completed.
+    """
+    if not records:
+        raise ValueError("No partial results to merge")
+    first = records[0]
+    for record in records[1:]:
+        for key in ("input_sha256", "total", "scale_bits", "free"):
+            if record[key] != first[key]:
+                raise ValueError(f"Partial results disagree on {key}: {first[key]} vs {record[key]}")
+
+    covered = 0
+    wins = 0
+    for record in sorted(records, key=lambda r: tuple(r["range"])):
+        start, stop = record["range"]
+        if start > covered:
+            raise ValueError(f"Gap: assignments {covered} .. {start - 1} are not covered")
+        if start < covered:
+            raise ValueError(f"Overlap: assignments {start} .. {min(stop, covered) - 1} are covered twice")
+        if record["games"] != stop - start:
+            raise ValueError(f"Shard {record['shard']} solved {record['games']} of its {stop - start} assignments")
+        covered = stop
+        wins += record["wins"]
+    if covered != first["total"]:
+        raise ValueError(f"Gap: assignments {covered} .. {first['total'] - 1} are not covered")
+    return wins, first["total"], first["scale_bits"]
+
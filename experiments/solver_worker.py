@@ -0,0 +1,87 @@
+"""
+Long-lived ggg solver processes.
+
+A ggg solver started with `--batch` parses the game once and then answers
+one request line `<id> <owner bits>` on stdin with `<id> <winner bits>` on
+stdout, where bit i belongs to vertex v<i> ('-' if the solver left the
+vertex undecided). `SolverWorker` keeps such a process running and pipelines
+requests, so the hot loops pay neither fork/exec nor graph parsing.
+"""
+
+import subprocess
+from collections import deque
+
+PIPE_BUDGET = 32768  # bytes
+
+
+class SolverWorker:
+    """One ggg solver process in batch mode over a fixed DOT file."""
+
+    def __init__(self, solver, dot_file, window=256):
+        self.window = window
+        self.next_id = 0
+        self.process = subprocess.Popen(
+            [solver, "-i", dot_file, "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the request stream and wait for the solver to exit."""
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def _send(self, bit_string):
+        request_id = self.next_id
+        self.next_id += 1
+        self.process.stdin.write(f"{request_id} {bit_string}\n")
+        return request_id
+
+    def _receive(self, request_id):
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"Solver worker exited with code {self.process.wait()} "
+                               f"before answering request {request_id}")
+        answer_id, winners = line.split()
+        if int(answer_id) != request_id:
+            raise RuntimeError(f"Solver worker answered request {answer_id}, expected {request_id}")
+        return winners
+
+    def solve(self, bit_string):
+        """Return the winner string of one assignment."""
+        request_id = self._send(bit_string)
+        self.process.stdin.flush()
+        return self._receive(request_id)
+
+    def solve_many(self, bit_strings):
+        """
+        Yield (bit_string, winner string) for every assignment in
+        `bit_strings`, in order, keeping up to `window` requests in flight.
+        """
+        pending = deque()
+        for bit_string in bit_strings:
+            # Keep the in-flight requests and answers well below the pipe
+            # buffer size, otherwise both sides can block on a full pipe.
+            window = max(1, min(self.window, PIPE_BUDGET // (len(bit_string) + 24)))
+            pending.append((self._send(bit_string), bit_string))
+            if len(pending) >= window:
+                self.process.stdin.flush()
+                request_id, sent = pending.popleft()
+                yield sent, self._receive(request_id)
+        self.process.stdin.flush()
+        while pending:
+            request_id, sent = pending.popleft()
+            yield sent, self._receive(request_id)
+
+
+def winner_regions(winners):
+    """Turn a winner string into {vertex_name: winning_player} like `parse_solver_regions`."""
+    return {f"v{i}": int(w) for i, w in enumerate(winners) if w != "-"}
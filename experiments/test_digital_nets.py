@@ -0,0 +1,32 @@
+"""Run with `python -m unittest test_digital_nets` from the experiments directory."""
+
+import unittest
+from itertools import combinations
+
+import numpy as np
+
+from digital_nets import generator_rows, gf2_rank, owner_net
+from estimators import qmc_net_bits
+
+
+class TestOwnerNet(unittest.TestCase):
+    def test_points_are_distinct(self):
+        rng = np.random.default_rng(1)
+        for n in (1, 3, 5, 8, 12, 16, 20, 31, 64, 200):
+            for samples in (100, 10000, 100000):
+                for replicates in (4, 16):
+                    m = qmc_net_bits(n, samples, replicates)
+                    owners = owner_net(n, m, rng)
+                    with self.subTest(n=n, m=m):
+                        self.assertEqual(len(np.unique(owners, axis=0)), 2 ** m)
+
+    def test_strength_five_rows_stay_independent(self):
+        # n = 20, m = 12: the BCH rows take 11 bits, the twelfth is random
+        rows = list(map(int, generator_rows(20, 12, np.random.default_rng(2))))
+        self.assertEqual(gf2_rank(rows), 12)
+        for subset in combinations(rows, 5):
+            self.assertEqual(gf2_rank(subset), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
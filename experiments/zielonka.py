@@ -0,0 +1,114 @@
+"""
+In-process bit-sliced parity game solver.
+
+Mirrors priority_promotion_solver: player 0 wins a play iff the highest
+priority seen infinitely often is even. The arena is taken in the form
+produced by `read_graph` (vertex names `v<i>`), and owners come as the
+uint64 lane matrices of `attractor.pack_lanes` / `enumeration_lanes`: lane
+j of row v is set iff v belongs to player 1 in assignment j.
+
+Zielonka's recursive algorithm runs on all lanes at once. A (sub)game is a
+lane matrix too (lane j of row v set iff v is in the subgame of assignment
+j), and so is every attractor. Where the classic algorithm branches on
+"the opponent wins nothing in the subgame", the lanes for which that holds
+are settled and dropped from the rest of the loop, so one pass of the
+recursion solves 64 assignments per word.
+"""
+
+import numpy as np
+
+from attractor import owner_bits, pack_lanes, unpack_lanes
+
+ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+class ParityArena:
+    """
+    Index-based view of a parsed parity arena. Successors are stored as an
+    (n, max out-degree) matrix, short rows padded by repeating their first
+    successor, so one attractor sweep gathers and reduces every vertex at
+    once.
+    """
+
+    def __init__(self, vertices, edges):
+        self.n = len(vertices)
+        self.names = [f"v{i}" for i in range(self.n)]
+        missing = [v for v in vertices if int(v[1:]) >= self.n]
+        if missing:
+            raise ValueError(f"Vertex names must be v0..v{self.n - 1}, got {missing}")
+
+        self.priorities = np.array([vertices[name] for name in self.names])
+        successors = [[int(t[1:]) for t in edges.get(name, [])] for name in self.names]
+        # Subgames left by Zielonka's attractor removals keep a move at
+        # every vertex, so only the arena itself has to be checked.
+        dead_ends = [name for name, succ in zip(self.names, successors) if not succ]
+        if dead_ends:
+            raise ValueError(f"Vertices without successors are not supported: {dead_ends}")
+        width = max(len(succ) for succ in successors)
+        self.successors = np.array([succ + [succ[0]] * (width - len(succ)) for succ in successors],
+                                   dtype=np.intp)
+
+    def attractor_lanes(self, game, target, player, owner_lanes):
+        """
+        Attractor of `player` to `target` inside the subgame `game`, all
+        (n, words) lane matrices. A vertex is attracted if it is in the
+        subgame and either `player` owns it and some successor is
+        attracted, or the opponent owns it and every successor inside the
+        subgame is.
+        """
+        own = owner_lanes if player == 1 else ~owner_lanes
+        attr = target & game
+        while True:
+            succ = attr[self.successors]
+            some = np.bitwise_or.reduce(succ, axis=1)
+            every = np.bitwise_and.reduce(succ | ~game[self.successors], axis=1)
+            updated = attr | (game & ((own & some) | (~own & every)))
+            if np.array_equal(updated, attr):
+                return attr
+            attr = updated
+
+    def _solve(self, game, p, owner_lanes):
+        """Zielonka on the subgame `game`, whose priorities are all <= p. Returns (won0, won1)."""
+        present = np.bitwise_or.reduce(game, axis=1) != 0
+        p = min(p, int(self.priorities[present].max())) if present.any() else -1
+        won = [np.zeros_like(game), np.zeros_like(game)]
+        if p < 0:
+            return won
+
+        player = p % 2
+        while game.any():
+            top = np.where((self.priorities == p)[:, None], game, np.uint64(0))
+            attr = self.attractor_lanes(game, top, player, owner_lanes)
+            lost = self._solve(game & ~attr, p - 1, owner_lanes)[1 - player]
+
+            # Lanes where the opponent wins nothing below p are won entirely by player
+            settled = ~np.bitwise_or.reduce(lost, axis=0)
+            won[player] |= game & settled
+
+            escape = self.attractor_lanes(game, lost, 1 - player, owner_lanes)
+            won[1 - player] |= escape
+            game = game & ~escape & ~settled
+        return won
+
+    def solve_lanes(self, owner_lanes):
+        """
+        Solve every lane of an (n, words) owner lane matrix. Returns the
+        (n, words) lane matrix of the vertices won by player 0.
+        """
+        owner_lanes = np.asarray(owner_lanes, dtype=np.uint64)
+        game = np.full(owner_lanes.shape, ONES, dtype=np.uint64)
+        return self._solve(game, int(self.priorities.max(initial=-1)), owner_lanes)[0]
+
+    def v0_wins_lanes(self, owner_lanes, count):
+        """Return a boolean array telling, per lane, whether player 0 wins v0."""
+        return unpack_lanes(self.solve_lanes(owner_lanes)[0], count)
+
+    def regions(self, owners):
+        """Return the winning player (0/1) of every vertex under the given owners."""
+        lanes = pack_lanes([[bit] for bit in owner_bits(owners)])
+        won0 = self.solve_lanes(lanes)
+        return [0 if row[0] & np.uint64(1) else 1 for row in won0]
+
+    def v0_wins(self, owners):
+        """Return 1 if player 0 wins v0 under the given owners, otherwise 0."""
+        return 1 - self.regions(owners)[0]
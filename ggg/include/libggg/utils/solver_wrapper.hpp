@@ -8,6 +8,9 @@
 #include <concepts>
 #include <iostream>
 #include <memory>
+#include <sstream>
+#include <stdexcept>
+#include <string>
 #include <vector>
 
 namespace ggg {
@@ -44,6 +47,8 @@ class GameSolverWrapper {
         desc.add_options()("output,o", boost::program_options::value<std::string>()->default_value("-"), "Output file (default: stdout)");
         desc.add_options()("time-only,t", "Only output time to solve (in milliseconds)");
         desc.add_options()("solver-name", "Output solver name");
+        desc.add_options()("batch", "Solve the input game once per '<id> <owner bits>' line read from stdin, "
+                                    "answering each with '<id> <winner bits>' (bit i belongs to vertex v<i>)");
 
         // Add positional argument for input file
         boost::program_options::positional_options_description pos_desc;
@@ -242,6 +247,77 @@ class GameSolverWrapper {
         }
     }
 
+    /**
+     * @brief Order the vertices by the index in their name v<i>, as used by owner bit strings
+     */
+    static std::vector<typename boost::graph_traits<GraphType>::vertex_descriptor> vertices_by_index(const GraphType &graph) {
+        using Vertex = typename boost::graph_traits<GraphType>::vertex_descriptor;
+        const auto n = boost::num_vertices(graph);
+        std::vector<Vertex> by_index(n, boost::graph_traits<GraphType>::null_vertex());
+
+        auto vertices = boost::vertices(graph);
+        for (auto it = vertices.first; it != vertices.second; ++it) {
+            const std::string &name = graph[*it].name;
+            std::size_t index = n;
+            if (name.size() > 1 && name[0] == 'v' && name.find_first_not_of("0123456789", 1) == std::string::npos) {
+                index = std::stoul(name.substr(1));
+            }
+            if (index >= n || by_index[index] != boost::graph_traits<GraphType>::null_vertex()) {
+                throw std::runtime_error("Batch mode needs vertices named v0..v" + std::to_string(n - 1) + ", got " + name);
+            }
+            by_index[index] = *it;
+        }
+        return by_index;
+    }
+
+    /**
+     * @brief Batch mode: re-solve one parsed game for every owner assignment read from stdin
+     *
+     * Each request line is '<id> <bits>' where bits[i] is the owner of vertex v<i>; each
+     * answer line is '<id> <winners>' where winners[i] is the winner of v<i> ('-' if
+     * unknown). Answers are flushed in request order, so a client can keep several
+     * requests in flight.
+     */
+    static int run_batch(GraphType &graph) {
+        SolverType solver;
+        const auto by_index = vertices_by_index(graph);
+        const auto n = by_index.size();
+
+        std::string line;
+        while (std::getline(std::cin, line)) {
+            if (line.empty()) {
+                continue;
+            }
+            std::istringstream request(line);
+            std::string id;
+            std::string bits;
+            request >> id >> bits;
+            if (bits.size() != n) {
+                throw std::runtime_error("Request " + id + " has " + std::to_string(bits.size()) +
+                                         " owner bits, expected " + std::to_string(n));
+            }
+            for (std::size_t i = 0; i < n; ++i) {
+                graph[by_index[i]].player = bits[i] == '1' ? 1 : 0;
+            }
+
+            auto solution = solver.solve(graph);
+            if (!solution.is_solved()) {
+                throw std::runtime_error("Failed to solve request " + id);
+            }
+
+            std::string winners(n, '-');
+            for (std::size_t i = 0; i < n; ++i) {
+                if (solution.is_won_by_player0(by_index[i])) {
+                    winners[i] = '0';
+                } else if (solution.is_won_by_player1(by_index[i])) {
+                    winners[i] = '1';
+                }
+            }
+            std::cout << id << " " << winners << std::endl;
+        }
+        return 0;
+    }
+
   public:
     template <typename ParserFunc>
     static int run(int argc, char *argv[], ParserFunc parser_func) {
@@ -260,6 +336,11 @@ class GameSolverWrapper {
             std::string input_file = vm["input"].as<std::string>();
             std::shared_ptr<GraphType> graph;
 
+            if (vm.count("batch") && input_file == "-") {
+                std::cerr << "Error: --batch reads requests from stdin, the game must be given with --input" << std::endl;
+                return 1;
+            }
+
             LGG_INFO("Parsing input from: ", (input_file == "-" ? "stdin" : input_file));
 
             if (input_file == "-") {
@@ -276,6 +357,10 @@ class GameSolverWrapper {
 
             LGG_INFO("Successfully parsed game with ", boost::num_vertices(*graph), " vertices");
 
+            if (vm.count("batch")) {
+                return run_batch(*graph);
+            }
+
             // Create solver and measure time
             SolverType solver;
             LGG_DEBUG("Starting solver: ", solver.get_name());
@@ -1,5 +1,10 @@
 #include "libggg/graphs/parity_graph.hpp"
+#include "libggg/utils/solver_wrapper.hpp"
 #include <boost/graph/adjacency_list.hpp>
+#include <filesystem>
+#include <fstream>
+#include <map>
+#include <sstream>
 
 #define BOOST_TEST_MODULE Reachability Solver Test Suite
 #include <boost/test/unit_test.hpp>
@@ -9,6 +14,48 @@
 using namespace ggg;
 using namespace ggg::graphs;
 
+namespace {
+
+using Wrapper = utils::GameSolverWrapper<ParityGraph, solvers::ReachabilitySolver>;
+
+// Vertices deliberately out of index order: batch answers must follow v<i>, not file order
+const int batch_priorities[] = {0, 1, 0, 0, 1};
+const char *batch_edges = R"(
+    v0 -> v2; v0 -> v3; v2 -> v1; v2 -> v4;
+    v3 -> v0; v3 -> v4; v4 -> v4; v1 -> v1;
+})";
+
+std::string batch_game(const std::string &owners) {
+    std::ostringstream dot;
+    dot << "digraph ParityGame {\n";
+    for (int i : {3, 1, 4, 0, 2}) {
+        dot << "    v" << i << " [name=\"v" << i << "\", player=" << owners[i]
+            << ", priority=" << batch_priorities[i] << "];\n";
+    }
+    dot << batch_edges << "\n";
+    return dot.str();
+}
+
+// Run the solver binary's entry point, feeding stdin and capturing stdout
+std::string run_solver(std::vector<std::string> args, const std::string &stdin_text) {
+    std::vector<char *> argv;
+    for (auto &arg : args) {
+        argv.push_back(arg.data());
+    }
+    std::istringstream in(stdin_text);
+    std::ostringstream out;
+    auto *old_in = std::cin.rdbuf(in.rdbuf());
+    auto *old_out = std::cout.rdbuf(out.rdbuf());
+    int code = Wrapper::run(static_cast<int>(argv.size()), argv.data(),
+                            [](auto &&source) { return parse_Parity_graph(source); });
+    std::cin.rdbuf(old_in);
+    std::cout.rdbuf(old_out);
+    BOOST_REQUIRE_EQUAL(code, 0);
+    return out.str();
+}
+
+} // namespace
+
 BOOST_AUTO_TEST_SUITE(ReachabilityGameTests)
 
 BOOST_AUTO_TEST_CASE(TestEmptyGame) {
@@ -117,4 +164,51 @@ BOOST_AUTO_TEST_CASE(TestSolverName) {
     BOOST_CHECK(name.find("Reachability") != std::string::npos);
 }
 
+BOOST_AUTO_TEST_CASE(TestBatchModeMatchesSingleRuns) {
+    const auto dot_file = std::filesystem::temp_directory_path() / "ggg_reachability_batch_test.dot";
+    const int n = 5;
+
+    // One-shot --csv runs, one per owner assignment, rewriting the owners in the file
+    std::string requests;
+    std::map<std::string, std::string> expected;
+    for (int mask = 0; mask < (1 << n); ++mask) {
+        std::string owners(n, '0');
+        for (int i = 0; i < n; ++i) {
+            owners[i] = (mask >> i) & 1 ? '1' : '0';
+        }
+        std::ofstream(dot_file) << batch_game(owners);
+        std::istringstream csv(run_solver({"ggg_reachability", "-i", dot_file.string(), "--csv"}, ""));
+
+        std::string row;
+        std::getline(csv, row); // header
+        std::string winners(n, '?');
+        while (std::getline(csv, row)) {
+            // vertex,player,winning_player,...
+            std::istringstream fields(row);
+            std::string vertex, player, winner;
+            std::getline(fields, vertex, ',');
+            std::getline(fields, player, ',');
+            std::getline(fields, winner, ',');
+            winners[std::stoi(vertex.substr(1))] = winner == "-1" ? '-' : winner[0];
+        }
+        expected[std::to_string(mask)] = winners;
+        requests += std::to_string(mask) + " " + owners + "\n";
+    }
+
+    // A single --batch run over the file as last written answers all assignments
+    std::istringstream answers(run_solver({"ggg_reachability", "-i", dot_file.string(), "--batch"}, requests));
+    std::filesystem::remove(dot_file);
+
+    std::string id, winners;
+    std::size_t answered = 0;
+    while (answers >> id >> winners) {
+        BOOST_TEST_CONTEXT("request " << id) {
+            BOOST_CHECK_EQUAL(winners, expected.at(id));
+        }
+        BOOST_CHECK_EQUAL(id, std::to_string(answered));
+        ++answered;
+    }
+    BOOST_CHECK_EQUAL(answered, expected.size());
+}
+
 BOOST_AUTO_TEST_SUITE_END()